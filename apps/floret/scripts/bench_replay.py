@@ -0,0 +1,82 @@
+"""Offline overhead benchmark over recorded cassettes.
+
+Replay (no network):
+    python scripts/bench_replay.py                       # all tests/cassettes/*.json
+    python scripts/bench_replay.py --brain 2 --tool 5    # synthetic latencies (s)
+    python scripts/bench_replay.py --recorded --scale 0.1
+
+Record a new cassette from a live run (needs a key, spends quota):
+    python scripts/bench_replay.py --record "short video of rain" -o tests/cassettes/rain.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+
+from floret.cassette import Cassette, Latency, bench_loop, bench_stream, recording
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("bench")
+
+_CASSETTES = Path(__file__).resolve().parent.parent / "tests" / "cassettes"
+
+
+async def record(prompt: str, out: Path) -> None:
+    from floret.agent import run_agent
+    from floret.registry import warm_registry
+
+    await warm_registry()
+    messages = [{"role": "user", "content": prompt}]
+    with recording(Cassette(name=out.stem, messages=messages)) as cassette:
+        await run_agent(list(messages))
+    cassette.save(out)
+    print(f"recorded {len(cassette.brain)} brain turns, {len(cassette.tools)} tools")
+
+
+async def replay(paths: list[Path], latency: Latency) -> None:
+    print(
+        f"{'cassette':<20} {'mode':<7} {'iters':>5} {'wall ms':>9} "
+        f"{'upstream':>9} {'ovh/iter':>9} {'peak KiB':>9} {'ttfb ms':>8}"
+    )
+    for path in paths:
+        cassette = Cassette.load(path)
+        for bench in (bench_loop, bench_stream):
+            r = await bench(cassette, latency)
+            ttfb = f"{r.ttfb_ms:8.1f}" if r.ttfb_ms is not None else f"{'-':>8}"
+            print(
+                f"{r.name:<20} {r.mode:<7} {r.iterations:>5} {r.wall_ms:9.1f} "
+                f"{r.upstream_ms:9.1f} {r.overhead_ms_per_iteration:9.2f} "
+                f"{r.peak_memory_kb:9.0f} {ttfb}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cassettes", nargs="*", type=Path)
+    parser.add_argument("--record", metavar="PROMPT")
+    parser.add_argument("-o", "--out", type=Path)
+    parser.add_argument("--brain", type=float, default=0.0)
+    parser.add_argument("--tool", type=float, default=0.0)
+    parser.add_argument("--recorded", action="store_true")
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.out:
+            parser.error("--record needs -o/--out")
+        asyncio.run(record(args.record, args.out))
+        return
+    latency = (
+        Latency(brain=None, tool=None, scale=args.scale)
+        if args.recorded
+        else Latency(brain=args.brain, tool=args.tool)
+    )
+    paths = args.cassettes or sorted(_CASSETTES.glob("*.json"))
+    asyncio.run(replay(paths, latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,25 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import contextvars
 import logging
 import re
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from dataclasses import dataclass
 from typing import Any, cast
 
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam, ChatCompletionToolParam
 
+from floret.compaction import Compactor
 from floret.config import resolve_api_key, settings
 from floret.knowledge import build_system_prompt
+from floret.memo import ToolMemo
 from floret.routing import RoutingPreferences
-from floret.toolset import TOOL_SCHEMAS, dispatch, parse_args
+from floret.scheduler import Overloaded, scheduler
+from floret.tools.jobs import JobScope
+from floret.toolset import TOOL_SCHEMAS, ToolResult, dispatch, parse_args
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +38,44 @@ def _client() -> AsyncOpenAI:
     )
 
 
+Dispatcher = Callable[
+    [str, dict[str, Any], RoutingPreferences | None, JobScope | None],
+    Awaitable[ToolResult],
+]
+
+
+@dataclass(frozen=True)
+class AgentHooks:
+    """The loop's upstreams: a brain-client factory and the tool dispatcher.
+
+    Replaces the live brain and tools without touching module state; see
+    `floret.cassette`, which records and replays runs through these.
+    """
+
+    client: Callable[[], Any]
+    dispatch: Dispatcher
+
+
+_hooks: contextvars.ContextVar[AgentHooks | None] = contextvars.ContextVar(
+    "agent_hooks", default=None
+)
+
+
+def current_hooks() -> AgentHooks:
+    """Hooks installed by `using_hooks`, else the live client and dispatch."""
+    return _hooks.get() or AgentHooks(client=_client, dispatch=dispatch)
+
+
+@contextlib.contextmanager
+def using_hooks(hooks: AgentHooks) -> Iterator[AgentHooks]:
+    """Run agent loops started in this context (API requests included) on `hooks`."""
+    token = _hooks.set(hooks)
+    try:
+        yield hooks
+    finally:
+        _hooks.reset(token)
+
+
 _WORKSPACE_MEDIA_RE = re.compile(r"\b[\w-]+\.(mp4|webm|mov|mkv|mp3|wav|gif)\b", re.I)
 
 
@@ -54,16 +100,42 @@ async def run_agent_events(
     model: str | None = None,
     max_iters: int | None = None,
     routing: RoutingPreferences | None = None,
-):
+    hooks: AgentHooks | None = None,
+) -> AsyncIterator[dict[str, Any]]:
     """Run the tool-calling loop, yielding progress events as they happen.
 
     Yields {"type": "tool_start", "name"} per tool call, then exactly one
-    {"type": "final", "text", "artifacts", "iterations"}.
+    {"type": "final", "text", "artifacts", "iterations"}. Background jobs the
+    run started are killed and cleaned up when it ends.
     """
+    job_scope = JobScope()
+    try:
+        async for event in _agent_loop(
+            messages,
+            model=model,
+            max_iters=max_iters,
+            routing=routing,
+            hooks=hooks or current_hooks(),
+            job_scope=job_scope,
+        ):
+            yield event
+    finally:
+        await job_scope.close()
+
+
+async def _agent_loop(
+    messages: list[dict[str, Any]],
+    *,
+    model: str | None,
+    max_iters: int | None,
+    routing: RoutingPreferences | None,
+    hooks: AgentHooks,
+    job_scope: JobScope,
+) -> AsyncIterator[dict[str, Any]]:
     routing = routing or RoutingPreferences()
     model = routing.text or model or settings.brain_model
     max_iters = max_iters or settings.max_iters
-    client = _client()
+    client = hooks.client()
     semaphore = asyncio.Semaphore(settings.max_concurrency)
     system_prompt = build_system_prompt() + routing.prompt_block()
 
@@ -72,17 +144,37 @@ async def run_agent_events(
         *messages,
     ]
     artifacts: list[dict[str, Any]] = []
+
+    async def _dispatch(name: str, args: dict[str, Any]) -> ToolResult:
+        # Process-wide slot first: a call queued behind other runs must not hold
+        # one of this run's own slots and stall its other tools meanwhile.
+        try:
+            async with scheduler.tool_slot(name), semaphore:
+                return await hooks.dispatch(name, args, routing, job_scope)
+        except Overloaded as exc:
+            # A busy pool is one failed tool call, not a failed run: the brain
+            # has already spent tokens and can wait, retry or work around it.
+            return ToolResult(
+                brain=f"ERROR: {name} is at capacity; retry in {exc.retry_after_header}s"
+            )
+
+    memo = ToolMemo(_dispatch, routing)
+    compactor = Compactor(settings.context_budget_tokens)
     seen_calls: dict[str, int] = {}
     error_turns = 0
     publish_nudged = False
 
     for iteration in range(max_iters):
-        completion = await client.chat.completions.create(
-            model=model,
-            messages=cast(list[ChatCompletionMessageParam], convo),
-            tools=cast(list[ChatCompletionToolParam], TOOL_SCHEMAS),
-            tool_choice="auto",
-        )
+        compactor.compact(convo)
+        sent_len = len(convo)
+        async with scheduler.slot("brain"):
+            completion = await client.chat.completions.create(
+                model=model,
+                messages=cast(list[ChatCompletionMessageParam], convo),
+                tools=cast(list[ChatCompletionToolParam], TOOL_SCHEMAS),
+                tool_choice="auto",
+            )
+        compactor.observe(convo, sent_len, getattr(completion, "usage", None))
         msg = completion.choices[0].message
         tool_calls = cast(list[Any], msg.tool_calls or [])
 
@@ -148,9 +240,7 @@ async def run_agent_events(
         # Execute every tool call in this turn concurrently.
         async def _run(call: Any) -> tuple[str, Any]:
             call_id, name, raw_args = _tool_call_fields(call)
-            async with semaphore:
-                result = await dispatch(name, parse_args(raw_args), routing)
-            return call_id, result
+            return call_id, await memo.call(name, parse_args(raw_args))
 
         keys = ["{}:{}".format(*_tool_call_fields(tc)[1:]) for tc in tool_calls]
         repeats = sum(1 for k in keys if seen_calls.get(k))
@@ -185,16 +275,18 @@ async def run_agent_events(
 
     # Hit the iteration cap: ask the brain for a final wrap-up without tools.
     logger.warning("Agent hit max_iters=%s; forcing final answer", max_iters)
+    compactor.compact(convo)
     convo.append(
         {
             "role": "system",
             "content": "Iteration limit reached. Write your final answer now using what you have.",
         }
     )
-    final = await client.chat.completions.create(
-        model=model,
-        messages=cast(list[ChatCompletionMessageParam], convo),
-    )
+    async with scheduler.slot("brain"):
+        final = await client.chat.completions.create(
+            model=model,
+            messages=cast(list[ChatCompletionMessageParam], convo),
+        )
     yield {
         "type": "final",
         "text": final.choices[0].message.content or "",
@@ -209,13 +301,14 @@ async def run_agent(
     model: str | None = None,
     max_iters: int | None = None,
     routing: RoutingPreferences | None = None,
+    hooks: AgentHooks | None = None,
 ) -> dict[str, Any]:
     """Run the tool-calling loop over `messages` (OpenAI chat format).
 
     Returns {"text", "artifacts", "iterations"}.
     """
     async for event in run_agent_events(
-        messages, model=model, max_iters=max_iters, routing=routing
+        messages, model=model, max_iters=max_iters, routing=routing, hooks=hooks
     ):
         if event["type"] == "final":
             return {
@@ -26,6 +26,7 @@ from floret.routing import (
     RoutingValidationError,
     validate_routing,
 )
+from floret.scheduler import Overloaded, scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -214,8 +215,9 @@ async def _sse_events(
 
     async def _pump() -> None:
         try:
-            async for event in run_agent_events(messages, routing=routing):
-                await queue.put(event)
+            async with scheduler.slot("runs", api_key or ""):
+                async for event in run_agent_events(messages, routing=routing):
+                    await queue.put(event)
         except Exception as exc:
             await queue.put(exc)
         finally:
@@ -273,6 +275,14 @@ def _agent_run_token(http_request: Request) -> str | None:
     return token
 
 
+def _too_busy(exc: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(exc),
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+
 @app.post("/v1/chat/completions")
 async def chat_completions(request: ChatRequest, http_request: Request) -> Any:
     api_key = _agent_run_token(http_request)
@@ -298,6 +308,13 @@ async def chat_completions(request: ChatRequest, http_request: Request) -> Any:
         _api_key_override.reset(token)
 
     if request.stream:
+        # Headers go out before the run starts, so refuse at the door when the
+        # run pool could not admit this request in time; a later mid-run
+        # overload surfaces as an error frame instead.
+        try:
+            scheduler.pool("runs").check()
+        except Overloaded as exc:
+            raise _too_busy(exc) from exc
         return StreamingResponse(
             _sse_events(
                 _to_openai_messages(request.messages),
@@ -310,7 +327,10 @@ async def chat_completions(request: ChatRequest, http_request: Request) -> Any:
         )
     token = _api_key_override.set(api_key or None)
     try:
-        result = await run_agent(_to_openai_messages(request.messages), routing=routing)
+        async with scheduler.slot("runs", api_key or ""):
+            result = await run_agent(
+                _to_openai_messages(request.messages), routing=routing
+            )
         markdown, content_parts = await _build_content(
             result["text"], result["artifacts"]
         )
@@ -333,6 +353,8 @@ async def chat_completions(request: ChatRequest, http_request: Request) -> Any:
         }
     except HTTPException:
         raise
+    except Overloaded as exc:
+        raise _too_busy(exc) from exc
     except Exception as exc:
         logger.exception("chat_completions failed")
         raise HTTPException(status_code=500, detail=str(exc))
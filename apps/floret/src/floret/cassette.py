@@ -0,0 +1,352 @@
+"""Record/replay cassettes for benchmarking the agent loop offline.
+
+A cassette holds the brain completions and tool results of one real run. While
+recording, `recording()` wraps the live brain client and `dispatch`; replaying
+serves both back from the cassette with configurable synthetic latencies. Both
+install `AgentHooks` for the current context, so `run_agent_events` and the
+FastAPI app run exactly as in production but with no network. `bench_loop` and
+`bench_stream` then measure what is left — Floret's own overhead (dispatch,
+memo, compaction, SSE framing, `_build_content`), peak Python memory and the
+stream's time-to-first-byte.
+
+Checked-in cassettes live in `tests/cassettes/`; `scripts/bench_replay.py` is
+the CLI for recording new ones and printing a report. Files named `synthetic_*`
+were written by hand in the shape of a real run (their latencies are round
+guesses), so only the overhead figures replayed from them are meaningful.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from floret import agent as agent_mod
+from floret.agent import AgentHooks, current_hooks, using_hooks
+from floret.memo import memo_key
+from floret.routing import RoutingPreferences
+from floret.tools.jobs import JobScope
+from floret.toolset import ToolResult
+
+
+class CassetteMismatch(Exception):
+    """The replayed run asked for something the cassette never recorded."""
+
+
+@dataclass
+class Cassette:
+    name: str
+    messages: list[dict[str, Any]]
+    brain: list[dict[str, Any]] = field(default_factory=list)
+    tools: list[dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Cassette:
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, path: str | Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+
+@dataclass(frozen=True)
+class Latency:
+    """Synthetic upstream latency; None replays the recorded latency x `scale`."""
+
+    brain: float | None = 0.0
+    tool: float | None = 0.0
+    scale: float = 1.0
+
+    def pick(self, fixed: float | None, recorded: float) -> float:
+        return fixed if fixed is not None else recorded * self.scale
+
+
+class _SleepLog:
+    """Wall-clock intervals spent in synthetic upstream latency."""
+
+    def __init__(self) -> None:
+        self._spans: list[tuple[float, float]] = []
+
+    async def sleep(self, seconds: float) -> None:
+        start = time.perf_counter()
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+        self._spans.append((start, time.perf_counter()))
+
+    def busy_seconds(self) -> float:
+        """Length of the union of spans; concurrent tool sleeps overlap."""
+        total = 0.0
+        end = float("-inf")
+        for s, e in sorted(self._spans):
+            if e <= end:
+                continue
+            total += e - max(s, end)
+            end = e
+        return total
+
+
+def _completion(entry: dict[str, Any]) -> Any:
+    calls = [
+        SimpleNamespace(
+            id=c["id"],
+            type="function",
+            function=SimpleNamespace(name=c["name"], arguments=c["arguments"]),
+        )
+        for c in entry.get("tool_calls") or []
+    ]
+    message = SimpleNamespace(content=entry.get("content"), tool_calls=calls or None)
+    usage = SimpleNamespace(prompt_tokens=entry.get("prompt_tokens"))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class _ReplayBrain:
+    def __init__(self, cassette: Cassette, latency: Latency, log: _SleepLog):
+        self._entries = deque(cassette.brain)
+        self._latency = latency
+        self._log = log
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs: Any) -> Any:
+        if not self._entries:
+            raise CassetteMismatch("brain called more often than recorded")
+        entry = self._entries.popleft()
+        await self._log.sleep(
+            self._latency.pick(self._latency.brain, entry.get("latency", 0.0))
+        )
+        return _completion(entry)
+
+
+class _ReplayTools:
+    def __init__(self, cassette: Cassette, latency: Latency, log: _SleepLog):
+        self._by_key: dict[str, deque[dict[str, Any]]] = defaultdict(deque)
+        for entry in cassette.tools:
+            self._by_key[memo_key(entry["name"], entry["args"], None)].append(entry)
+        self._latency = latency
+        self._log = log
+
+    async def dispatch(
+        self,
+        name: str,
+        args: dict[str, Any],
+        routing: RoutingPreferences | None = None,
+        job_scope: JobScope | None = None,
+    ) -> ToolResult:
+        queue = self._by_key.get(memo_key(name, args, None))
+        if not queue:
+            raise CassetteMismatch(f"no recorded result for {name}({args})")
+        entry = queue.popleft() if len(queue) > 1 else queue[0]
+        await self._log.sleep(
+            self._latency.pick(self._latency.tool, entry.get("latency", 0.0))
+        )
+        return ToolResult(brain=entry["brain"], artifacts=list(entry["artifacts"]))
+
+
+@contextlib.contextmanager
+def replaying(
+    cassette: Cassette, latency: Latency | None = None
+) -> Iterator[_SleepLog]:
+    """Serve the agent's brain and tools from `cassette` inside this block."""
+    log = _SleepLog()
+    latency = latency or Latency()
+    brain = _ReplayBrain(cassette, latency, log)
+    tools = _ReplayTools(cassette, latency, log)
+    with using_hooks(AgentHooks(client=lambda: brain, dispatch=tools.dispatch)):
+        yield log
+
+
+class _RecordingBrain:
+    def __init__(self, inner: Any, cassette: Cassette):
+        self._inner = inner
+        self._cassette = cassette
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        completion = await self._inner.chat.completions.create(**kwargs)
+        msg = completion.choices[0].message
+        usage = getattr(completion, "usage", None)
+        self._cassette.brain.append(
+            {
+                "content": msg.content,
+                "tool_calls": [
+                    {
+                        "id": tc.id,
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments,
+                    }
+                    for tc in msg.tool_calls or []
+                ],
+                "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                "latency": round(time.perf_counter() - start, 3),
+            }
+        )
+        return completion
+
+
+@contextlib.contextmanager
+def recording(cassette: Cassette) -> Iterator[Cassette]:
+    """Capture every brain completion and tool result of live runs in this block."""
+    live = current_hooks()
+
+    async def dispatch(
+        name: str,
+        args: dict[str, Any],
+        routing: RoutingPreferences | None = None,
+        job_scope: JobScope | None = None,
+    ) -> ToolResult:
+        start = time.perf_counter()
+        result = await live.dispatch(name, args, routing, job_scope)
+        cassette.tools.append(
+            {
+                "name": name,
+                "args": args,
+                "brain": result.brain,
+                "artifacts": result.artifacts,
+                "latency": round(time.perf_counter() - start, 3),
+            }
+        )
+        return result
+
+    hooks = AgentHooks(
+        client=lambda: _RecordingBrain(live.client(), cassette), dispatch=dispatch
+    )
+    with using_hooks(hooks):
+        yield cassette
+
+
+@dataclass
+class BenchResult:
+    name: str
+    mode: str
+    iterations: int
+    wall_ms: float
+    upstream_ms: float
+    overhead_ms_per_iteration: float
+    peak_memory_kb: float
+    ttfb_ms: float | None = None
+    first_progress_ms: float | None = None
+
+
+def _result(
+    cassette: Cassette,
+    mode: str,
+    iterations: int,
+    wall: float,
+    log: _SleepLog,
+    peak: int,
+) -> BenchResult:
+    upstream = log.busy_seconds()
+    return BenchResult(
+        name=cassette.name,
+        mode=mode,
+        iterations=iterations,
+        wall_ms=wall * 1000,
+        upstream_ms=upstream * 1000,
+        overhead_ms_per_iteration=max(0.0, wall - upstream) * 1000 / max(1, iterations),
+        peak_memory_kb=peak / 1024,
+    )
+
+
+async def bench_loop(cassette: Cassette, latency: Latency | None = None) -> BenchResult:
+    """Replay through `run_agent_events` and measure the loop's own overhead."""
+    tracemalloc.start()
+    try:
+        with replaying(cassette, latency) as log:
+            start = time.perf_counter()
+            final: dict[str, Any] = {}
+            async for event in agent_mod.run_agent_events(list(cassette.messages)):
+                if event["type"] == "final":
+                    final = event
+            wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return _result(cassette, "loop", final.get("iterations", 0), wall, log, peak)
+
+
+async def _asgi_post(
+    app: Any, path: str, body: dict[str, Any], headers: dict[str, str]
+) -> tuple[int, list[tuple[float, bytes]]]:
+    """POST straight into an ASGI app, timestamping every body chunk it sends."""
+    payload = json.dumps(body).encode()
+    sent = False
+    status = 0
+    chunks: list[tuple[float, bytes]] = []
+    done = asyncio.Event()
+
+    async def receive() -> dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                chunks.append((time.perf_counter(), message["body"]))
+            if not message.get("more_body"):
+                done.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+        + [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return status, chunks
+
+
+async def bench_stream(
+    cassette: Cassette, latency: Latency | None = None
+) -> BenchResult:
+    """Replay through the FastAPI app's SSE endpoint; adds time-to-first-byte."""
+    from floret.api import app
+
+    body = {"model": "floret", "messages": cassette.messages, "stream": True}
+    headers = {"authorization": "Bearer ag_replay"}
+    tracemalloc.start()
+    try:
+        with replaying(cassette, latency) as log:
+            start = time.perf_counter()
+            status, chunks = await _asgi_post(
+                app, "/v1/chat/completions", body, headers
+            )
+            wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if status != 200:
+        raise CassetteMismatch(f"stream replay returned HTTP {status}")
+    result = _result(cassette, "stream", len(cassette.brain), wall, log, peak)
+    if chunks:
+        result.ttfb_ms = (chunks[0][0] - start) * 1000
+        # Tool-start frames read "*→ tool…*"; json.dumps escapes the arrow.
+        progress = [t for t, c in chunks if b"\\u2192" in c]
+        if progress:
+            result.first_progress_ms = (progress[0] - start) * 1000
+    return result
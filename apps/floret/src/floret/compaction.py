@@ -0,0 +1,134 @@
+"""Conversation compaction between agent iterations.
+
+The whole `convo` is resent to the brain every turn, and a long video run piles
+up bash logs and search dumps that the brain no longer needs verbatim. Once the
+running prompt size passes `settings.context_budget_tokens`, the oldest tool
+outputs are replaced by short digests that keep what later turns actually refer
+back to: the first line (exit code / status), any URL, and any error line.
+
+Size is tracked in real tokens: every completion's `usage.prompt_tokens` anchors
+the count for the prefix that was sent, and only the messages appended since are
+estimated, using the chars-per-token ratio measured on that same prefix.
+
+Compaction is prefix-friendly: it works oldest-first, never touches the system
+prompt, the user's messages or the most recent tool outputs, never rewrites a
+digest, and shrinks well below the budget so it fires rarely. Between
+compactions the prefix is byte-identical, so upstream prompt caching keeps
+hitting.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_MARK = "[compacted tool output"
+_KEEP_RECENT = 6  # newest tool outputs always kept verbatim
+_MIN_DIGEST_CHARS = 600  # shorter outputs are not worth digesting
+_DIGEST_MAX_LINES = 12
+_LOW_WATER = 0.6  # compact down to this fraction of the budget
+_DEFAULT_CHARS_PER_TOKEN = 4.0
+
+_URL_RE = re.compile(r"https?://\S+|data:[\w/+.-]+;base64")
+_ERROR_RE = re.compile(
+    r"\b(error|failed|failure|exception|traceback|invalid|not found|denied)\b",
+    re.IGNORECASE,
+)
+
+
+def _message_chars(message: dict[str, Any]) -> int:
+    size = len(str(message.get("content") or ""))
+    for call in message.get("tool_calls") or []:
+        fn = call.get("function", {})
+        size += len(fn.get("name", "")) + len(fn.get("arguments", ""))
+    return size
+
+
+def digest(text: str) -> str:
+    """Short stand-in for a tool output: status line, URLs and error lines."""
+    lines = text.splitlines()
+    kept: list[str] = []
+    for line in lines[1:]:
+        stripped = line.strip()
+        if not stripped or stripped in kept:
+            continue
+        if _URL_RE.search(stripped) or _ERROR_RE.search(stripped):
+            kept.append(stripped[:300])
+        if len(kept) >= _DIGEST_MAX_LINES:
+            break
+    head = lines[0][:300] if lines else ""
+    return "\n".join([f"{_DIGEST_MARK}, {len(text)} chars]", head, *kept])
+
+
+class Compactor:
+    """Tracks one run's prompt size and digests old tool outputs past budget."""
+
+    def __init__(self, budget_tokens: int, *, keep_recent: int = _KEEP_RECENT):
+        self.budget_tokens = budget_tokens
+        self.keep_recent = keep_recent
+        self.digested = 0
+        self._chars_per_token = _DEFAULT_CHARS_PER_TOKEN
+        self._anchor_len = 0  # messages covered by the last exact count
+        self._anchor_tokens = 0
+
+    def observe(self, convo: list[dict[str, Any]], sent_len: int, usage: Any) -> None:
+        """Anchor on the exact prompt token count the brain reported."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if not prompt_tokens:
+            return
+        chars = sum(_message_chars(m) for m in convo[:sent_len])
+        if chars:
+            self._chars_per_token = max(1.0, chars / prompt_tokens)
+        self._anchor_len = sent_len
+        self._anchor_tokens = prompt_tokens
+
+    def estimate(self, convo: list[dict[str, Any]]) -> int:
+        """Prompt tokens the next brain call will send."""
+        tail = sum(_message_chars(m) for m in convo[self._anchor_len :])
+        return self._anchor_tokens + math.ceil(tail / self._chars_per_token)
+
+    def compact(self, convo: list[dict[str, Any]]) -> int:
+        """Digest old tool outputs in place; returns the tokens saved."""
+        if self.budget_tokens <= 0:
+            return 0
+        size = self.estimate(convo)
+        if size <= self.budget_tokens:
+            return 0
+
+        tool_indexes = [
+            i
+            for i, m in enumerate(convo)
+            if m.get("role") == "tool"
+            and not str(m.get("content", "")).startswith(_DIGEST_MARK)
+        ]
+        if self.keep_recent:
+            tool_indexes = tool_indexes[: -self.keep_recent]
+
+        target = self.budget_tokens * _LOW_WATER
+        saved = 0
+        for i in tool_indexes:
+            if size - saved <= target:
+                break
+            content = str(convo[i].get("content") or "")
+            if len(content) < _MIN_DIGEST_CHARS:
+                continue
+            short = digest(content)
+            convo[i] = {**convo[i], "content": short}
+            saved += math.floor((len(content) - len(short)) / self._chars_per_token)
+            self.digested += 1
+
+        if saved:
+            # The anchored prefix changed; re-anchor on the estimate.
+            self._anchor_len = len(convo)
+            self._anchor_tokens = size - saved
+            logger.info(
+                "Compacted context: ~%d -> ~%d prompt tokens (%d digests)",
+                size,
+                size - saved,
+                self.digested,
+            )
+        return saved
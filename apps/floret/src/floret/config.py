@@ -39,6 +39,28 @@ class Settings(BaseSettings):
     brain_timeout_seconds: float = Field(
         180.0, validation_alias="POLLI_BRAIN_TIMEOUT_SECONDS"
     )
+    # Process-wide pools (see scheduler.py). max_concurrency above only bounds
+    # tool calls inside one run; these bound the whole container.
+    run_concurrency: int = Field(8, validation_alias="POLLI_RUN_CONCURRENCY")
+    brain_concurrency: int = Field(8, validation_alias="POLLI_BRAIN_CONCURRENCY")
+    media_concurrency: int = Field(16, validation_alias="POLLI_MEDIA_CONCURRENCY")
+    shell_concurrency: int = Field(2, validation_alias="POLLI_SHELL_CONCURRENCY")
+    # Background jobs hold their slot for the whole render (up to an hour), so
+    # they get their own pool instead of starving every run's `bash`.
+    job_concurrency: int = Field(2, validation_alias="POLLI_JOB_CONCURRENCY")
+    upload_concurrency: int = Field(8, validation_alias="POLLI_UPLOAD_CONCURRENCY")
+    queue_max_depth: int = Field(64, validation_alias="POLLI_QUEUE_MAX_DEPTH")
+    queue_max_wait_seconds: float = Field(
+        120.0, validation_alias="POLLI_QUEUE_MAX_WAIT_SECONDS"
+    )
+    # Prompt size at which old tool outputs are digested (see compaction.py);
+    # 0 disables compaction.
+    context_budget_tokens: int = Field(
+        60000, validation_alias="POLLI_CONTEXT_BUDGET_TOKENS"
+    )
+    # Cross-run lifetime of deterministic tool results (list_models, web_search,
+    # transcribe); 0 keeps memoization per-run only. See memo.py.
+    memo_ttl_seconds: float = Field(600.0, validation_alias="POLLI_MEMO_TTL_SECONDS")
     # Local/dev convenience only. When false (the default) a request without a
     # per-request credential fails instead of silently spending the operator's
     # own key — which for a hosted deployment is the whole point.
@@ -105,6 +105,8 @@ model if a tool returns an ERROR.
 authenticate); `bash` has ffmpeg for post-processing (stitch, trim, extract frames, mux audio); \
 `upload_media` publishes a workspace file or data: URI as a public URL — the form other tools \
 need as image inputs. Frame refs you pass to `generate_video` are re-hosted automatically.
+- Long renders: run them with `job_start` (list the final file in `outputs`) instead of \
+`bash`, keep generating the remaining media meanwhile, then `job_wait` for the result.
 - Multi-scene video: generate keyframe images, then clip_i = generate_video(image=K_i, \
 end_image=K_i+1). Models drift off the requested end frame — for seamless joins extract the real \
 last frame (`ffmpeg -sseof -0.1 -i clip.mp4 -update 1 -q:v 1 last.jpg`), upload_media it, and \
@@ -0,0 +1,137 @@
+"""Tool-result memoization in front of `dispatch`.
+
+Identical calls inside one run return the first call's result instead of
+re-running it — including a duplicate issued in the same turn, which waits on
+the in-flight original. Deterministic lookups (`list_models`, `web_search`,
+`transcribe`) are additionally shared across runs for `settings.memo_ttl_seconds`.
+
+Calls are keyed by (tool, canonical JSON args, routed model), so a pinned routing
+preference never serves another model's result. Errors are not memoized: they
+are often transient and the brain should be free to retry them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from floret.config import settings
+from floret.routing import RoutingPreferences
+from floret.toolset import ToolResult
+
+# These touch the shared bash workspace or report live job state, so the same
+# arguments can legitimately produce a different outcome later in the run.
+_UNMEMOIZED = frozenset(
+    {"bash", "upload_media", "fetch_media", "job_start", "job_output", "job_wait"}
+)
+
+# Pure lookups whose answer does not depend on the run that asked.
+_SHARED = frozenset({"list_models", "web_search", "transcribe"})
+
+_SHARED_MAX_ENTRIES = 256
+
+Runner = Callable[[str, dict[str, Any]], Awaitable[ToolResult]]
+
+
+def memo_key(
+    name: str, args: dict[str, Any], routing: RoutingPreferences | None
+) -> str:
+    """SHA-256 of (tool, canonical JSON args, routed model).
+
+    Inline payloads such as data: URIs are part of the hashed JSON, so keys stay
+    fixed-size however large the arguments are.
+    """
+    routed = routing.model_for_tool(name) if routing else None
+    canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+    raw = f"{name}\0{canonical}\0{routed or ''}"
+    return hashlib.sha256(raw.encode("utf-8", "replace")).hexdigest()
+
+
+class _SharedCache:
+    """Cross-run TTL cache, bounded by entry count (oldest evicted first)."""
+
+    def __init__(self, max_entries: int = _SHARED_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, ToolResult]] = OrderedDict()
+
+    def get(self, key: str) -> ToolResult | None:
+        hit = self._entries.get(key)
+        if hit is None:
+            return None
+        expires, result = hit
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: str, result: ToolResult, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+shared_cache = _SharedCache()
+
+
+class ToolMemo:
+    """Per-run memo; `call` is a drop-in for running one tool call."""
+
+    def __init__(self, run: Runner, routing: RoutingPreferences | None) -> None:
+        self._run = run
+        self._routing = routing
+        self._results: dict[str, asyncio.Future[ToolResult]] = {}
+        self.hits = 0
+
+    async def call(self, name: str, args: dict[str, Any]) -> ToolResult:
+        if name in _UNMEMOIZED:
+            return await self._run(name, args)
+        key = memo_key(name, args, self._routing)
+
+        pending = self._results.get(key)
+        if pending is not None:
+            self.hits += 1
+            # The first call already delivered any artifacts; a repeat must not
+            # attach the same media to the reply twice.
+            return ToolResult(brain=(await asyncio.shield(pending)).brain)
+
+        shared = name in _SHARED and settings.memo_ttl_seconds > 0
+        if shared:
+            hit = shared_cache.get(key)
+            if hit is not None:
+                self.hits += 1
+                self._remember(key, hit)
+                return hit
+
+        fut: asyncio.Future[ToolResult] = asyncio.get_running_loop().create_future()
+        self._results[key] = fut
+        try:
+            result = await self._run(name, args)
+        except BaseException as exc:
+            del self._results[key]
+            if isinstance(exc, asyncio.CancelledError):
+                fut.cancel()
+            else:
+                fut.set_exception(exc)
+                fut.exception()  # mark retrieved when no duplicate is waiting
+            raise
+        fut.set_result(result)
+        if result.brain.startswith("ERROR"):
+            del self._results[key]
+        elif shared:
+            shared_cache.put(key, result, settings.memo_ttl_seconds)
+        return result
+
+    def _remember(self, key: str, result: ToolResult) -> None:
+        fut: asyncio.Future[ToolResult] = asyncio.get_running_loop().create_future()
+        fut.set_result(result)
+        self._results[key] = fut
@@ -0,0 +1,202 @@
+"""Process-wide admission control for agent runs and the work they fan out.
+
+`settings.max_concurrency` only bounds tool calls inside one run; nothing else
+stops a burst of runs from saturating the container. Each kind of heavy work
+gets its own `FairPool` — agent runs, brain calls, media generation, bash
+(ffmpeg), background jobs and uploads. A freed slot is handed round-robin across API keys, so a
+few heavy users queue behind each other instead of in front of everyone else.
+Excess work waits a bounded time; past that the pool raises `Overloaded`, which
+the API turns into 429 + Retry-After.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+
+from floret.config import _current_api_key, settings
+
+logger = logging.getLogger(__name__)
+
+# Which pool each tool's work lands in; tools not listed are cheap and unpooled.
+TOOL_POOLS = {
+    "generate_image": "media",
+    "edit_image": "media",
+    "generate_video": "media",
+    "text_to_speech": "media",
+    "transcribe": "media",
+    "web_search": "media",
+    "bash": "shell",
+    "upload_media": "upload",
+    "fetch_media": "upload",
+}
+
+# Smoothing for the rolling slot-hold time behind wait estimates.
+_HOLD_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """A pool is saturated; the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, pool: str, retry_after: float) -> None:
+        super().__init__(
+            f"{pool} capacity exhausted; retry after {math.ceil(retry_after)}s"
+        )
+        self.pool = pool
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class FairPool:
+    """A counting semaphore whose waiters are served round-robin per key."""
+
+    def __init__(
+        self, name: str, capacity: int, *, max_queue: int, max_wait: float
+    ) -> None:
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self._active = 0
+        self._queued = 0
+        self._waiters: OrderedDict[str, deque[asyncio.Future[None]]] = OrderedDict()
+        self._hold_seconds = 1.0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def estimated_wait(self) -> float:
+        """Seconds a new arrival would wait, from the rolling slot-hold time."""
+        if self._active < self.capacity and not self._queued:
+            return 0.0
+        return self._hold_seconds * (self._queued + 1) / self.capacity
+
+    def check(self) -> None:
+        """Raise `Overloaded` now if a new arrival could not be served in time."""
+        wait = self.estimated_wait()
+        if wait and (self._queued >= self.max_queue or wait > self.max_wait):
+            raise Overloaded(self.name, wait)
+
+    async def acquire(self, key: str = "") -> None:
+        if self._active < self.capacity and not self._queued:
+            self._active += 1
+            return
+        if self._queued >= self.max_queue:
+            raise Overloaded(self.name, self.estimated_wait())
+
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(fut)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(fut, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if fut.done() and not fut.cancelled():
+                # Granted in the same tick we gave up: hand the slot on.
+                self.release()
+            else:
+                self._drop(key, fut)
+            if isinstance(exc, asyncio.TimeoutError):
+                logger.warning(
+                    "%s pool: waited %.0fs without a slot (%d queued)",
+                    self.name,
+                    self.max_wait,
+                    self._queued,
+                )
+                raise Overloaded(self.name, self.estimated_wait()) from None
+            raise
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the next key in rotation."""
+        while self._waiters:
+            key, queue = next(iter(self._waiters.items()))
+            fut = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._active -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key: str = "") -> AsyncIterator[None]:
+        await self.acquire(key)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            self._hold_seconds += _HOLD_ALPHA * (held - self._hold_seconds)
+            self.release()
+
+    def _drop(self, key: str, fut: asyncio.Future[None]) -> None:
+        queue = self._waiters.get(key)
+        if queue is None:
+            return
+        try:
+            queue.remove(fut)
+        except ValueError:
+            return  # already popped by release()
+        self._queued -= 1
+        if not queue:
+            del self._waiters[key]
+
+
+class Scheduler:
+    """The named pools shared by every run in this process."""
+
+    def __init__(self) -> None:
+        capacities = {
+            "runs": settings.run_concurrency,
+            "brain": settings.brain_concurrency,
+            "media": settings.media_concurrency,
+            "shell": settings.shell_concurrency,
+            "jobs": settings.job_concurrency,
+            "upload": settings.upload_concurrency,
+        }
+        self.pools = {
+            name: FairPool(
+                name,
+                capacity,
+                max_queue=settings.queue_max_depth,
+                max_wait=settings.queue_max_wait_seconds,
+            )
+            for name, capacity in capacities.items()
+        }
+
+    def pool(self, name: str) -> FairPool:
+        return self.pools[name]
+
+    def slot(
+        self, name: str, key: str | None = None
+    ) -> contextlib.AbstractAsyncContextManager[None]:
+        """Hold a slot in pool `name` on behalf of `key` (default: the caller's key)."""
+        return self.pools[name].slot(_fair_key(key))
+
+    def tool_slot(self, tool: str) -> contextlib.AbstractAsyncContextManager[None]:
+        pool = TOOL_POOLS.get(tool)
+        if pool is None:
+            return contextlib.nullcontext()
+        return self.slot(pool)
+
+
+def _fair_key(key: str | None) -> str:
+    return key if key is not None else (_current_api_key() or "")
+
+
+scheduler = Scheduler()
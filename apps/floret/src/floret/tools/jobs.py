@@ -0,0 +1,313 @@
+"""Background jobs for long-running shell work (ffmpeg renders, batch encodes).
+
+`bash` holds a tool slot until its command exits. `start` returns a job id at
+once so the brain can keep generating images and audio while a render runs;
+`output` tails the job's log incrementally and `wait` blocks on several jobs at
+once. Every job runs under a small accounting wrapper that reports CPU seconds
+and peak RSS for the command's whole process tree, and files listed in
+`outputs` are uploaded to media hosting when the job succeeds, so they reach the
+reply as artifacts without another tool call. Jobs queue for the process-wide
+"jobs" pool rather than "shell", so an hour-long render never holds a slot
+every run's `bash` needs.
+
+Jobs belong to the agent run that started them (`JobScope`): another run cannot
+see or wait on them, and when the run ends its unfinished jobs are killed and
+every job's log and stats files are removed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import signal
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from floret.config import settings
+from floret.scheduler import Overloaded, scheduler
+from floret.tools.shell import _MAX_OUTPUT, _workdir
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_TIMEOUT = 600
+_MAX_TIMEOUT = 3600
+_TAIL_CHARS = 2000  # output tail shown per finished job in `wait`
+
+# Runs the command and records RUSAGE_CHILDREN, which covers every descendant
+# the shell waited for (ffmpeg included). ru_maxrss is KiB on Linux.
+_WRAPPER = (
+    "import json, resource, subprocess, sys\n"
+    "rc = subprocess.call(sys.argv[1], shell=True)\n"
+    "ru = resource.getrusage(resource.RUSAGE_CHILDREN)\n"
+    "with open(sys.argv[2], 'w') as f:\n"
+    "    json.dump({'cpu': ru.ru_utime + ru.ru_stime, 'rss_kb': ru.ru_maxrss}, f)\n"
+    "sys.exit(rc if rc >= 0 else 128 - rc)\n"
+)
+
+_VIDEO_EXTS = (".mp4", ".webm", ".mov", ".mkv", ".gif")
+_AUDIO_EXTS = (".mp3", ".wav", ".ogg", ".m4a", ".flac")
+_IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+@dataclass
+class Job:
+    id: str
+    command: str
+    timeout: int
+    outputs: list[str]
+    log_path: str
+    stats_path: str
+    status: str = "queued"  # queued | running | done | failed | timeout
+    exit_code: int | None = None
+    cpu_seconds: float | None = None
+    peak_rss_mb: float | None = None
+    started: float | None = None
+    finished: float | None = None
+    error: str | None = None
+    artifacts: list[dict[str, Any]] = field(default_factory=list)
+    delivered: bool = False
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task[None] | None = None
+
+    @property
+    def finished_ok(self) -> bool:
+        return self.status == "done"
+
+    def summary(self) -> str:
+        parts = [f"job {self.id}: {self.status}"]
+        if self.exit_code is not None:
+            parts.append(f"exit_code={self.exit_code}")
+        if self.started is not None:
+            end = self.finished or time.monotonic()
+            parts.append(f"elapsed={end - self.started:.1f}s")
+        if self.cpu_seconds is not None:
+            parts.append(f"cpu={self.cpu_seconds:.1f}s")
+        if self.peak_rss_mb is not None:
+            parts.append(f"peak_rss={self.peak_rss_mb:.0f}MB")
+        line = " ".join(parts)
+        if self.error:
+            line += f"\n  {self.error}"
+        for art in self.artifacts:
+            line += f"\n  published {art['type']}: {art['url']}"
+        return line
+
+
+def _jobs_dir() -> str:
+    path = os.path.join(settings.temp_dir, "jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _artifact_for(path: str, url: str) -> dict[str, Any]:
+    low = path.lower()
+    if low.endswith(_VIDEO_EXTS):
+        kind = "video"
+    elif low.endswith(_AUDIO_EXTS):
+        kind = "audio"
+    elif low.endswith(_IMAGE_EXTS):
+        kind = "image"
+    else:
+        kind = "file"
+    return {"type": kind, "url": url}
+
+
+async def _publish_outputs(job: Job) -> None:
+    from floret.tools import media
+
+    for path in job.outputs:
+        try:
+            async with scheduler.slot("upload"):
+                url = await media.upload_media(path)
+        # Reported in the summary; the render itself still succeeded.
+        except (httpx.HTTPError, OSError, ValueError, KeyError) as exc:
+            logger.warning("Job %s: publishing %s failed: %s", job.id, path, exc)
+            job.error = f"publishing {path} failed: {exc}"
+            continue
+        job.artifacts.append(_artifact_for(path, url))
+
+
+async def _run(job: Job) -> None:
+    try:
+        async with scheduler.slot("jobs"):
+            job.status = "running"
+            job.started = time.monotonic()
+            with await asyncio.to_thread(open, job.log_path, "wb") as log:
+                proc = await asyncio.create_subprocess_exec(
+                    sys.executable,
+                    "-c",
+                    _WRAPPER,
+                    job.command,
+                    job.stats_path,
+                    stdout=log,
+                    stderr=asyncio.subprocess.STDOUT,
+                    cwd=_workdir(),
+                    start_new_session=True,
+                )
+                try:
+                    job.exit_code = await asyncio.wait_for(proc.wait(), job.timeout)
+                except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+                    with contextlib.suppress(ProcessLookupError):
+                        os.killpg(proc.pid, signal.SIGKILL)
+                    await proc.wait()
+                    if isinstance(exc, asyncio.CancelledError):
+                        raise
+                    job.status = "timeout"
+                    job.error = f"killed after {job.timeout}s"
+            job.finished = time.monotonic()
+        _read_stats(job)
+        if job.status == "running":
+            job.status = "done" if job.exit_code == 0 else "failed"
+        if job.finished_ok and job.outputs:
+            await _publish_outputs(job)
+    except asyncio.CancelledError:
+        job.status = "failed"
+        job.error = "cancelled"
+        raise
+    except Overloaded as exc:  # never got a slot; the job did not run
+        logger.warning("Job %s not started: %s", job.id, exc)
+        job.status = "failed"
+        job.error = f"not started: {exc}"
+    except OSError as exc:  # the wrapper could not be started
+        logger.warning("Job %s crashed: %s", job.id, exc)
+        job.status = "failed"
+        job.error = str(exc)
+    finally:
+        job.finished = job.finished or time.monotonic()
+        job.done.set()
+
+
+def _read_stats(job: Job) -> None:
+    try:
+        with open(job.stats_path) as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        return  # killed before the wrapper could report
+    job.cpu_seconds = float(stats["cpu"])
+    job.peak_rss_mb = stats["rss_kb"] / 1024
+
+
+def _read_log(job: Job, offset: int, limit: int) -> tuple[str, int, int]:
+    """Return (text, next_offset, total_size) for log bytes from `offset`."""
+    try:
+        size = os.path.getsize(job.log_path)
+    except OSError:
+        return "", offset, 0
+    offset = max(0, min(offset, size))
+    with open(job.log_path, "rb") as f:
+        f.seek(offset)
+        data = f.read(limit)
+    return data.decode("utf-8", "replace"), offset + len(data), size
+
+
+class JobScope:
+    """The background jobs of one agent run."""
+
+    def __init__(self) -> None:
+        self._jobs: dict[str, Job] = {}
+
+    def _get(self, job_id: str) -> Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"unknown job id {job_id!r}")
+        return job
+
+    async def start(
+        self,
+        command: str,
+        timeout: int = _DEFAULT_TIMEOUT,
+        outputs: list[str] | None = None,
+    ) -> str:
+        """Start `command` in the background; returns its job id immediately."""
+        from floret.tools.media import _workspace_path
+
+        timeout = max(1, min(int(timeout), _MAX_TIMEOUT))
+        # Validate declared outputs now rather than after a ten-minute render.
+        resolved = [_workspace_path(p) for p in outputs or []]
+        job_id = f"job-{uuid.uuid4().hex[:8]}"
+        base = os.path.join(_jobs_dir(), job_id)
+        job = Job(
+            id=job_id,
+            command=command,
+            timeout=timeout,
+            outputs=resolved,
+            log_path=f"{base}.log",
+            stats_path=f"{base}.json",
+        )
+        self._jobs[job_id] = job
+        job.task = asyncio.create_task(_run(job))
+        return (
+            f"Started {job_id}. Keep working; use job_output to tail its log and "
+            "job_wait to collect it when you need the result."
+        )
+
+    async def output(
+        self, job_id: str, offset: int = 0, max_chars: int = _MAX_OUTPUT
+    ) -> str:
+        """Job status plus its log from byte `offset`; pass next_offset to continue."""
+        job = self._get(job_id)
+        limit = max(1, min(int(max_chars), _MAX_OUTPUT))
+        text, next_offset, size = _read_log(job, int(offset), limit)
+        parts = [job.summary(), f"output (bytes {offset}-{next_offset} of {size}):"]
+        parts.append(text or "(no new output)")
+        if next_offset < size:
+            parts.append(f"... more output; call again with offset={next_offset}")
+        else:
+            parts.append(f"next_offset: {next_offset}")
+        return "\n".join(parts)
+
+    async def wait(self, job_ids: list[str], timeout: int = 60) -> str:
+        """Block until every listed job finishes or `timeout` seconds pass."""
+        jobs = [self._get(j) for j in job_ids]
+        timeout = max(0, min(int(timeout), _MAX_TIMEOUT))
+        pending = [
+            asyncio.ensure_future(j.done.wait()) for j in jobs if not j.done.is_set()
+        ]
+        if pending:
+            _, still = await asyncio.wait(pending, timeout=timeout)
+            for fut in still:
+                fut.cancel()
+        lines = []
+        for job in jobs:
+            lines.append(job.summary())
+            if job.done.is_set():
+                _, _, size = _read_log(job, 0, 0)
+                tail, _, _ = _read_log(job, size - _TAIL_CHARS, _TAIL_CHARS)
+                if tail:
+                    lines.append(f"  last output:\n{tail}")
+        running = sum(not j.done.is_set() for j in jobs)
+        if running:
+            lines.append(f"{running} job(s) still running; wait again or keep working.")
+        return "\n".join(lines)
+
+    def take_artifacts(self, job_ids: list[str]) -> list[dict[str, Any]]:
+        """Hand over published outputs of finished jobs, each exactly once."""
+        taken: list[dict[str, Any]] = []
+        for job_id in job_ids:
+            job = self._jobs.get(job_id)
+            if job is None or job.delivered or not job.done.is_set():
+                continue
+            taken.extend(job.artifacts)
+            job.delivered = True
+        return taken
+
+    async def close(self) -> None:
+        """Kill unfinished jobs and delete every job's log and stats files."""
+        jobs, self._jobs = list(self._jobs.values()), {}
+        for job in jobs:
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+        await asyncio.gather(
+            *(j.task for j in jobs if j.task is not None), return_exceptions=True
+        )
+        for job in jobs:
+            for path in (job.log_path, job.stats_path):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
@@ -12,7 +12,7 @@ from dataclasses import dataclass, field
 from typing import Any
 
 from floret.routing import RoutingPreferences
-from floret.tools import gen, media, shell
+from floret.tools import gen, jobs, media, shell
 
 logger = logging.getLogger(__name__)
 
@@ -227,6 +227,68 @@ TOOL_SCHEMAS: list[dict[str, Any]] = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "job_start",
+            "description": (
+                "Start a long shell command (ffmpeg render, batch encode) in the "
+                "background and return a job id immediately, so you can keep "
+                "generating while it runs. List final files in `outputs` to have them "
+                "published and attached automatically when the job succeeds."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "command": {"type": "string"},
+                    "timeout": {"type": "integer", "default": 600},
+                    "outputs": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Workspace files to publish on success.",
+                    },
+                },
+                "required": ["command"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "job_output",
+            "description": (
+                "Status, CPU/memory usage and new log output of a background job. "
+                "Pass the returned next_offset to read only what was added since."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "job_id": {"type": "string"},
+                    "offset": {"type": "integer", "default": 0},
+                },
+                "required": ["job_id"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "job_wait",
+            "description": (
+                "Wait until all listed background jobs finish (or `timeout` seconds "
+                "pass); returns each job's status, resource usage, output tail and "
+                "published URLs."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "job_ids": {"type": "array", "items": {"type": "string"}},
+                    "timeout": {"type": "integer", "default": 60},
+                },
+                "required": ["job_ids"],
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
@@ -256,8 +318,13 @@ async def dispatch(
     name: str,
     args: dict[str, Any],
     routing: RoutingPreferences | None = None,
+    job_scope: jobs.JobScope | None = None,
 ) -> ToolResult:
-    """Run one tool call and package brain-text + artifacts."""
+    """Run one tool call and package brain-text + artifacts.
+
+    `job_scope` holds the calling run's background jobs; without one the job_*
+    tools are unavailable.
+    """
     call_args = dict(args)
     selected_model = routing.model_for_tool(name) if routing else None
     if selected_model:
@@ -345,6 +412,11 @@ async def dispatch(
             out = await shell.bash(**args)
             return ToolResult(brain=out)
 
+        if name in ("job_start", "job_output", "job_wait"):
+            if job_scope is None:
+                return ToolResult(brain=f"ERROR: {name} is only available inside a run")
+            return await _job_tool(job_scope, name, args)
+
         if name == "list_models":
             from floret.knowledge import models_summary
 
@@ -358,6 +430,18 @@ async def dispatch(
         return ToolResult(brain=f"ERROR from {name}: {exc}")
 
 
+async def _job_tool(
+    scope: jobs.JobScope, name: str, args: dict[str, Any]
+) -> ToolResult:
+    if name == "job_start":
+        return ToolResult(brain=await scope.start(**args))
+    if name == "job_output":
+        text = await scope.output(**args)
+        return ToolResult(brain=text, artifacts=scope.take_artifacts([args["job_id"]]))
+    text = await scope.wait(**args)
+    return ToolResult(brain=text, artifacts=scope.take_artifacts(args["job_ids"]))
+
+
 def parse_args(raw: str | dict[str, Any]) -> dict[str, Any]:
     if isinstance(raw, dict):
         return raw
@@ -52,7 +52,7 @@ async def test_two_parallel_tool_calls_both_execute(monkeypatch):
     """A single assistant turn with two tool_calls must run BOTH, not just the first."""
     seen: list[dict] = []
 
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         seen.append({"name": name, "args": args})
@@ -90,7 +90,7 @@ async def test_two_parallel_tool_calls_both_execute(monkeypatch):
 
 
 async def test_tool_error_is_fed_back_to_brain(monkeypatch):
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         return ToolResult(brain="ERROR from generate_image: boom", artifacts=[])
@@ -111,10 +111,75 @@ async def test_tool_error_is_fed_back_to_brain(monkeypatch):
     assert result["text"] == "recovered"
 
 
+async def test_saturated_tool_pool_is_a_tool_error_not_a_failed_run(monkeypatch):
+    from floret.scheduler import FairPool
+
+    busy = FairPool("media", 1, max_queue=0, max_wait=5)
+    busy._active = 1  # another run holds the only slot; no room to queue
+    monkeypatch.setitem(agent_mod.scheduler.pools, "media", busy)
+
+    brain = _FakeBrain(
+        [
+            _assistant("trying", [_tool_call("c1", "generate_image", "{}")]),
+            _assistant("media is busy, try again shortly", None),
+        ]
+    )
+    monkeypatch.setattr(agent_mod, "_client", lambda: brain)
+
+    result = await agent_mod.run_agent([{"role": "user", "content": "img"}])
+    tool_msgs = [m for m in brain.calls[1] if m.get("role") == "tool"]
+    assert tool_msgs[0]["content"].startswith(
+        "ERROR: generate_image is at capacity; retry in"
+    )
+    assert result["text"] == "media is busy, try again shortly"
+
+
+async def test_call_queued_for_a_shared_pool_leaves_the_runs_slots_free(monkeypatch):
+    from floret.scheduler import FairPool
+    from floret.toolset import ToolResult
+
+    busy = FairPool("media", 1, max_queue=5, max_wait=5)
+    busy._active = 1
+    monkeypatch.setitem(agent_mod.scheduler.pools, "media", busy)
+    monkeypatch.setattr(agent_mod.settings, "max_concurrency", 1)
+    ran: list[str] = []
+
+    async def dispatch(name, args, routing=None, job_scope=None):
+        ran.append(name)
+        return ToolResult(brain=f"ran {name}")
+
+    monkeypatch.setattr(agent_mod, "dispatch", dispatch)
+    brain = _FakeBrain(
+        [
+            _assistant(
+                "both",
+                [
+                    _tool_call("c1", "generate_image", "{}"),
+                    _tool_call("c2", "list_models", "{}"),
+                ],
+            ),
+            _assistant("done", None),
+        ]
+    )
+    monkeypatch.setattr(agent_mod, "_client", lambda: brain)
+
+    run = asyncio.create_task(agent_mod.run_agent([{"role": "user", "content": "img"}]))
+    for _ in range(100):
+        if ran:
+            break
+        await asyncio.sleep(0.01)
+
+    # The unpooled call ran on the run's only slot while generate_image queued.
+    assert ran == ["list_models"] and busy.queued == 1
+    busy.release()
+    assert (await run)["text"] == "done"
+    assert ran == ["list_models", "generate_image"]
+
+
 async def test_run_agent_events_yields_tool_starts_then_final(monkeypatch):
     """The event stream must announce each tool call and end with the final result."""
 
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         return ToolResult(
@@ -157,7 +222,7 @@ async def test_run_agent_events_yields_tool_starts_then_final(monkeypatch):
 async def test_repeated_identical_calls_inject_guidance(monkeypatch):
     """Identical repeated tool calls must trigger corrective guidance, not a kill."""
 
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         return ToolResult(brain="a video url", artifacts=[])
@@ -188,7 +253,7 @@ async def test_repeated_identical_calls_inject_guidance(monkeypatch):
 
 
 async def test_consecutive_error_turns_inject_guidance(monkeypatch):
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         return ToolResult(brain="ERROR from generate_video: boom", artifacts=[])
@@ -218,7 +283,7 @@ async def test_consecutive_error_turns_inject_guidance(monkeypatch):
 async def test_unpublished_workspace_file_in_final_answer_triggers_nudge(monkeypatch):
     """A final answer referencing final.mp4 without a hosted URL is not done."""
 
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         return ToolResult(
@@ -267,7 +332,7 @@ async def test_final_answer_with_hosted_url_is_not_nudged(monkeypatch):
 async def test_no_nudge_when_deliverable_already_attached(monkeypatch):
     """If a hosted av artifact exists, the deliverable reaches the user anyway."""
 
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         return ToolResult(
@@ -308,7 +373,7 @@ async def test_nudge_emits_visible_stream_event(monkeypatch):
 
 
 async def test_iteration_cap_forces_final_answer(monkeypatch):
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         return ToolResult(brain="ok", artifacts=[])
@@ -333,7 +398,7 @@ async def test_iteration_cap_forces_final_answer(monkeypatch):
 async def test_routing_object_reaches_dispatch(monkeypatch):
     seen = []
 
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         seen.append(routing)
@@ -361,7 +426,7 @@ async def test_routing_object_reaches_dispatch(monkeypatch):
 async def test_concurrent_runs_keep_routing_preferences_isolated(monkeypatch):
     seen = []
 
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         seen.append((args["prompt"], routing))
@@ -417,7 +482,7 @@ async def test_routing_prompt_lists_only_explicit_preferences(monkeypatch):
 
 
 async def test_text_routing_model_reaches_every_brain_call(monkeypatch):
-    async def dispatch(name, args, routing=None):
+    async def dispatch(name, args, routing=None, job_scope=None):
         from floret.toolset import ToolResult
 
         return ToolResult(brain="ok", artifacts=[])
@@ -0,0 +1,96 @@
+"""Offline replay of recorded runs: correctness plus an overhead regression bound."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from floret import agent as agent_mod
+from floret import memo as memo_mod
+from floret.cassette import (
+    Cassette,
+    CassetteMismatch,
+    Latency,
+    bench_loop,
+    bench_stream,
+    recording,
+    replaying,
+)
+
+_CASSETTES = sorted((Path(__file__).parent / "cassettes").glob("*.json"))
+
+# Generous: replay overhead is ~1 ms/iteration; this only trips on regressions
+# like an accidental O(n^2) over the conversation or a blocking call.
+_MAX_OVERHEAD_MS_PER_ITER = 50.0
+
+
+@pytest.fixture(autouse=True)
+def _offline(monkeypatch):
+    monkeypatch.setattr(agent_mod, "build_system_prompt", lambda: "SYSTEM")
+    memo_mod.shared_cache.clear()
+
+
+@pytest.fixture(params=_CASSETTES, ids=lambda p: p.stem)
+def cassette(request) -> Cassette:
+    return Cassette.load(request.param)
+
+
+async def test_replay_reproduces_the_recorded_run(cassette):
+    with replaying(cassette):
+        result = await agent_mod.run_agent(list(cassette.messages))
+
+    assert result["text"] == cassette.brain[-1]["content"]
+    assert result["iterations"] == len(cassette.brain)
+
+
+async def test_loop_overhead_stays_bounded(cassette):
+    r = await bench_loop(cassette, Latency(brain=0.0, tool=0.0))
+
+    assert r.iterations == len(cassette.brain)
+    assert r.overhead_ms_per_iteration < _MAX_OVERHEAD_MS_PER_ITER
+
+
+async def test_stream_reports_time_to_first_byte(cassette):
+    r = await bench_stream(cassette, Latency(brain=0.02, tool=0.0))
+
+    assert r.ttfb_ms is not None and r.first_progress_ms is not None
+    # The role frame must not wait for the first brain turn.
+    assert r.ttfb_ms < r.first_progress_ms
+    assert r.upstream_ms >= 20 * len(cassette.brain) * 0.9
+
+
+async def test_unrecorded_tool_call_is_a_mismatch():
+    cassette = Cassette(
+        name="drift",
+        messages=[{"role": "user", "content": "x"}],
+        brain=[
+            {
+                "content": "",
+                "tool_calls": [
+                    {"id": "c1", "name": "web_search", "arguments": '{"query":"q"}'}
+                ],
+            }
+        ],
+    )
+    with replaying(cassette), pytest.raises(CassetteMismatch):
+        await agent_mod.run_agent(list(cassette.messages))
+
+
+async def test_recording_captures_brain_and_tools():
+    source = Cassette.load(_CASSETTES[0])
+    copy = Cassette(name="copy", messages=source.messages)
+    with replaying(source), recording(copy):
+        await agent_mod.run_agent(list(source.messages))
+
+    assert [b["tool_calls"] for b in copy.brain] == [
+        b["tool_calls"] for b in source.brain
+    ]
+    assert {t["name"] for t in copy.tools} == {t["name"] for t in source.tools}
+
+
+async def test_hooks_are_scoped_to_the_replay_block():
+    live = agent_mod.current_hooks()
+    with replaying(Cassette.load(_CASSETTES[0])):
+        assert agent_mod.current_hooks() is not live
+    assert agent_mod.current_hooks() == live
@@ -0,0 +1,135 @@
+"""Unit tests for conversation compaction (no network)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from floret import agent as agent_mod
+from floret.compaction import Compactor, digest
+from floret.toolset import ToolResult
+
+_LOG = "\n".join(
+    ["exit_code: 0", "stdout:"]
+    + [f"frame={i} fps=30 q=28.0 size={i}kB" for i in range(400)]
+    + [
+        "Uploaded. Public URL: https://media.pollinations.ai/clip7",
+        "[mp4 @ 0x1] Error while writing trailer",
+    ]
+)
+
+
+def _convo(n_tools: int) -> list[dict]:
+    convo = [
+        {"role": "system", "content": "SYSTEM"},
+        {"role": "user", "content": "make a video"},
+    ]
+    for i in range(n_tools):
+        convo.append(
+            {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {
+                        "id": f"c{i}",
+                        "type": "function",
+                        "function": {"name": "bash", "arguments": '{"command":"x"}'},
+                    }
+                ],
+            }
+        )
+        convo.append({"role": "tool", "tool_call_id": f"c{i}", "content": _LOG})
+    return convo
+
+
+def test_digest_keeps_status_urls_and_errors():
+    short = digest(_LOG)
+
+    assert short.startswith("[compacted tool output")
+    assert "exit_code: 0" in short
+    assert "https://media.pollinations.ai/clip7" in short
+    assert "Error while writing trailer" in short
+    assert "frame=200" not in short
+    assert len(short) < 400
+
+
+def test_under_budget_is_left_untouched():
+    convo = _convo(3)
+    before = [dict(m) for m in convo]
+
+    assert Compactor(10**6).compact(convo) == 0
+    assert convo == before
+
+
+def test_over_budget_digests_oldest_and_keeps_recent_and_prefix():
+    convo = _convo(10)
+    compactor = Compactor(20_000, keep_recent=2)
+
+    saved = compactor.compact(convo)
+
+    tools = [m for m in convo if m["role"] == "tool"]
+    assert saved > 0
+    assert tools[0]["content"].startswith("[compacted")
+    assert tools[-1]["content"] == _LOG and tools[-2]["content"] == _LOG
+    assert convo[:2] == _convo(0)
+    assert compactor.estimate(convo) <= 20_000
+
+
+def test_repeat_compaction_does_not_rewrite_digests():
+    convo = _convo(10)
+    compactor = Compactor(20_000, keep_recent=2)
+    compactor.compact(convo)
+    snapshot = [dict(m) for m in convo]
+
+    # Below budget again: nothing changes, so the cached prefix stays identical.
+    assert compactor.compact(convo) == 0
+    assert convo == snapshot
+
+
+def test_reported_usage_anchors_the_estimate():
+    convo = _convo(2)
+    compactor = Compactor(10**6)
+    compactor.observe(convo, len(convo), SimpleNamespace(prompt_tokens=5000))
+
+    assert compactor.estimate(convo) == 5000
+    convo.append({"role": "tool", "tool_call_id": "x", "content": "y" * 1000})
+    # Chars per token measured on the anchored prefix, not a fixed guess.
+    ratio = sum(len(str(m.get("content"))) for m in convo[:-1]) / 5000
+    assert compactor.estimate(convo) > 5000
+    assert abs(compactor.estimate(convo) - (5000 + 1000 / ratio)) < 2
+
+
+async def test_agent_loop_compacts_between_iterations(monkeypatch):
+    async def dispatch(name, args, routing=None, job_scope=None):
+        return ToolResult(brain=_LOG)
+
+    calls = []
+
+    def _msg(content, tool_calls=None):
+        msg = SimpleNamespace(content=content, tool_calls=tool_calls)
+        usage = SimpleNamespace(prompt_tokens=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)], usage=usage)
+
+    def _bash(i):
+        fn = SimpleNamespace(name="bash", arguments=f'{{"command": "render {i}"}}')
+        return SimpleNamespace(id=f"c{i}", type="function", function=fn)
+
+    script = [_msg("go", [_bash(i)]) for i in range(10)] + [_msg("done")]
+
+    async def create(**kwargs):
+        calls.append([dict(m) for m in kwargs["messages"]])
+        return script.pop(0)
+
+    brain = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    monkeypatch.setattr(agent_mod, "build_system_prompt", lambda: "SYSTEM")
+    monkeypatch.setattr(agent_mod, "dispatch", dispatch)
+    monkeypatch.setattr(agent_mod, "_client", lambda: brain)
+    monkeypatch.setattr(agent_mod.settings, "context_budget_tokens", 20_000)
+
+    result = await agent_mod.run_agent([{"role": "user", "content": "video"}])
+
+    assert result["text"] == "done"
+    last_tools = [m["content"] for m in calls[-1] if m["role"] == "tool"]
+    assert last_tools[0].startswith("[compacted")
+    assert last_tools[-1] == _LOG
@@ -0,0 +1,192 @@
+"""Unit tests for background shell jobs (real subprocesses, no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+
+import pytest
+
+from floret import toolset
+from floret.tools import jobs, media
+
+
+@pytest.fixture(autouse=True)
+def _workspace(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs.settings, "temp_dir", str(tmp_path))
+    (tmp_path / "workspace").mkdir()
+    return tmp_path / "workspace"
+
+
+@pytest.fixture
+async def scope():
+    scope = jobs.JobScope()
+    yield scope
+    await scope.close()
+
+
+def _job_id(started: str) -> str:
+    match = re.search(r"job-[0-9a-f]{8}", started)
+    assert match, started
+    return match.group(0)
+
+
+async def test_start_returns_immediately_and_wait_reports_accounting(scope):
+    started = await scope.start("sleep 0.2; echo rendered")
+    job_id = _job_id(started)
+    assert not scope._jobs[job_id].done.is_set()
+
+    report = await scope.wait([job_id], timeout=10)
+
+    assert f"job {job_id}: done exit_code=0" in report
+    assert "cpu=" in report and "peak_rss=" in report
+    assert "rendered" in report
+
+
+async def test_output_tails_incrementally(scope):
+    job_id = _job_id(await scope.start("printf 'first\\n'; printf 'second\\n'"))
+    await scope.wait([job_id], timeout=10)
+
+    head = await scope.output(job_id, max_chars=6)
+    assert "first" in head
+    assert "offset=6" in head
+
+    rest = await scope.output(job_id, offset=6)
+    assert "second" in rest and "first" not in rest
+    assert "next_offset: 13" in rest
+
+
+async def test_wait_on_several_jobs_and_failure_status(scope):
+    ok = _job_id(await scope.start("true"))
+    bad = _job_id(await scope.start("exit 3"))
+
+    report = await scope.wait([ok, bad], timeout=10)
+
+    assert f"job {ok}: done" in report
+    assert f"job {bad}: failed exit_code=3" in report
+
+
+async def test_jobs_do_not_take_bash_slots(monkeypatch, scope):
+    from floret.scheduler import FairPool
+
+    shell = FairPool("shell", 1, max_queue=0, max_wait=5)
+    monkeypatch.setitem(jobs.scheduler.pools, "shell", shell)
+    job_id = _job_id(await scope.start("sleep 0.3"))
+    await asyncio.sleep(0.1)
+
+    assert scope._jobs[job_id].status == "running"
+    assert shell.active == 0
+    await scope.wait([job_id], timeout=10)
+
+
+async def test_job_refused_by_a_saturated_pool_is_failed_not_queued(monkeypatch, scope):
+    from floret.scheduler import FairPool
+
+    busy = FairPool("jobs", 1, max_queue=0, max_wait=5)
+    busy._active = 1  # another run's render holds the only slot
+    monkeypatch.setitem(jobs.scheduler.pools, "jobs", busy)
+    job_id = _job_id(await scope.start("echo never"))
+
+    report = await scope.wait([job_id], timeout=10)
+
+    assert f"job {job_id}: failed" in report
+    assert "not started: jobs capacity exhausted" in report
+
+
+async def test_timeout_kills_the_process_group(scope):
+    job_id = _job_id(await scope.start("sleep 30", timeout=1))
+
+    report = await scope.wait([job_id], timeout=10)
+
+    assert f"job {job_id}: timeout" in report
+    assert "killed after 1s" in report
+
+
+async def test_wait_timeout_leaves_job_running(scope):
+    job_id = _job_id(await scope.start("sleep 30"))
+
+    report = await scope.wait([job_id], timeout=0)
+
+    assert "still running" in report
+    task = scope._jobs[job_id].task
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert scope._jobs[job_id].status == "failed"
+
+
+async def test_declared_outputs_are_published_once_as_artifacts(monkeypatch, scope):
+    uploads = []
+
+    async def fake_upload(source, filename=None):
+        uploads.append(source)
+        return "https://media.pollinations.ai/final1"
+
+    monkeypatch.setattr(media, "upload_media", fake_upload)
+
+    started = await toolset.dispatch(
+        "job_start",
+        {"command": "printf data > final.mp4", "outputs": ["final.mp4"]},
+        job_scope=scope,
+    )
+    job_id = _job_id(started.brain)
+
+    waited = await toolset.dispatch(
+        "job_wait", {"job_ids": [job_id], "timeout": 10}, job_scope=scope
+    )
+    again = await toolset.dispatch("job_output", {"job_id": job_id}, job_scope=scope)
+
+    assert len(uploads) == 1 and uploads[0].endswith("final.mp4")
+    assert waited.artifacts == [
+        {"type": "video", "url": "https://media.pollinations.ai/final1"}
+    ]
+    assert again.artifacts == []
+    assert "published video" in again.brain
+
+
+async def test_outputs_outside_workspace_are_rejected(scope):
+    result = await toolset.dispatch(
+        "job_start",
+        {"command": "true", "outputs": ["../../etc/passwd"]},
+        job_scope=scope,
+    )
+    assert result.brain.startswith("ERROR")
+
+
+async def test_unknown_job_id_is_an_error(scope):
+    result = await toolset.dispatch(
+        "job_output", {"job_id": "job-missing"}, job_scope=scope
+    )
+    assert "unknown job id" in result.brain
+
+
+async def test_another_runs_job_id_is_unknown(scope):
+    job_id = _job_id(await scope.start("true"))
+    other = jobs.JobScope()
+
+    result = await toolset.dispatch(
+        "job_wait", {"job_ids": [job_id], "timeout": 1}, job_scope=other
+    )
+
+    assert "unknown job id" in result.brain
+    assert other.take_artifacts([job_id]) == []
+
+
+async def test_job_tools_need_a_run():
+    result = await toolset.dispatch("job_start", {"command": "true"})
+    assert result.brain == "ERROR: job_start is only available inside a run"
+
+
+async def test_close_kills_running_jobs_and_removes_their_files(tmp_path):
+    scope = jobs.JobScope()
+    finished = _job_id(await scope.start("echo done"))
+    running = _job_id(await scope.start("sleep 30"))
+    await scope.wait([finished], timeout=10)
+    task = scope._jobs[running].task
+
+    await scope.close()
+
+    assert task.done()
+    assert list((tmp_path / "jobs").iterdir()) == []
+    with pytest.raises(ValueError, match="unknown job id"):
+        await scope.output(finished)
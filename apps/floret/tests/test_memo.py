@@ -0,0 +1,137 @@
+"""Unit tests for tool-result memoization (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from floret import agent as agent_mod
+from floret import memo as memo_mod
+from floret.memo import ToolMemo, memo_key
+from floret.routing import RoutingPreferences
+from floret.toolset import ToolResult
+
+
+@pytest.fixture(autouse=True)
+def _fresh_shared_cache():
+    memo_mod.shared_cache.clear()
+    yield
+    memo_mod.shared_cache.clear()
+
+
+class _CountingRunner:
+    def __init__(self, brain="ok", delay=0.0):
+        self.calls: list[tuple[str, dict]] = []
+        self._brain = brain
+        self._delay = delay
+
+    async def __call__(self, name, args):
+        self.calls.append((name, args))
+        await asyncio.sleep(self._delay)
+        return ToolResult(
+            brain=self._brain, artifacts=[{"type": "image", "url": "http://x/1"}]
+        )
+
+
+def test_key_ignores_argument_order_but_not_routing():
+    a = memo_key("generate_image", {"prompt": "cat", "n": 2}, None)
+    b = memo_key("generate_image", {"n": 2, "prompt": "cat"}, None)
+    pinned = memo_key(
+        "generate_image",
+        {"prompt": "cat", "n": 2},
+        RoutingPreferences(image_generation="flux"),
+    )
+    assert a == b
+    assert a != pinned
+
+
+async def test_repeat_in_run_is_served_without_artifacts():
+    runner = _CountingRunner()
+    memo = ToolMemo(runner, None)
+
+    first = await memo.call("generate_image", {"prompt": "cat"})
+    second = await memo.call("generate_image", {"prompt": "cat"})
+
+    assert len(runner.calls) == 1
+    assert second.brain == first.brain
+    assert first.artifacts and not second.artifacts
+    assert memo.hits == 1
+
+
+async def test_duplicates_in_one_turn_share_the_in_flight_call():
+    runner = _CountingRunner(delay=0.01)
+    memo = ToolMemo(runner, None)
+
+    results = await asyncio.gather(
+        memo.call("web_search", {"query": "q"}),
+        memo.call("web_search", {"query": "q"}),
+    )
+
+    assert len(runner.calls) == 1
+    assert results[0].brain == results[1].brain
+
+
+async def test_errors_and_workspace_tools_are_rerun():
+    failing = _CountingRunner(brain="ERROR from web_search: boom")
+    memo = ToolMemo(failing, None)
+    await memo.call("web_search", {"query": "q"})
+    await memo.call("web_search", {"query": "q"})
+    assert len(failing.calls) == 2
+
+    shell = _CountingRunner()
+    memo = ToolMemo(shell, None)
+    await memo.call("bash", {"command": "ls"})
+    await memo.call("bash", {"command": "ls"})
+    assert len(shell.calls) == 2
+
+
+async def test_deterministic_tools_are_shared_across_runs(monkeypatch):
+    runner = _CountingRunner()
+    await ToolMemo(runner, None).call("list_models", {"kind": "image"})
+    await ToolMemo(runner, None).call("list_models", {"kind": "image"})
+    assert len(runner.calls) == 1
+
+    # Generation is per-run only.
+    await ToolMemo(runner, None).call("generate_image", {"prompt": "cat"})
+    await ToolMemo(runner, None).call("generate_image", {"prompt": "cat"})
+    assert len(runner.calls) == 3
+
+    monkeypatch.setattr(memo_mod.settings, "memo_ttl_seconds", 0)
+    await ToolMemo(runner, None).call("list_models", {"kind": "video"})
+    await ToolMemo(runner, None).call("list_models", {"kind": "video"})
+    assert len(runner.calls) == 5
+
+
+async def test_agent_loop_does_not_rerun_repeated_calls(monkeypatch):
+    calls = []
+
+    async def dispatch(name, args, routing=None, job_scope=None):
+        calls.append(name)
+        return ToolResult(brain="a video url", artifacts=[])
+
+    def _call(call_id):
+        fn = SimpleNamespace(name="generate_video", arguments='{"prompt": "boat"}')
+        return SimpleNamespace(id=call_id, type="function", function=fn)
+
+    def _msg(content, tool_calls=None):
+        msg = SimpleNamespace(content=content, tool_calls=tool_calls)
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+    script = [_msg("try", [_call("c1")]), _msg("again", [_call("c2")]), _msg("done")]
+
+    async def create(**kwargs):
+        return script.pop(0)
+
+    brain = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    monkeypatch.setattr(agent_mod, "build_system_prompt", lambda: "SYSTEM")
+    monkeypatch.setattr(agent_mod, "dispatch", dispatch)
+    monkeypatch.setattr(agent_mod, "_client", lambda: brain)
+
+    result = await agent_mod.run_agent([{"role": "user", "content": "video"}])
+
+    assert result["text"] == "done"
+    assert calls == ["generate_video"]
@@ -0,0 +1,121 @@
+"""Unit tests for process-wide admission control (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from floret import api as api_mod
+from floret.scheduler import FairPool, Overloaded
+
+
+async def test_waiters_are_served_round_robin_across_keys():
+    pool = FairPool("media", 1, max_queue=10, max_wait=5)
+    order: list[str] = []
+    gate = asyncio.Event()
+
+    async def work(key: str, tag: str) -> None:
+        async with pool.slot(key):
+            order.append(tag)
+            await gate.wait()
+
+    holder = asyncio.create_task(work("heavy", "h0"))
+    await asyncio.sleep(0)
+    # The heavy key queues three calls before the light key shows up once.
+    tasks = [asyncio.create_task(work("heavy", f"h{i}")) for i in range(1, 4)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(work("light", "l1")))
+    await asyncio.sleep(0)
+
+    gate.set()
+    await asyncio.gather(holder, *tasks)
+
+    assert order[:3] == ["h0", "h1", "l1"]
+    assert pool.active == 0 and pool.queued == 0
+
+
+async def test_full_queue_raises_overloaded_immediately():
+    pool = FairPool("shell", 1, max_queue=1, max_wait=5)
+    await pool.acquire("a")
+    waiter = asyncio.create_task(pool.acquire("b"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded) as info:
+        await pool.acquire("c")
+    assert info.value.pool == "shell"
+    assert int(info.value.retry_after_header) >= 1
+
+    pool.release()
+    await waiter
+    pool.release()
+    assert pool.active == 0
+
+
+async def test_bounded_wait_times_out_and_frees_queue_slot():
+    pool = FairPool("brain", 1, max_queue=5, max_wait=0.05)
+    await pool.acquire()
+
+    with pytest.raises(Overloaded):
+        await pool.acquire("late")
+
+    assert pool.queued == 0
+    pool.release()
+    assert pool.active == 0
+
+
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    pool = FairPool("upload", 1, max_queue=5, max_wait=5)
+    await pool.acquire()
+    waiter = asyncio.create_task(pool.acquire("x"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    pool.release()
+    assert (pool.active, pool.queued) == (0, 0)
+
+
+def test_saturated_non_stream_request_gets_429(monkeypatch):
+    async def noop():
+        return None
+
+    async def overloaded_run(messages, **kwargs):
+        raise Overloaded("brain", 7.2)
+
+    monkeypatch.setattr("floret.registry.warm_registry", noop)
+    monkeypatch.setattr(api_mod, "run_agent", overloaded_run)
+
+    response = TestClient(api_mod.app).post(
+        "/v1/chat/completions",
+        json={"model": "floret", "messages": [{"role": "user", "content": "hi"}]},
+        headers={"Authorization": "Bearer ag_test-token"},
+    )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "8"
+
+
+def test_saturated_stream_request_is_refused_before_streaming(monkeypatch):
+    async def noop():
+        return None
+
+    busy = FairPool("runs", 1, max_queue=0, max_wait=5)
+    busy._active = 1  # one run in flight, no room to queue
+    monkeypatch.setattr("floret.registry.warm_registry", noop)
+    monkeypatch.setitem(api_mod.scheduler.pools, "runs", busy)
+
+    response = TestClient(api_mod.app).post(
+        "/v1/chat/completions",
+        json={
+            "model": "floret",
+            "messages": [{"role": "user", "content": "hi"}],
+            "stream": True,
+        },
+        headers={"Authorization": "Bearer ag_test-token"},
+    )
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
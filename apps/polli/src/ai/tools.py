@@ -458,6 +458,14 @@ impact("atomicDeductUserBalance") to see the blast radius.""",
                         "For action=callers/callees/impact: the exact symbol name."
                     ),
                 },
+                "symbols": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": (
+                        "action=callers/callees/impact: several exact symbol names answered in one "
+                        "call (max 20). Use instead of repeating the action per symbol."
+                    ),
+                },
                 "path": {
                     "type": "string",
                     "description": "Repo-relative path. Required for read; scopes grep/list/tree "
@@ -485,6 +485,7 @@ class PolliBot(commands.Bot):
         self._api_server = None
         self._status_bag: list[str] = []
         self._current_status: str | None = None
+        self.code_graph = None
 
     async def setup_hook(self):
         """Called when the bot is starting up."""
@@ -516,6 +517,13 @@ class PolliBot(commands.Bot):
                 backends.append("local clone")
             logger.info("Registered code_search tool handler (%s)", " + ".join(backends))
 
+            # Load the symbol graph once and serve callers/callees/impact from memory.
+            if config.code_search.local_repo_enabled and config.code_search.graph_enabled:
+                from .search import code_graph
+
+                self.code_graph = code_graph.init_service()
+                self.code_graph.schedule_reload()
+
         # Register web_search handler (always available)
         from .ai.client import web_search_handler
 
@@ -598,6 +606,8 @@ class PolliBot(commands.Bot):
         self.rotate_status.cancel()
         if self.issue_notifier:
             await self.issue_notifier.stop()
+        if self.code_graph:
+            await self.code_graph.close()
         if self.webhook_server:
             await stop_webhook_server()
         await pollinations_client.close()
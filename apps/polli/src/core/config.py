@@ -23,6 +23,16 @@ logger = logging.getLogger(__name__)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 CONFIG_PATH = PROJECT_ROOT / "config.json"
 
+# config.json files written before the scrape cache existed have no "scrape_cache" section.
+SCRAPE_CACHE_DEFAULTS = {
+    "enabled": True,
+    "backend": "sqlite",
+    "fresh_seconds": 600,
+    "max_age_seconds": 604800,
+    "max_entries": 2000,
+    "max_mb": 64,
+}
+
 
 @dataclass(frozen=True)
 class BotConfig:
@@ -140,6 +150,16 @@ class CodeSearchConfig:
         )
 
 
+@dataclass(frozen=True)
+class ScrapeCacheConfig:
+    enabled: bool
+    backend: str  # "sqlite" (under paths.data_dir) or "memory"
+    fresh_seconds: int
+    max_age_seconds: int
+    max_entries: int
+    max_mb: int
+
+
 @dataclass(frozen=True)
 class ServerConfig:
     enabled: bool
@@ -167,6 +187,7 @@ class Config:
     github: GitHubConfig
     ai: AIConfig
     code_search: CodeSearchConfig
+    scrape_cache: ScrapeCacheConfig
     api: ServerConfig
     webhook: WebhookConfig
     paths: PathsConfig
@@ -236,6 +257,7 @@ def load_config() -> Config:
     github_raw = raw["github"]
     ai_raw = raw["ai"]
     code_search_raw = raw["code_search"]
+    scrape_cache_raw = {**SCRAPE_CACHE_DEFAULTS, **raw.get("scrape_cache", {})}
     paths_raw = raw["paths"]
 
     return Config(
@@ -304,6 +326,14 @@ def load_config() -> Config:
             cloudflare_account_id=os.getenv("CLOUDFLARE_ACCOUNT_ID", "").strip(),
             cloudflare_api_token=os.getenv("VECTORIZE_API_TOKEN", "").strip(),
         ),
+        scrape_cache=ScrapeCacheConfig(
+            enabled=scrape_cache_raw["enabled"],
+            backend=scrape_cache_raw["backend"],
+            fresh_seconds=scrape_cache_raw["fresh_seconds"],
+            max_age_seconds=scrape_cache_raw["max_age_seconds"],
+            max_entries=scrape_cache_raw["max_entries"],
+            max_mb=scrape_cache_raw["max_mb"],
+        ),
         api=ServerConfig(
             enabled=raw["api"]["enabled"],
             port=raw["api"]["port"],
@@ -5,14 +5,21 @@ Tables render with proper inline markdown — `**bold**`, `*italic*`,
 the rest uses Noto Sans (variable axis weight via Pillow).
 """
 
+import asyncio
+import hashlib
 import io
 import logging
 import re
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import aiohttp
+
 import discord
 
+from ..utils.cache import LRUCache
+
 logger = logging.getLogger(__name__)
 
 # =============================================================================
@@ -28,13 +35,22 @@ except ImportError:
     logger.warning("PIL/pilmoji not installed - table rendering disabled")
 
 try:
-    import cairosvg
-    import requests
+    # Figure (not pyplot) needs no global backend state and renders PNG through Agg.
+    from matplotlib.figure import Figure
 
     LATEX_AVAILABLE = True
 except ImportError:
     LATEX_AVAILABLE = False
-    logger.warning("cairosvg/requests not installed - LaTeX rendering disabled")
+    logger.warning("matplotlib not installed - LaTeX rendering disabled")
+
+try:
+    # Only for formulas mathtext rejects; raises OSError when libcairo is missing.
+    import cairosvg
+
+    SVG_FALLBACK_AVAILABLE = True
+except (ImportError, OSError):
+    SVG_FALLBACK_AVAILABLE = False
+    logger.warning("cairosvg not available - LaTeX mathtext can't parse falls back to a code block")
 
 
 # =============================================================================
@@ -131,30 +147,86 @@ def detect_latex(text: str) -> list[str]:
     return valid_latex
 
 
-def _latex_to_svg(formula: str) -> bytes:
-    if not LATEX_AVAILABLE:
-        return b""
+LATEX_FONT_SIZE = 16
+LATEX_DPI = 150
+LATEX_COLOR = "white"  # Discord dark mode, matching the SVG service's color=white
+# Renders full LaTeX to SVG; used for what mathtext can't parse (matrices, cases, ...).
+LATEX_SVG_SERVICE = "https://math.vercel.app"
+LATEX_SVG_TIMEOUT_SECONDS = 10
+
+# mathtext's parser keeps module-level state and is not thread-safe: one worker, but off
+# the event loop so a formula never stalls other Discord events.
+_LATEX_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="latex")
+# Normalized-formula hash -> PNG bytes. Only successes are kept: a failed fetch from the
+# SVG service may be transient.
+_latex_cache = LRUCache(maxsize=512)
+
+# Multi-line environments mathtext has no parser for. Their rows are drawn as separate
+# mathtext lines instead, which covers the common align/gather case without the network.
+_LINE_ENVIRONMENT = re.compile(
+    r"^\s*\\begin\{(align|aligned|gather|gathered|equation|eqnarray|split|multline)(\*?)\}"
+    r"(.*)\\end\{\1\2\}\s*$",
+    flags=re.DOTALL,
+)
+_ROW_NOISE = re.compile(r"\\(?:nonumber|notag)\b|\\label\{[^}]*\}|(?<!\\)&")
+
+
+def _latex_key(formula: str) -> str:
+    # Whitespace runs are insignificant in math mode; one space keeps "\alpha x" apart from "\alphax".
+    return hashlib.sha256(" ".join(formula.split()).encode("utf-8")).hexdigest()
+
+
+def _mathtext_source(formula: str) -> str:
+    """`formula` as mathtext input: one `$...$` line per row of an align-style environment."""
+    match = _LINE_ENVIRONMENT.match(formula)
+    if not match:
+        return f"${formula}$"
+    rows = (_ROW_NOISE.sub(" ", row).strip() for row in re.split(r"\\\\", match.group(3)))
+    return "\n".join(f"${row}$" for row in rows if row)
+
+
+def _render_latex_png(formula: str) -> bytes:
+    """Render `formula` with matplotlib mathtext. Blocking — runs on `_LATEX_EXECUTOR`."""
     try:
-        encoded = urllib.parse.quote(formula, safe="")
-        url = f"https://math.vercel.app?color=white&from={encoded}.svg"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.content
+        fig = Figure(figsize=(0.01, 0.01))
+        fig.text(0, 0, _mathtext_source(formula), fontsize=LATEX_FONT_SIZE, color=LATEX_COLOR)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=LATEX_DPI, transparent=True, bbox_inches="tight", pad_inches=0.08)
+        return buffer.getvalue()
     except Exception as e:
-        logger.error(f"Failed to fetch SVG for LaTeX: {e}")
+        logger.warning(f"mathtext cannot render LaTeX {formula!r}: {e}")
         return b""
 
 
-def _svg_to_png(svg_data: bytes) -> bytes:
-    if not LATEX_AVAILABLE or not svg_data:
+async def _render_latex_remote(formula: str) -> bytes:
+    """Fetch `formula` as SVG from `LATEX_SVG_SERVICE` and rasterize it off the event loop."""
+    if not SVG_FALLBACK_AVAILABLE:
         return b""
+    url = f"{LATEX_SVG_SERVICE}?color={LATEX_COLOR}&from={urllib.parse.quote(formula, safe='')}.svg"
     try:
-        return cairosvg.svg2png(bytestring=svg_data, scale=1)
+        timeout = aiohttp.ClientTimeout(total=LATEX_SVG_TIMEOUT_SECONDS)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                svg = await response.read()
+        return await asyncio.to_thread(cairosvg.svg2png, bytestring=svg, scale=1)
     except Exception as e:
-        logger.error(f"Failed to convert SVG to PNG: {e}")
+        logger.error(f"LaTeX SVG fallback failed for {formula!r}: {e}")
         return b""
 
 
+async def _latex_png(formula: str) -> bytes:
+    key = _latex_key(formula)
+    png = _latex_cache.get(key)
+    if png is None:
+        png = await asyncio.get_running_loop().run_in_executor(_LATEX_EXECUTOR, _render_latex_png, formula)
+        if not png:
+            png = await _render_latex_remote(formula)
+        if png:
+            _latex_cache.set(key, png)
+    return png
+
+
 async def convert_latex_to_png(latex: str) -> tuple[io.BytesIO | str, bool]:
     if not LATEX_AVAILABLE:
         return f"LaTeX rendering unavailable. Use: $${latex}$$", True
@@ -176,11 +248,7 @@ async def convert_latex_to_png(latex: str) -> tuple[io.BytesIO | str, bool]:
         elif latex.startswith(r"\[") and latex.endswith(r"\]"):
             latex = latex[2:-2]
 
-        svg_bytes = _latex_to_svg(latex)
-        if not svg_bytes:
-            return f"```\n${latex}$\n```", True
-
-        png_bytes = _svg_to_png(svg_bytes)
+        png_bytes = await _latex_png(latex)
         if not png_bytes:
             return f"```\n${latex}$\n```", True
 
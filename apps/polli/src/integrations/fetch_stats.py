@@ -0,0 +1,120 @@
+"""Per-host success and latency statistics for the web scraper's fetcher layers.
+
+`scrape_url` has several ways to fetch a page (rnet, scrapling, Jina, crawl4ai) and hosts
+differ wildly in which one works: some serve rnet happily, some always need a real browser.
+Walking the chain in a fixed order makes a browser-only host pay for every failed attempt
+in front of it, on every scrape.
+
+Each (host, layer) pair keeps exponentially decayed success/failure weights and a window of
+recent successful latencies. `order()` ranks layers by expected time to a usable result
+(median latency / success rate) and drops layers that keep failing on the host. Weights
+halve every `HALF_LIFE_SECONDS`, so a skipped layer drops back below the evidence threshold
+and gets retried — hosts recover from a bad hour.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from statistics import median
+
+from ..utils.cache import LRUCache
+
+HALF_LIFE_SECONDS = 6 * 3600
+# A layer is skipped on a host once it has at least this much (decayed) evidence...
+SKIP_MIN_ATTEMPTS = 3.0
+# ...and succeeds less often than this.
+SKIP_MAX_SUCCESS_RATE = 0.2
+# Decay starts the moment an outcome is recorded, so three back-to-back failures add up to
+# a hair under 3.0. Outcomes within about half an hour of each other count in full.
+_DECAY_SLACK = 0.05
+LATENCY_WINDOW = 32
+MAX_HOSTS = 2048
+
+# Uninformed prior: half a success, half a failure — enough that one result moves the rate.
+_PRIOR_WEIGHT = 0.5
+
+
+class LayerStats:
+    """Decayed outcome counts and recent latencies for one layer on one host."""
+
+    __slots__ = ("successes", "failures", "latencies", "_updated")
+
+    def __init__(self) -> None:
+        self.successes = 0.0
+        self.failures = 0.0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._updated = time.monotonic()
+
+    def _decay(self, now: float) -> None:
+        factor = math.pow(0.5, (now - self._updated) / HALF_LIFE_SECONDS)
+        self.successes *= factor
+        self.failures *= factor
+        self._updated = now
+
+    def record(self, ok: bool, seconds: float, now: float | None = None) -> None:
+        self._decay(time.monotonic() if now is None else now)
+        if ok:
+            self.successes += 1
+            self.latencies.append(seconds)
+        else:
+            self.failures += 1
+
+    def attempts(self, now: float | None = None) -> float:
+        self._decay(time.monotonic() if now is None else now)
+        return self.successes + self.failures
+
+    def success_rate(self, now: float | None = None) -> float:
+        self._decay(time.monotonic() if now is None else now)
+        return (self.successes + _PRIOR_WEIGHT) / (self.successes + self.failures + 2 * _PRIOR_WEIGHT)
+
+    def latency_quantile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class FetcherStats:
+    """Per-host `LayerStats`, bounded to the most recently scraped hosts."""
+
+    def __init__(self, max_hosts: int = MAX_HOSTS):
+        self._hosts = LRUCache(maxsize=max_hosts)
+
+    def layer(self, host: str, layer: str) -> LayerStats:
+        layers: dict[str, LayerStats] | None = self._hosts.get(host)
+        if layers is None:
+            layers = {}
+            self._hosts.set(host, layers)
+        stats = layers.get(layer)
+        if stats is None:
+            stats = layers[layer] = LayerStats()
+        return stats
+
+    def record(self, host: str, layer: str, ok: bool, seconds: float) -> None:
+        self.layer(host, layer).record(ok, seconds)
+
+    def order(self, host: str, layers: dict[str, float]) -> list[str]:
+        """`layers` (name -> default latency guess, in preference order) ranked for `host`.
+
+        Layers failing persistently on this host are left out; the result may be empty,
+        which means "go straight to the last-resort fetcher".
+        """
+        now = time.monotonic()
+        ranked: list[tuple[float, int, str]] = []
+        for position, (name, default_latency) in enumerate(layers.items()):
+            stats = self.layer(host, name)
+            rate = stats.success_rate(now)
+            if stats.attempts(now) + _DECAY_SLACK >= SKIP_MIN_ATTEMPTS and rate < SKIP_MAX_SUCCESS_RATE:
+                continue
+            latency = median(stats.latencies) if stats.latencies else default_latency
+            ranked.append((latency / rate, position, name))
+        return [name for _, _, name in sorted(ranked)]
+
+    def latency_quantile(self, host: str, layer: str, q: float) -> float | None:
+        """Recent successful latency at quantile `q` for `layer` on `host`, if known."""
+        return self.layer(host, layer).latency_quantile(q)
+
+
+fetcher_stats = FetcherStats()
@@ -4,17 +4,86 @@ Each changed file is reviewed concurrently, then the per-file findings are synth
 into one report — so latency stays roughly flat as PR size grows, instead of one blocking
 call over the whole diff.
 
-Mixed into GitHubPRManager; relies on the host class for `get_pr` and `get_pr_diff`.
+Re-reviews are incremental. Every file's formatted hunks are hashed, and each reviewed batch
+is remembered under the PR's head SHA together with the hashes it covered. After a fixup
+push, a batch whose files all still hash the same is reused as-is; only files whose hunks
+changed (plus the small files that shared a batch with them) go back to the model. A
+re-review at the same head SHA returns the stored report without downloading the diff.
+
+Files are reviewed as the diff streams in: batches start while later files are still
+downloading, and the full diff is never buffered.
+
+Mixed into GitHubPRManager; relies on the host class for `get_pr` and `iter_pr_diff`.
 """
 
 import asyncio
+import hashlib
 import logging
+from dataclasses import dataclass, field
 
 from ...core.config import config
+from ...utils.cache import TTLCache
 from ...utils.regex import re
 
 logger = logging.getLogger(__name__)
 
+# Active PRs get fixup pushes over days, not minutes.
+REVIEW_CACHE_TTL_SECONDS = 3 * 24 * 3600
+
+
+@dataclass
+class _ReviewState:
+    """What the last review of one PR saw and concluded."""
+
+    head_sha: str
+    batches: list[dict] = field(default_factory=list)  # successful batch results, with "hunks"
+    review: str | None = None  # final report; None if some batch errored
+    file_count: int = 0
+
+
+_review_cache = TTLCache(maxsize=256, ttl=REVIEW_CACHE_TTL_SECONDS)
+
+
+@dataclass
+class _StreamReview:
+    file_count: int = 0
+    cached_files: int = 0
+    cached: list[dict] = field(default_factory=list)  # reused batch results
+    fresh: list[dict] = field(default_factory=list)  # batch results from this run
+
+
+class _BatchPacker:
+    """Groups small files so trivial diffs don't each burn a full LLM call.
+
+    Emits each batch as soon as it is full. Large and high-priority files go out alone
+    immediately; small ones are packed together up to the char budget regardless of where
+    they sit in diff order, so a small file between two solo ones is not isolated.
+    """
+
+    def __init__(self, solo_chars: int, budget_chars: int):
+        self.solo_chars = solo_chars
+        self.budget_chars = budget_chars
+        self._batch: list[dict] = []
+        self._chars = 0
+
+    def add(self, f: dict) -> list[list[dict]]:
+        size = len(f["diff"])
+        if size >= self.solo_chars or f["high_priority"]:
+            return [[f]]
+        out: list[list[dict]] = []
+        if self._batch and self._chars + size > self.budget_chars:
+            out.append(self._batch)
+            self._batch, self._chars = [], 0
+        self._batch.append(f)
+        self._chars += size
+        return out
+
+    def flush(self) -> list[list[dict]]:
+        out = [self._batch] if self._batch else []
+        self._batch, self._chars = [], 0
+        return out
+
+
 # Files whose diffs carry no review value.
 SKIP_FILE_PATTERNS = [
     re.compile(r"package-lock\.json$"),
@@ -69,39 +138,66 @@ class PRReviewMixin:
         if pr.get("error"):
             return pr
 
-        # Get PR diff
-        diff_result = await self.get_pr_diff(pr_number)
-        if diff_result.get("error"):
-            return diff_result
-
-        diff = diff_result.get("diff", "")
-        if not diff:
-            return {"error": "No diff available for this PR"}
-
-        files = self._split_diff_by_file(diff)
-        if not files:
-            return {"error": "No reviewable code files in this PR"}
-
-        try:
-            file_findings = await self._review_files_concurrently(files)
-        except Exception as e:
-            logger.error(f"Error generating PR review: {e}")
-            return {"error": f"Failed to generate review: {str(e)}"}
-
-        reviewed = [f for f in file_findings if f["findings"] and not f.get("error")]
-        errored = [f for f in file_findings if f.get("error")]
-
-        if not reviewed and errored:
-            return {"error": f"Failed to review any files ({len(errored)} errors)"}
+        cache_key = f"{self.repo}#{pr_number}"
+        head_sha = pr.get("head", {}).get("sha", "")
+        previous: _ReviewState | None = _review_cache.get(cache_key)
+
+        if previous and previous.review and head_sha and previous.head_sha == head_sha:
+            # Nothing was pushed since the last complete review: skip the diff and the model.
+            logger.info("PR #%s unchanged at %s, reusing the previous review", pr_number, head_sha)
+            review_text = previous.review
+            file_count = cached_files = previous.file_count
+        else:
+            try:
+                stream = await self._review_diff_stream(pr_number, previous)
+            except RuntimeError as e:
+                return {"error": str(e)}
+            except Exception as e:
+                logger.error(f"Error generating PR review: {e}")
+                return {"error": f"Failed to generate review: {str(e)}"}
+
+            if not stream.file_count:
+                return {"error": "No reviewable code files in this PR"}
+            file_count, cached_files = stream.file_count, stream.cached_files
+
+            # New head, same hunks (e.g. a rebase without conflicts): the previous report still holds.
+            if previous and previous.review and not stream.fresh and len(stream.cached) == len(previous.batches):
+                review_text = previous.review
+                previous.head_sha = head_sha
+                _review_cache.set(cache_key, previous)
+            else:
+                file_findings = stream.cached + stream.fresh
+                reviewed = [f for f in file_findings if f["findings"] and not f.get("error")]
+                errored = [f for f in file_findings if f.get("error")]
 
-        try:
-            review_text = await self._synthesize_review(pr, reviewed, errored)
-        except Exception as e:
-            logger.error(f"Error synthesizing PR review: {e}")
-            return {"error": f"Failed to synthesize review: {str(e)}"}
+                if not reviewed and errored:
+                    return {"error": f"Failed to review any files ({len(errored)} errors)"}
 
-        if not review_text:
-            return {"error": "Failed to generate review"}
+                try:
+                    review_text = await self._synthesize_review(pr, reviewed, errored)
+                except Exception as e:
+                    logger.error(f"Error synthesizing PR review: {e}")
+                    return {"error": f"Failed to synthesize review: {str(e)}"}
+
+                if not review_text:
+                    return {"error": "Failed to generate review"}
+
+                _review_cache.set(
+                    cache_key,
+                    _ReviewState(
+                        head_sha=head_sha,
+                        batches=[f for f in file_findings if not f.get("error")],
+                        review=None if errored else review_text,
+                        file_count=file_count,
+                    ),
+                )
+                logger.info(
+                    "Reviewed PR #%s at %s: %d file(s) sent to the model, %d reused",
+                    pr_number,
+                    head_sha,
+                    file_count - cached_files,
+                    cached_files,
+                )
 
         result = {
             "success": True,
@@ -109,7 +205,8 @@ class PRReviewMixin:
             "pr_title": pr["title"],
             "pr_url": pr["url"],
             "review": review_text,
-            "files_reviewed": len(files),
+            "files_reviewed": file_count,
+            "files_from_cache": cached_files,
             "posted_to_github": False,
         }
 
@@ -133,33 +230,21 @@ class PRReviewMixin:
     # not just above zero, or every file ends up solo regardless of how trivial it is.
     MIN_HUNK_CHARS_FOR_SOLO_REVIEW = 2500
 
-    def _split_diff_by_file(self, diff_text: str) -> list[dict]:
-        """Split a unified diff into per-file formatted hunks (PR-Agent style)."""
-        files = []
-        current_lines: list[str] = []
-        current_filename = None
-
-        def _flush():
-            if current_filename and current_lines and not self._should_skip_file(current_filename):
-                formatted = self._format_file_hunks(current_filename, "\n".join(current_lines))
-                if formatted:
-                    files.append({
-                        "filename": current_filename,
-                        "diff": formatted,
-                        "high_priority": self._is_high_priority(current_filename),
-                    })
-
-        for line in diff_text.split("\n"):
-            if line.startswith("diff --git"):
-                _flush()
-                current_lines = [line]
-                match = re.match(r"diff --git a/(.*?) b/(.*)", line)
-                current_filename = match.group(2) if match else "unknown"
-            else:
-                current_lines.append(line)
+    BATCH_CHAR_BUDGET = 6000
 
-        _flush()
-        return files
+    def _file_entry(self, filename: str, patch: str) -> dict | None:
+        """One file's formatted hunks, or None if the file is skipped or has nothing to review."""
+        if self._should_skip_file(filename):
+            return None
+        formatted = self._format_file_hunks(filename, patch)
+        if not formatted:
+            return None
+        return {
+            "filename": filename,
+            "diff": formatted,
+            "hunk_hash": hashlib.sha256(formatted.encode()).hexdigest()[:16],
+            "high_priority": self._is_high_priority(filename),
+        }
 
     def _is_high_priority(self, filename: str) -> bool:
         # Match whole path segments / word boundaries — a plain substring check on "api"
@@ -168,67 +253,88 @@ class PRReviewMixin:
         segments = re.split(r"[/._-]", filename.lower())
         return any(pattern in segments for pattern in HIGH_PRIORITY_PATTERNS)
 
-    def _batch_files(self, files: list[dict]) -> list[list[dict]]:
-        """Group small files together so trivial diffs don't each burn a full LLM call.
+    async def _review_diff_stream(self, pr_number: int, previous: _ReviewState | None) -> _StreamReview:
+        """Review files while the diff is still downloading.
 
-        Solo (large/high-priority) and batchable files are typically interleaved in diff
-        order — greedily scanning in order would isolate every small file that happens to
-        sit between two solo ones. Partition first, then pack the batchable files together
-        regardless of their original position.
+        Each file is formatted as soon as its section arrives and handed to a `_BatchPacker`;
+        every batch it emits starts reviewing immediately (bounded by REVIEW_CONCURRENCY).
+        Files that belong to a cached batch from `previous` are held back until the whole
+        batch has arrived unchanged — then its findings are reused; any mismatch releases the
+        held files for review.
         """
-        solo = [[f] for f in files if len(f["diff"]) >= self.MIN_HUNK_CHARS_FOR_SOLO_REVIEW or f["high_priority"]]
-        batchable = [f for f in files if len(f["diff"]) < self.MIN_HUNK_CHARS_FOR_SOLO_REVIEW and not f["high_priority"]]
-
-        batches: list[list[dict]] = list(solo)
-        current_batch: list[dict] = []
-        current_chars = 0
-        BATCH_CHAR_BUDGET = 6000
-
-        for f in batchable:
-            hunk_len = len(f["diff"])
-            if current_batch and current_chars + hunk_len > BATCH_CHAR_BUDGET:
-                batches.append(current_batch)
-                current_batch, current_chars = [], 0
+        semaphore = asyncio.Semaphore(self.REVIEW_CONCURRENCY)
+        packer = _BatchPacker(self.MIN_HUNK_CHARS_FOR_SOLO_REVIEW, self.BATCH_CHAR_BUDGET)
+        tasks: list[asyncio.Task] = []
+        result = _StreamReview()
 
-            current_batch.append(f)
-            current_chars += hunk_len
+        old_batches = previous.batches if previous else []
+        owner = {name: i for i, batch in enumerate(old_batches) for name in batch["hunks"]}
+        held: dict[int, list[dict]] = {}
+        broken: set[int] = set()
 
-        if current_batch:
-            batches.append(current_batch)
+        def _submit(f: dict) -> None:
+            for batch in packer.add(f):
+                tasks.append(asyncio.create_task(self._review_batch(batch, semaphore)))
 
-        return batches
+        try:
+            async for filename, patch in self.iter_pr_diff(pr_number):
+                f = self._file_entry(filename, patch)
+                if f is None:
+                    continue
+                result.file_count += 1
+                i = owner.get(filename)
+                if i is not None and i not in broken:
+                    hunks = old_batches[i]["hunks"]
+                    if hunks[filename] == f["hunk_hash"]:
+                        held.setdefault(i, []).append(f)
+                        if len(held[i]) == len(hunks):
+                            result.cached.append({**old_batches[i], "cached": True})
+                            result.cached_files += len(held.pop(i))
+                        continue
+                    broken.add(i)
+                    for g in held.pop(i, []):
+                        _submit(g)
+                _submit(f)
+
+            # A batch partner left the PR: the held files can't reuse its findings.
+            for files in held.values():
+                for g in files:
+                    _submit(g)
+            for batch in packer.flush():
+                tasks.append(asyncio.create_task(self._review_batch(batch, semaphore)))
+            result.fresh = list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return result
 
-    async def _review_files_concurrently(self, files: list[dict]) -> list[dict]:
-        """Review each file (or small-file batch) concurrently, bounded by a semaphore."""
+    async def _review_batch(self, batch: list[dict], semaphore: asyncio.Semaphore) -> dict:
+        """Review one file or small-file batch; errors come back in the result, not raised."""
         from ...ai.client import pollinations_client
 
-        batches = self._batch_files(files)
-        semaphore = asyncio.Semaphore(self.REVIEW_CONCURRENCY)
-
-        async def _review_batch(batch: list[dict]) -> dict:
-            filenames = [f["filename"] for f in batch]
-            combined_diff = "".join(f["diff"] for f in batch)
-            high_priority = any(f["high_priority"] for f in batch)
+        filenames = [f["filename"] for f in batch]
+        hunks = {f["filename"]: f["hunk_hash"] for f in batch}
+        combined_diff = "".join(f["diff"] for f in batch)
+        high_priority = any(f["high_priority"] for f in batch)
+
+        async with semaphore:
+            try:
+                response = await pollinations_client.generate_text(
+                    system_prompt=self._get_file_review_system_prompt(),
+                    user_prompt=combined_diff,
+                    model=config.ai.model,
+                    temperature=0.2,
+                    max_tokens=1024,
+                )
+            except Exception as e:
+                return {"filenames": filenames, "findings": "", "high_priority": high_priority, "error": str(e)}
 
-            async with semaphore:
-                try:
-                    response = await pollinations_client.generate_text(
-                        system_prompt=self._get_file_review_system_prompt(),
-                        user_prompt=combined_diff,
-                        model=config.ai.model,
-                        temperature=0.2,
-                        max_tokens=1024,
-                    )
-                except Exception as e:
-                    return {"filenames": filenames, "findings": "", "high_priority": high_priority, "error": str(e)}
-
-            if not response:
-                return {"filenames": filenames, "findings": "", "high_priority": high_priority, "error": "empty response"}
-
-            findings = self._parse_review(response)
-            return {"filenames": filenames, "findings": findings, "high_priority": high_priority}
+        if not response:
+            return {"filenames": filenames, "findings": "", "high_priority": high_priority, "error": "empty response"}
 
-        return await asyncio.gather(*(_review_batch(b) for b in batches))
+        findings = self._parse_review(response)
+        return {"filenames": filenames, "findings": findings, "high_priority": high_priority, "hunks": hunks}
 
     async def _synthesize_review(self, pr: dict, reviewed: list[dict], errored: list[dict]) -> str | None:
         """Merge per-file findings into one deduped, severity-ordered report."""
@@ -242,7 +348,9 @@ class PRReviewMixin:
             return summary
 
         findings_blob = "\n\n".join(
-            f"### {', '.join(f['filenames'])}{' [security-sensitive]' if f['high_priority'] else ''}\n{f['findings']}"
+            f"### {', '.join(f['filenames'])}"
+            f"{' [security-sensitive]' if f['high_priority'] else ''}"
+            f"{' [unchanged since last review]' if f.get('cached') else ''}\n{f['findings']}"
             for f in clean
         )
 
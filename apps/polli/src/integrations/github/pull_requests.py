@@ -1,15 +1,23 @@
+import asyncio
 import logging
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
 
 import aiohttp
 
 from ...core.config import config
+from ...utils.regex import re
 from .auth import get_github_token, has_github_auth
 from .graphql import github_graphql
 from .pr_review import PRReviewMixin
 
 logger = logging.getLogger(__name__)
 
+# The files endpoint serves at most 3000 files, 100 per page.
+FILES_PER_PAGE = 100
+MAX_FILE_PAGES = 30
+FILE_PAGE_CONCURRENCY = 4
+
 
 @dataclass
 class FilePatch:
@@ -255,40 +263,65 @@ class GitHubPRManager(PRReviewMixin):
             logger.error(f"Error listing PRs: {e}")
             return {"error": str(e)}
 
+    async def _get_pr_files_page(self, pr_number: int, page: int) -> tuple[int, list[dict], int]:
+        """One page of the files endpoint: (status, files, last page number)."""
+        url = f"https://api.github.com/repos/{self.repo}/pulls/{pr_number}/files"
+        session = await self.get_session()
+        params = {"per_page": FILES_PER_PAGE, "page": page}
+        async with session.get(url, params=params, headers=await self._get_headers()) as response:
+            if response.status != 200:
+                return response.status, [], page
+            data = await response.json()
+            last = response.links.get("last", {}).get("url")
+            last_page = int(last.query.get("page", page)) if last is not None else page
+            return 200, data, min(last_page, MAX_FILE_PAGES)
+
     async def get_pr_files(self, pr_number: int) -> dict:
-        """Get files changed in a PR using REST API (GraphQL doesn't expose patches)."""
+        """Get files changed in a PR using REST API (GraphQL doesn't expose patches).
+
+        Follows every page — the first response's Link header names the last page, and the
+        rest are fetched concurrently.
+        """
         if not has_github_auth():
             return {"error": "GitHub token not configured"}
 
-        url = f"https://api.github.com/repos/{self.repo}/pulls/{pr_number}/files?per_page=100"
-
         try:
-            session = await self.get_session()
-            async with session.get(url, headers=await self._get_headers()) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    files = [
-                        {
-                            "filename": f["filename"],
-                            "status": f["status"],
-                            "additions": f["additions"],
-                            "deletions": f["deletions"],
-                            "changes": f["changes"],
-                            "patch": f.get("patch") or None,
-                        }
-                        for f in data
-                    ]
-                    return {
-                        "pr_number": pr_number,
-                        "files": files,
-                        "count": len(files),
-                        "total_additions": sum(f["additions"] for f in files),
-                        "total_deletions": sum(f["deletions"] for f in files),
-                    }
-                elif response.status == 404:
-                    return {"error": f"PR #{pr_number} not found", "not_found": True}
-                else:
-                    return {"error": f"GitHub API error: {response.status}"}
+            status, data, last_page = await self._get_pr_files_page(pr_number, 1)
+            if status == 404:
+                return {"error": f"PR #{pr_number} not found", "not_found": True}
+            if status != 200:
+                return {"error": f"GitHub API error: {status}"}
+
+            if last_page > 1:
+                semaphore = asyncio.Semaphore(FILE_PAGE_CONCURRENCY)
+
+                async def _page(page: int) -> tuple[int, list[dict], int]:
+                    async with semaphore:
+                        return await self._get_pr_files_page(pr_number, page)
+
+                for page_status, page_data, _ in await asyncio.gather(*(_page(p) for p in range(2, last_page + 1))):
+                    if page_status != 200:
+                        return {"error": f"GitHub API error: {page_status}"}
+                    data.extend(page_data)
+
+            files = [
+                {
+                    "filename": f["filename"],
+                    "status": f["status"],
+                    "additions": f["additions"],
+                    "deletions": f["deletions"],
+                    "changes": f["changes"],
+                    "patch": f.get("patch") or None,
+                }
+                for f in data
+            ]
+            return {
+                "pr_number": pr_number,
+                "files": files,
+                "count": len(files),
+                "total_additions": sum(f["additions"] for f in files),
+                "total_deletions": sum(f["deletions"] for f in files),
+            }
         except Exception as e:
             logger.error(f"Error getting PR files: {e}")
             return {"error": str(e)}
@@ -316,6 +349,68 @@ class GitHubPRManager(PRReviewMixin):
             logger.error(f"Error getting PR diff: {e}")
             return {"error": str(e)}
 
+    @staticmethod
+    async def _iter_lines(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+        # Chunked rather than readline(): minified files produce lines longer than
+        # aiohttp's per-line buffer limit.
+        parts: list[bytes] = []
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            *lines, tail = chunk.split(b"\n")
+            if lines:
+                lines[0] = b"".join(parts) + lines[0]
+                for line in lines:
+                    yield line.decode("utf-8", "replace").rstrip("\r")
+                parts = []
+            parts.append(tail)
+        if any(parts):
+            yield b"".join(parts).decode("utf-8", "replace").rstrip("\r")
+
+    async def iter_pr_diff(self, pr_number: int) -> AsyncIterator[tuple[str, str]]:
+        """Yield (filename, patch) for each file as the unified diff streams in.
+
+        The diff is read line by line and each file section is yielded as soon as the next
+        one starts, so a consumer can work on early files while later ones download and the
+        whole diff is never held in memory. GitHub refuses the diff media type for very large
+        PRs (406); those fall back to the paginated files endpoint, which carries the same
+        per-file patches. Raises RuntimeError on API failures.
+        """
+        if not has_github_auth():
+            raise RuntimeError("GitHub token not configured")
+
+        url = f"https://api.github.com/repos/{self.repo}/pulls/{pr_number}"
+        headers = await self._get_headers()
+        headers["Accept"] = "application/vnd.github.v3.diff"
+
+        session = await self.get_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                filename: str | None = None
+                section: list[str] = []
+                async for line in self._iter_lines(response):
+                    if line.startswith("diff --git"):
+                        if filename is not None:
+                            yield filename, "\n".join(section)
+                        match = re.match(r"diff --git a/(.*?) b/(.*)", line)
+                        filename = match.group(2) if match else "unknown"
+                        section = [line]
+                    elif filename is not None:
+                        section.append(line)
+                if filename is not None:
+                    yield filename, "\n".join(section)
+                return
+            if response.status == 404:
+                raise RuntimeError(f"PR #{pr_number} not found")
+            if response.status not in (406, 422):
+                raise RuntimeError(f"GitHub API error: {response.status}")
+
+        logger.info("Diff for PR #%s too large for the diff endpoint, paging through files", pr_number)
+        files = await self.get_pr_files(pr_number)
+        if files.get("error"):
+            raise RuntimeError(files["error"])
+        for f in files["files"]:
+            if f["patch"]:
+                yield f["filename"], f"diff --git a/{f['filename']} b/{f['filename']}\n{f['patch']}"
+
     async def get_pr_checks(self, pr_number: int) -> dict:
         """Get CI/workflow status for a PR using GraphQL statusCheckRollup."""
         if not has_github_auth():
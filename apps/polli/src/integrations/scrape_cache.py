@@ -0,0 +1,291 @@
+"""Content cache for plain-markdown scrapes, revalidated with the origin's HTTP validators.
+
+The bot is asked about the same docs and GitHub pages over and over, and every `scrape_url`
+used to re-download and re-extract them (crawl4ai's own cache is disabled: it keys on the
+URL alone and never revalidates). Here the extracted markdown is stored together with the
+page's `ETag` / `Last-Modified`:
+
+- younger than `fresh_seconds`: served as-is, no network at all;
+- older, but within `max_age_seconds` and carrying validators: one conditional GET to the
+  origin — a 304 refreshes the entry and serves it, anything else is a miss;
+- older than `max_age_seconds`, or stale without validators: a miss.
+
+Only requests whose output depends on nothing but the URL (the fast-path markdown shape)
+are cached. Backends are bounded by entry count and total bytes and evict least recently
+used first; the SQLite one survives restarts. Backends are synchronous, so `ScrapeCache`
+calls them on a worker thread to keep disk I/O off the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Protocol
+
+from ..core.config import config
+
+logger = logging.getLogger(__name__)
+
+REVALIDATE_TIMEOUT_SECONDS = 5
+REVALIDATE_USER_AGENT = "Mozilla/5.0 (compatible; polli-bot/1.0)"
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    url: str
+    title: str
+    markdown: str
+    fetcher: str
+    etag: str
+    last_modified: str
+    stored_at: float  # wall clock, so SQLite entries stay meaningful across restarts
+
+    @property
+    def size(self) -> int:
+        return len(self.markdown) + len(self.title)
+
+    @property
+    def has_validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+def validators_from(headers) -> dict[str, str]:
+    """`etag` / `last-modified` out of any mapping-like headers object (str or bytes values)."""
+    found: dict[str, str] = {}
+    if not headers:
+        return found
+    for name in ("etag", "last-modified"):
+        try:
+            value = headers.get(name) or headers.get(name.title())
+        except Exception:
+            value = None
+        if isinstance(value, bytes | bytearray):
+            value = value.decode("latin-1")
+        if value:
+            found[name] = str(value)
+    return found
+
+
+class CacheBackend(Protocol):
+    def get(self, url: str) -> CachedPage | None: ...
+
+    def put(self, page: CachedPage) -> None: ...
+
+    def delete(self, url: str) -> None: ...
+
+
+class MemoryBackend:
+    """Process-local LRU bounded by entry count and total markdown size."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, CachedPage] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> CachedPage | None:
+        with self._lock:
+            page = self._items.get(url)
+            if page is not None:
+                self._items.move_to_end(url)
+            return page
+
+    def put(self, page: CachedPage) -> None:
+        if page.size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(page.url)
+            self._items[page.url] = page
+            self._bytes += page.size
+            while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def delete(self, url: str) -> None:
+        with self._lock:
+            self._pop(url)
+
+    def _pop(self, url: str) -> None:
+        old = self._items.pop(url, None)
+        if old is not None:
+            self._bytes -= old.size
+
+
+class SQLiteBackend:
+    """Same bounds as `MemoryBackend`, persisted in one SQLite file."""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            markdown TEXT NOT NULL,
+            fetcher TEXT NOT NULL,
+            etag TEXT NOT NULL,
+            last_modified TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            used_at REAL NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pages_used_at ON pages (used_at);
+    """
+
+    def __init__(self, path: Path, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self._SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> CachedPage | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, title, markdown, fetcher, etag, last_modified, stored_at FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE pages SET used_at = ? WHERE url = ?", (time.time(), url))
+        return CachedPage(*row)
+
+    def put(self, page: CachedPage) -> None:
+        if page.size > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    page.url,
+                    page.title,
+                    page.markdown,
+                    page.fetcher,
+                    page.etag,
+                    page.last_modified,
+                    page.stored_at,
+                    time.time(),
+                    page.size,
+                ),
+            )
+            self._evict()
+
+    def delete(self, url: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+
+    def _evict(self) -> None:
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk from least recently used, dropping rows until both bounds hold again.
+        doomed: list[str] = []
+        for url, size in self._db.execute("SELECT url, size FROM pages ORDER BY used_at"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append(url)
+            count -= 1
+            total -= size
+        self._db.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url in doomed])
+
+
+class ScrapeCache:
+    def __init__(self, backend: CacheBackend, *, fresh_seconds: float, max_age_seconds: float):
+        self.backend = backend
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max_age_seconds
+
+    async def lookup(self, url: str) -> dict | None:
+        """A scrape result for `url` if the cache can vouch for it, else None."""
+        page = await asyncio.to_thread(self.backend.get, url)
+        if page is None:
+            return None
+        age = time.time() - page.stored_at
+        if age > self.max_age_seconds:
+            await asyncio.to_thread(self.backend.delete, url)
+            return None
+        if age <= self.fresh_seconds:
+            return self._result(page, "hit")
+        if not page.has_validators or not await self._not_modified(page):
+            return None
+        await asyncio.to_thread(self.backend.put, replace(page, stored_at=time.time()))
+        return self._result(page, "revalidated")
+
+    async def store(self, result: dict, validators: dict[str, str]) -> None:
+        markdown = result.get("markdown")
+        if not result.get("success") or not markdown:
+            return
+        await asyncio.to_thread(
+            self.backend.put,
+            CachedPage(
+                url=result["url"],
+                title=result.get("title") or "",
+                markdown=markdown,
+                fetcher=result.get("_fetcher", ""),
+                etag=validators.get("etag", ""),
+                last_modified=validators.get("last-modified", ""),
+                stored_at=time.time(),
+            ),
+        )
+
+    @staticmethod
+    def _result(page: CachedPage, how: str) -> dict:
+        return {
+            "success": True,
+            "url": page.url,
+            "title": page.title,
+            "markdown": page.markdown,
+            "_fetcher": page.fetcher,
+            "_cache": how,
+        }
+
+    @staticmethod
+    async def _not_modified(page: CachedPage) -> bool:
+        import aiohttp
+
+        headers = {"User-Agent": REVALIDATE_USER_AGENT}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    page.url,
+                    headers=headers,
+                    allow_redirects=True,
+                    timeout=aiohttp.ClientTimeout(total=REVALIDATE_TIMEOUT_SECONDS),
+                ) as response:
+                    return response.status == 304
+        except Exception as e:
+            logger.debug("Revalidation failed for %s: %s", page.url, e)
+            return False
+
+
+_cache: ScrapeCache | None = None
+
+
+def get_cache() -> ScrapeCache | None:
+    """The configured cache, created on first use; None when disabled."""
+    global _cache
+    if _cache is None:
+        settings = config.scrape_cache
+        if not settings.enabled:
+            return None
+        max_bytes = settings.max_mb * 1024 * 1024
+        backend: CacheBackend | None = None
+        if settings.backend == "sqlite":
+            try:
+                backend = SQLiteBackend(config.paths.data_dir / "scrape_cache.db", settings.max_entries, max_bytes)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Scrape cache database unavailable, keeping it in memory: %s", e)
+        if backend is None:
+            backend = MemoryBackend(settings.max_entries, max_bytes)
+        _cache = ScrapeCache(backend, fresh_seconds=settings.fresh_seconds, max_age_seconds=settings.max_age_seconds)
+    return _cache
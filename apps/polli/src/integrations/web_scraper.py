@@ -1,9 +1,12 @@
 import asyncio
 import logging
+import time
 from typing import Any
 
 from ..utils.regex import re
 from ..utils.url import parse_url
+from .fetch_stats import fetcher_stats
+from .scrape_cache import get_cache, validators_from
 
 logger = logging.getLogger(__name__)
 
@@ -84,7 +87,7 @@ def _needs_browser(
     )
 
 
-async def _try_rnet(url: str, timeout: int) -> str | None:
+async def _try_rnet(url: str, timeout: int, validators: dict | None = None) -> str | None:
     try:
         from rnet import Client, Impersonate
 
@@ -101,13 +104,15 @@ async def _try_rnet(url: str, timeout: int) -> str | None:
         if not html or _is_bot_blocked(html, status):
             return None
         md = _html_to_markdown(html)
+        if validators is not None:
+            validators.update(validators_from(resp.headers))
         return md if md and len(md) > 50 else None
     except Exception as e:
         logger.debug(f"rnet failed for {url}: {e}")
         return None
 
 
-async def _try_scrapling(url: str, timeout: int) -> str | None:
+async def _try_scrapling(url: str, timeout: int, validators: dict | None = None) -> str | None:
     try:
         from scrapling.fetchers import AsyncFetcher
 
@@ -121,6 +126,8 @@ async def _try_scrapling(url: str, timeout: int) -> str | None:
         if not html or _is_bot_blocked(html, 200):
             return None
         md = _html_to_markdown(html)
+        if validators is not None:
+            validators.update(validators_from(getattr(page, "headers", None)))
         return md if md and len(md) > 50 else None
     except Exception as e:
         logger.debug(f"scrapling failed for {url}: {e}")
@@ -276,6 +283,115 @@ async def _try_jina(url: str, timeout: int) -> str | None:
     return text
 
 
+# Fast-path fetchers with a latency guess (seconds) used until a host has history. Dict
+# order is the chain for hosts never seen before: the cheap local fetchers first, then Jina,
+# since reaching a login wall means this host is the problem and Jina fetches from elsewhere
+# before we spend a browser launch on the same wall.
+_FAST_LAYERS: dict[str, float] = {"rnet": 1.5, "scrapling": 3.0, "jina": 5.0}
+
+
+async def _fetch_layer(layer: str, url: str, timeout: int, validators: dict | None = None) -> str | None:
+    """One fast-path fetch; `validators` collects the origin's ETag/Last-Modified when known."""
+    if layer == "rnet":
+        md = await _try_rnet(url, min(timeout, 12), validators)
+    elif layer == "scrapling":
+        md = await _try_scrapling(url, min(timeout, 18), validators)
+    else:
+        # Jina's response headers describe Jina, not the origin.
+        return await _try_jina(url, min(timeout, 25))
+    return md if md and not _looks_like_login_wall(md) else None
+
+
+async def _timed_layer(layer: str, host: str, url: str, timeout: int, validators: dict | None = None) -> str | None:
+    """Run one fast-path fetcher and feed its outcome into the per-host stats."""
+    start = time.monotonic()
+    md = await _fetch_layer(layer, url, timeout, validators)
+    fetcher_stats.record(host, layer, md is not None, time.monotonic() - start)
+    return md
+
+
+# Hedged mode: launch the next layer once the running one is slower than this quantile of
+# its recent successful latencies on the host.
+HEDGE_QUANTILE = 0.9
+HEDGE_MIN_DELAY_SECONDS = 0.5
+# Without history, hedge after this multiple of the layer's latency guess.
+HEDGE_DEFAULT_FACTOR = 2.0
+# How long to wait before asking again when no concurrency slot was free to hedge into.
+HEDGE_RETRY_SECONDS = 0.25
+
+
+def _hedge_delay(host: str, layer: str) -> float:
+    observed = fetcher_stats.latency_quantile(host, layer, HEDGE_QUANTILE)
+    delay = observed if observed is not None else _FAST_LAYERS[layer] * HEDGE_DEFAULT_FACTOR
+    return max(HEDGE_MIN_DELAY_SECONDS, delay)
+
+
+async def _hedged_fast_path(
+    host: str, url: str, timeout: int, layers: list[str], limiter: asyncio.Semaphore | None
+) -> tuple[str, str, dict] | None:
+    """Race the fast-path layers: first acceptable result wins, the rest are cancelled.
+
+    The first layer runs on the caller's own concurrency slot. Each hedge needs one more slot
+    from `limiter` (the `scrape_multiple` semaphore), taken only if free right now — so
+    hedging soaks up idle capacity but never pushes total concurrency past the bound. Slots
+    are handed back as soon as the number of running fetchers drops.
+    """
+    loop = asyncio.get_running_loop()
+    queue = list(layers)
+    pending: dict[asyncio.Task, tuple[str, dict]] = {}
+    extra_slots = 0
+    hedge_at = 0.0
+
+    def _launch() -> None:
+        nonlocal hedge_at
+        layer = queue.pop(0)
+        validators: dict = {}
+        pending[asyncio.create_task(_timed_layer(layer, host, url, timeout, validators))] = (layer, validators)
+        hedge_at = loop.time() + _hedge_delay(host, layer)
+
+    def _release_idle_slots() -> None:
+        nonlocal extra_slots
+        while extra_slots > max(0, len(pending) - 1):
+            limiter.release()  # type: ignore[union-attr]
+            extra_slots -= 1
+
+    try:
+        while pending or queue:
+            if not pending:
+                _launch()
+            wait = max(0.0, hedge_at - loop.time()) if queue else None
+            done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                layer, validators = pending.pop(task)
+                _release_idle_slots()
+                md = task.result()
+                if md:
+                    return layer, md, validators
+            if done or not queue:
+                continue
+            # The running layers are slow: hedge into a free slot, or look again shortly.
+            if limiter is None or not limiter.locked():
+                if limiter is not None:
+                    await limiter.acquire()
+                    extra_slots += 1
+                logger.debug(
+                    f"hedging {url}: launching {queue[0]} alongside {sorted(name for name, _ in pending.values())}"
+                )
+                _launch()
+            else:
+                hedge_at = loop.time() + HEDGE_RETRY_SECONDS
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        # Let the losers unwind before their slots are handed back, so the bound holds.
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        while extra_slots:
+            limiter.release()  # type: ignore[union-attr]
+            extra_slots -= 1
+
+
 async def scrape_url(
     url: str,
     extraction_strategy: str | None = None,
@@ -303,7 +419,15 @@ async def scrape_url(
     timeout: int = 30,
     headless: bool = True,
     session_id: str | None = None,
+    hedge: bool = False,
+    limiter: asyncio.Semaphore | None = None,
 ) -> dict:
+    """Fetch `url` through the cheapest layer that works for its host.
+
+    With `hedge`, slow fast-path fetchers are raced against the next layer instead of being
+    waited out; `limiter` is the caller's concurrency semaphore, which hedges draw from.
+    Plain markdown scrapes go through the validator-aware content cache (see scrape_cache).
+    """
     try:
         parsed = parse_url(url)
         if not parsed.scheme or not parsed.netloc:
@@ -314,18 +438,8 @@ async def scrape_url(
             }
     except Exception:
         return {"success": False, "url": url, "error": "Invalid URL format"}
-
-    # ── Layer 0: x.com via fxtwitter ──────────────────────────────────────────
-    # Ahead of the generic fetchers because they can only ever reach the login wall.
-    x_result = await _try_x_api(url, min(timeout, 15))
-    if x_result:
-        logger.debug(f"fxtwitter succeeded for {url}")
-        return x_result
-
-    # ── Layer 1: rnet (Rust HTTP + Chrome TLS) ────────────────────────────────
-    # ── Layer 2: scrapling AsyncFetcher (curl_cffi stealth) ──────────────────
-    # Fast path for basic markdown — skip browser entirely when not needed.
-    if not _needs_browser(
+    host = parsed.netloc.lower()
+    plain = not _needs_browser(
         output_format=output_format,
         extraction_strategy=extraction_strategy,
         content_filter=content_filter,
@@ -340,31 +454,60 @@ async def scrape_url(
         include_links=include_links,
         include_images=include_images,
         include_tables=include_tables,
-    ):
-        rnet_timeout = min(timeout, 12)
-        md = await _try_rnet(url, rnet_timeout)
-        if md and not _looks_like_login_wall(md):
-            logger.debug(f"rnet succeeded for {url}")
-            return {"success": True, "url": url, "title": "", "markdown": md, "_fetcher": "rnet"}
-
-        scrapling_timeout = min(timeout, 18)
-        md = await _try_scrapling(url, scrapling_timeout)
-        if md and not _looks_like_login_wall(md):
-            logger.debug(f"scrapling succeeded for {url}")
-            return {"success": True, "url": url, "title": "", "markdown": md, "_fetcher": "scrapling"}
-
-        # Reaching a login wall means this host is the problem, so ask Jina to fetch it
-        # from elsewhere before spending a browser launch on the same wall.
-        jina_md = await _try_jina(url, min(timeout, 25))
-        if jina_md:
-            logger.debug(f"jina succeeded for {url}")
-            return {"success": True, "url": url, "title": "", "markdown": jina_md, "_fetcher": "jina"}
-
-        logger.debug(f"rnet+scrapling+jina all failed for {url}, falling back to crawl4ai")
+    )
+    # The result of a plain scrape depends on the URL alone, so it can be shared.
+    cache = get_cache() if plain and not include_raw_html and not session_id else None
+    if cache is not None:
+        cached = await cache.lookup(url)
+        if cached:
+            logger.debug(f"scrape cache {cached['_cache']} for {url}")
+            return cached
+    validators: dict = {}
+
+    async def _done(result: dict) -> dict:
+        if cache is not None:
+            await cache.store(result, validators)
+        return result
+
+    # ── Layer 0: x.com via fxtwitter ──────────────────────────────────────────
+    # Ahead of the generic fetchers because they can only ever reach the login wall.
+    x_result = await _try_x_api(url, min(timeout, 15))
+    if x_result:
+        logger.debug(f"fxtwitter succeeded for {url}")
+        return await _done(x_result)
+
+    # ── Layer 1: rnet (Rust HTTP + Chrome TLS) ────────────────────────────────
+    # ── Layer 2: scrapling AsyncFetcher (curl_cffi stealth) ──────────────────
+    # ── Layer 2b: Jina Reader (fetches from its own infrastructure) ──────────
+    # Fast path for basic markdown — skip browser entirely when not needed.
+    if plain:
+        # Try layers in the order this host has historically rewarded, skipping any that
+        # keep failing on it (see fetch_stats).
+        layers = fetcher_stats.order(host, _FAST_LAYERS)
+        if hedge:
+            won = await _hedged_fast_path(host, url, timeout, layers, limiter)
+            if won:
+                layer, md, validators = won
+                logger.debug(f"{layer} won the hedged race for {url}")
+                return await _done({"success": True, "url": url, "title": "", "markdown": md, "_fetcher": layer})
+        else:
+            for layer in layers:
+                validators = {}
+                md = await _timed_layer(layer, host, url, timeout, validators)
+                if md:
+                    logger.debug(f"{layer} succeeded for {url}")
+                    return await _done({"success": True, "url": url, "title": "", "markdown": md, "_fetcher": layer})
+            validators = {}
+
+        skipped = [layer for layer in _FAST_LAYERS if layer not in layers]
+        logger.debug(
+            f"fast fetchers failed for {url}{f' (skipped {skipped})' if skipped else ''}, falling back to crawl4ai"
+        )
 
     # ── Layer 3: crawl4ai (Playwright browser) ────────────────────────────────
     # Used when: browser features needed, or rnet/scrapling returned empty.
-    return await _scrape_with_crawl4ai(
+    start = time.monotonic()
+    result = await _scrape_with_crawl4ai(
         url=url,
         extraction_strategy=extraction_strategy,
         schema=schema,
@@ -391,7 +534,10 @@ async def scrape_url(
         timeout=timeout,
         headless=headless,
         session_id=session_id,
+        validators=validators,
     )
+    fetcher_stats.record(host, "crawl4ai", bool(result.get("success")), time.monotonic() - start)
+    return await _done(result)
 
 
 async def _scrape_with_crawl4ai(
@@ -421,6 +567,7 @@ async def _scrape_with_crawl4ai(
     timeout: int = 30,
     headless: bool = True,
     session_id: str | None = None,
+    validators: dict | None = None,
 ) -> dict:
     try:
         from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig
@@ -492,6 +639,8 @@ async def _scrape_with_crawl4ai(
                 "title": result.metadata.get("title", "") if result.metadata else "",
                 "_fetcher": "crawl4ai",
             }
+            if validators is not None:
+                validators.update(validators_from(getattr(result, "response_headers", None)))
 
             if output_format == "fit_markdown" and result.markdown and result.markdown.fit_markdown:
                 response["markdown"] = result.markdown.fit_markdown
@@ -671,6 +820,7 @@ async def scrape_multiple(
     instruction: str | None = None,
     max_concurrent: int = 5,
     timeout: int = 30,
+    hedge: bool = False,
 ) -> dict:
     if not urls:
         return {"success": False, "error": "No URLs provided", "results": []}
@@ -687,6 +837,8 @@ async def scrape_multiple(
                 schema=schema,
                 instruction=instruction,
                 timeout=timeout,
+                hedge=hedge,
+                limiter=semaphore,
             )
 
     tasks = [scrape_with_limit(url) for url in urls]
@@ -981,7 +1133,10 @@ async def web_scrape_handler(
     if action == "multi":
         if not urls:
             return {"error": "urls parameter required for multi action (list of URLs)"}
-        return await scrape_multiple(urls=urls, extraction_strategy=strategy, schema=schema, instruction=extract)
+        # Link-heavy messages wait on the slowest URL, so race slow fetchers on spare slots.
+        return await scrape_multiple(
+            urls=urls, extraction_strategy=strategy, schema=schema, instruction=extract, hedge=True
+        )
 
     return {
         "error": f"Unknown action: {action}",
@@ -7,6 +7,12 @@ those no matter how many times it runs.
 
 The graph is a snapshot built by `codegraph index`, so it needs `sync_graph()` whenever
 the clone moves, or answers silently go stale.
+
+Queries are served by a `CodeGraphService` that PolliBot creates at startup: it loads the
+graph's SQLite store into memory once, answers callers/callees/impact from adjacency maps,
+and reloads in a background task after every `sync_graph()` — queries keep hitting the old
+snapshot until the new one is swapped in. Until a snapshot is loaded (or if the store's layout isn't one we can
+read), each query falls back to a `codegraph` subprocess as before.
 """
 
 from __future__ import annotations
@@ -14,6 +20,10 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import sqlite3
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from pathlib import Path
 
 from ..core.config import config
 from .local_repo import REPO_DIR, RepoError
@@ -23,6 +33,13 @@ logger = logging.getLogger(__name__)
 COMMAND_TIMEOUT_SECONDS = 60
 MAX_RESULTS = 50
 MAX_IMPACT_DEPTH = 4
+MAX_BATCH_SYMBOLS = 20
+
+GRAPH_DB = REPO_DIR / ".codegraph" / "codegraph.db"
+# Structural containment (file -> class -> method) is not a dependency; impact ignores it.
+_CONTAINMENT_EDGES = frozenset({"contains"})
+_NODE_COLUMNS = frozenset({"id", "name", "kind", "file_path", "start_line"})
+_EDGE_COLUMNS = frozenset({"source", "target", "kind"})
 
 
 async def _run_codegraph(*args: str) -> dict:
@@ -67,11 +84,154 @@ def _format_nodes(nodes: list[dict], limit: int) -> list[dict]:
     ]
 
 
+@dataclass
+class _Graph:
+    """One in-memory snapshot of the codegraph store."""
+
+    nodes: dict[str, dict] = field(default_factory=dict)  # id -> formatted node
+    by_name: dict[str, list[str]] = field(default_factory=lambda: defaultdict(list))
+    calls_out: dict[str, list[str]] = field(default_factory=lambda: defaultdict(list))
+    calls_in: dict[str, list[str]] = field(default_factory=lambda: defaultdict(list))
+    deps_in: dict[str, list[str]] = field(default_factory=lambda: defaultdict(list))
+
+    @classmethod
+    def load(cls, db_path: Path) -> _Graph:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            node_cols = {row[1] for row in conn.execute("PRAGMA table_info(nodes)")}
+            edge_cols = {row[1] for row in conn.execute("PRAGMA table_info(edges)")}
+            if not _NODE_COLUMNS <= node_cols or not _EDGE_COLUMNS <= edge_cols:
+                raise RepoError(f"Unrecognised codegraph store layout in {db_path}")
+            has_qualified = "qualified_name" in node_cols
+
+            graph = cls()
+            query = "SELECT id, name, kind, file_path, start_line" + (", qualified_name" if has_qualified else "")
+            for row in conn.execute(f"{query} FROM nodes"):
+                node_id, name, kind, file_path, start_line = row[:5]
+                graph.nodes[node_id] = {"symbol": name, "kind": kind, "file": file_path, "line": start_line}
+                graph.by_name[name].append(node_id)
+                if has_qualified and row[5] and row[5] != name:
+                    graph.by_name[row[5]].append(node_id)
+            for source, target, kind in conn.execute("SELECT source, target, kind FROM edges"):
+                if kind == "calls":
+                    graph.calls_out[source].append(target)
+                    graph.calls_in[target].append(source)
+                if kind not in _CONTAINMENT_EDGES:
+                    graph.deps_in[target].append(source)
+        finally:
+            conn.close()
+        return graph
+
+    def _lookup(self, symbol: str) -> list[str]:
+        ids = self.by_name.get(symbol)
+        if not ids:
+            raise RepoError(f"Symbol '{symbol}' not found in the code graph")
+        return ids
+
+    def _collect(self, ids, limit: int) -> list[dict]:
+        seen: dict[str, dict] = {}
+        for node_id in ids:
+            node = self.nodes.get(node_id)
+            if node is not None and node_id not in seen:
+                seen[node_id] = node
+        return sorted(seen.values(), key=lambda n: (n["file"] or "", n["line"] or 0))[:limit]
+
+    def callers(self, symbol: str, limit: int) -> list[dict]:
+        return self._collect((c for t in self._lookup(symbol) for c in self.calls_in.get(t, ())), limit)
+
+    def callees(self, symbol: str, limit: int) -> list[dict]:
+        return self._collect((c for s in self._lookup(symbol) for c in self.calls_out.get(s, ())), limit)
+
+    def impact(self, symbol: str, depth: int) -> list[dict]:
+        """Breadth-first over incoming dependency edges, `depth` hops out."""
+        start = set(self._lookup(symbol))
+        seen = set(start)
+        frontier = deque((node_id, 0) for node_id in start)
+        affected: list[str] = []
+        while frontier:
+            node_id, hops = frontier.popleft()
+            if hops >= depth:
+                continue
+            for dependent in self.deps_in.get(node_id, ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    affected.append(dependent)
+                    frontier.append((dependent, hops + 1))
+        return self._collect(affected, MAX_RESULTS)
+
+
+class CodeGraphService:
+    """Long-lived, in-memory view of the graph. Owned by PolliBot; see `init_service`."""
+
+    def __init__(self, db_path: Path = GRAPH_DB):
+        self.db_path = db_path
+        self._graph: _Graph | None = None
+        self._reload_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def loaded(self) -> bool:
+        return self._graph is not None
+
+    def schedule_reload(self) -> asyncio.Task | None:
+        """Reload in the background, if a graph has been built; queries keep the old snapshot."""
+        if not self.db_path.is_file():
+            return None
+        task = asyncio.create_task(self.reload())
+        self._tasks.add(task)
+        task.add_done_callback(self._reload_done)
+        return task
+
+    def _reload_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Code graph reload crashed: %s", task.exception())
+
+    async def close(self) -> None:
+        """Cancel pending reloads."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def reload(self) -> None:
+        async with self._reload_lock:
+            try:
+                graph = await asyncio.to_thread(_Graph.load, self.db_path)
+            except (sqlite3.Error, RepoError) as e:
+                # Keep serving the previous snapshot (or the CLI) rather than nothing.
+                logger.warning("Code graph load failed, keeping previous snapshot: %s", e)
+                return
+            self._graph = graph
+            logger.info("Code graph loaded: %d symbols", len(graph.nodes))
+
+    def snapshot(self) -> _Graph | None:
+        return self._graph
+
+
+_service: CodeGraphService | None = None
+
+
+def init_service() -> CodeGraphService:
+    """Create the process-wide graph service; the bot calls `schedule_reload()` on it."""
+    global _service
+    _service = CodeGraphService()
+    return _service
+
+
+def _snapshot() -> _Graph | None:
+    return _service.snapshot() if _service is not None else None
+
+
 async def callers(symbol: str, *, limit: int = 20) -> dict:
     """Which functions call `symbol`."""
     limit = max(1, min(limit, MAX_RESULTS))
-    data = await _run_codegraph("callers", symbol, "--json", "--limit", str(limit))
-    found = _format_nodes(data.get("callers", []), limit)
+    graph = _snapshot()
+    if graph is not None:
+        found = graph.callers(symbol, limit)
+    else:
+        data = await _run_codegraph("callers", symbol, "--json", "--limit", str(limit))
+        found = _format_nodes(data.get("callers", []), limit)
     return {
         "symbol": symbol,
         "relation": "callers",
@@ -84,8 +244,12 @@ async def callers(symbol: str, *, limit: int = 20) -> dict:
 async def callees(symbol: str, *, limit: int = 20) -> dict:
     """Which functions `symbol` calls."""
     limit = max(1, min(limit, MAX_RESULTS))
-    data = await _run_codegraph("callees", symbol, "--json", "--limit", str(limit))
-    found = _format_nodes(data.get("callees", []), limit)
+    graph = _snapshot()
+    if graph is not None:
+        found = graph.callees(symbol, limit)
+    else:
+        data = await _run_codegraph("callees", symbol, "--json", "--limit", str(limit))
+        found = _format_nodes(data.get("callees", []), limit)
     return {
         "symbol": symbol,
         "relation": "callees",
@@ -98,12 +262,17 @@ async def callees(symbol: str, *, limit: int = 20) -> dict:
 async def impact(symbol: str, *, depth: int = 2) -> dict:
     """Everything transitively affected by changing `symbol`."""
     depth = max(1, min(depth, MAX_IMPACT_DEPTH))
-    data = await _run_codegraph("impact", symbol, "--json", "--depth", str(depth))
-    affected = _format_nodes(data.get("affected", []), MAX_RESULTS)
+    graph = _snapshot()
+    if graph is not None:
+        affected = graph.impact(symbol, depth)
+    else:
+        data = await _run_codegraph("impact", symbol, "--json", "--depth", str(depth))
+        affected = _format_nodes(data.get("affected", []), MAX_RESULTS)
+        depth = data.get("depth", depth)
     return {
         "symbol": symbol,
         "relation": "impact",
-        "depth": data.get("depth", depth),
+        "depth": depth,
         "count": len(affected),
         "results": affected,
         "message": (
@@ -113,8 +282,32 @@ async def impact(symbol: str, *, depth: int = 2) -> dict:
     }
 
 
+async def batch(relation: str, symbols: list[str], *, limit: int = 20, depth: int = 2) -> dict:
+    """Run one relation over several symbols in a single tool call.
+
+    A symbol that isn't in the graph gets an `error` entry instead of failing the batch.
+    """
+    symbols = list(dict.fromkeys(s for s in symbols if s))[:MAX_BATCH_SYMBOLS]
+
+    async def one(symbol: str) -> dict:
+        try:
+            if relation == "impact":
+                return await impact(symbol, depth=depth)
+            if relation == "callers":
+                return await callers(symbol, limit=limit)
+            return await callees(symbol, limit=limit)
+        except RepoError as e:
+            return {"symbol": symbol, "relation": relation, "error": str(e)}
+
+    results = await asyncio.gather(*(one(s) for s in symbols))
+    return {"relation": relation, "count": len(results), "results": list(results)}
+
+
 async def sync_graph() -> dict:
-    """Bring the graph up to date with the clone. Cheap enough to run on every merge."""
+    """Bring the graph up to date with the clone. Cheap enough to run on every merge.
+
+    Returns once the CLI has synced the store; the in-memory snapshot reloads afterwards.
+    """
     graph_exists = (REPO_DIR / ".codegraph").is_dir()
     args = ("sync", "--quiet") if graph_exists else ("init", ".")
 
@@ -132,4 +325,6 @@ async def sync_graph() -> dict:
         raise RepoError("codegraph sync timed out") from None
     if proc.returncode != 0:
         raise RepoError(f"codegraph {args[0]} failed: {stderr.decode('utf-8', 'replace').strip()[:200]}")
+    if _service is not None:
+        _service.schedule_reload()
     return {"action": args[0], "ok": True}
@@ -0,0 +1,138 @@
+"""Random-access line windows over files in the local clone.
+
+`read_file` is called with a line window (at most `MAX_FILE_LINES`), often while the model
+pages through a large generated file. Decoding the whole file and splitting it per call made
+that O(file size) each time. Here every file gets a lazily built line-offset table (the byte
+offset at which each line starts); a window is then one mmap slice of exactly the bytes it
+covers.
+
+Tables live in a byte-bounded LRU keyed by (path, mtime, size), so an edited file misses
+naturally; `invalidate()` drops everything after `sync_repo`. Small hot files also keep their
+bytes in the LRU and skip the mmap entirely.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Files up to this size keep their content resident, larger ones only their offset table.
+HOT_FILE_MAX_BYTES = 256 * 1024
+
+# Universal newlines, as in text-mode reads: CRLF, LF and a lone CR each end a line.
+_NEWLINE = re.compile(rb"\r\n|\r|\n")
+
+
+@dataclass(frozen=True)
+class _Entry:
+    starts: array  # byte offset of each line start; len(starts) == line count
+    size: int
+    data: bytes | None  # whole file, for small files only
+
+    @property
+    def cost(self) -> int:
+        return self.starts.itemsize * len(self.starts) + (len(self.data) if self.data is not None else 0)
+
+
+@dataclass(frozen=True)
+class Window:
+    total_lines: int
+    start_line: int
+    end_line: int
+    content: str
+
+
+class _ByteLRU:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> _Entry | None:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+            return entry
+
+    def set(self, key: tuple, entry: _Entry) -> None:
+        if entry.cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.cost
+            self._items[key] = entry
+            self._bytes += entry.cost
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.cost
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+_cache = _ByteLRU(CACHE_MAX_BYTES)
+
+
+def invalidate() -> None:
+    """Forget every offset table — the clone just moved."""
+    _cache.clear()
+
+
+def _line_starts(buf: bytes | mmap.mmap) -> array:
+    starts = array("Q", [0])
+    starts.extend(m.end() for m in _NEWLINE.finditer(buf))
+    return starts
+
+
+def _load(target: Path, size: int) -> _Entry:
+    if size == 0:
+        return _Entry(array("Q", [0]), 0, b"")
+    if size <= HOT_FILE_MAX_BYTES:
+        data = target.read_bytes()
+        return _Entry(_line_starts(data), len(data), data)
+    with open(target, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _Entry(_line_starts(mm), size, None)
+
+
+def read_window(target: Path, start_line: int, end_line: int | None, max_lines: int) -> Window:
+    """Lines `start_line..end_line` (1-based, inclusive, at most `max_lines`) of `target`.
+
+    Same result as `read_text().split("\\n")` with its universal newlines: a trailing line
+    ending yields a final empty line, and CRLF and CR come back as LF.
+    """
+    st = target.stat()
+    key = (str(target), st.st_mtime_ns, st.st_size)
+    entry = _cache.get(key)
+    if entry is None:
+        entry = _load(target, st.st_size)
+        _cache.set(key, entry)
+
+    total = len(entry.starts)
+    start = max(1, start_line)
+    end = min(end_line or total, total, start + max_lines - 1)
+    if start > end:
+        return Window(total, start, end, "")
+
+    lo = entry.starts[start - 1]
+    # Through the line ending of line `end` (absent for the last line); trimmed below.
+    hi = entry.starts[end] if end < total else entry.size
+    if entry.data is not None:
+        chunk = entry.data[lo:hi]
+    else:
+        with open(target, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            chunk = mm[lo:hi]
+    content = chunk.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+    if end < total:
+        content = content[:-1]
+    return Window(total, start, end, content)
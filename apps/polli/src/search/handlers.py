@@ -2,12 +2,15 @@
 
 Vectorize answers "where does X live?" from natural language. The local clone answers
 everything after that: exact matches, reading files, walking directories. `search` runs
-both in one call — semantic hits first, then the same query grepped literally — so the
-common case (find something, then look at it) costs a single tool round trip.
+both in one call — the semantic query and a literal grep of the same text start together
+under one deadline, and their hits are merged by reciprocal-rank fusion — so the common
+case (find something, then look at it) costs a single tool round trip at the latency of
+the slower retriever, not the sum.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 
 from ..core.config import config
@@ -16,6 +19,11 @@ from .code_search import search_code
 
 logger = logging.getLogger(__name__)
 
+# Both retrievers share this budget; whichever misses it is dropped from the answer.
+SEARCH_DEADLINE_SECONDS = 8.0
+# Standard RRF damping constant: keeps one retriever's #1 from drowning the other's list.
+RRF_K = 60
+
 
 async def _semantic(query: str, top_k: int | None) -> list[dict]:
     if not config.code_search.is_configured:
@@ -23,7 +31,7 @@ async def _semantic(query: str, top_k: int | None) -> list[dict]:
     try:
         return await search_code(query, top_k=top_k)
     except Exception as e:
-        logger.warning("Semantic search failed, falling back to local grep: %s", e)
+        logger.warning("Semantic search failed, using exact matches only: %s", e)
         return []
 
 
@@ -38,6 +46,90 @@ async def _grep_fallback(query: str, path: str | None, glob: str | None) -> dict
         return None
 
 
+async def _retrieve(query: str, top_k: int | None, path: str | None, glob: str | None) -> tuple[list, list, list]:
+    """Run semantic and exact retrieval concurrently; returns (semantic, exact, dropped)."""
+    tasks = {
+        "semantic": asyncio.create_task(_semantic(query, top_k)),
+        "exact": asyncio.create_task(_grep_fallback(query, path, glob)),
+    }
+    done, pending = await asyncio.wait(tasks.values(), timeout=SEARCH_DEADLINE_SECONDS)
+    for task in pending:
+        task.cancel()
+    dropped = [name for name, task in tasks.items() if task in pending]
+    if dropped:
+        logger.warning("code_search: %s missed the %gs deadline", " + ".join(dropped), SEARCH_DEADLINE_SECONDS)
+
+    semantic = tasks["semantic"].result() if tasks["semantic"] in done else []
+    exact = tasks["exact"].result() if tasks["exact"] in done else None
+    return semantic, (exact or {}).get("matches", []), dropped
+
+
+def _dedupe_chunks(semantic: list[dict]) -> list[dict]:
+    """Drop semantic chunks that overlap a better-ranked chunk of the same file.
+
+    Vectorize indexes overlapping windows, so one function often comes back as two or three
+    adjacent chunks. Left in, they would each take a rank and push the exact list down.
+    """
+    kept: list[dict] = []
+    ranges_by_file: dict[str, list[tuple[int, int]]] = {}
+    for r in semantic:
+        ranges = ranges_by_file.setdefault(r["file_path"], [])
+        if any(start <= r["end_line"] and r["start_line"] <= end for start, end in ranges):
+            continue
+        ranges.append((r["start_line"], r["end_line"]))
+        kept.append(r)
+    return kept
+
+
+def _fuse(semantic: list[dict], exact: list[dict]) -> list[dict]:
+    """Reciprocal-rank fusion of both lists, deduplicated by file and line range.
+
+    Overlapping semantic chunks are collapsed into the best-ranked one before ranks are
+    assigned. An exact hit that falls inside a semantic chunk of the same file is the same
+    place in the code: it adds its rank score to that chunk and rides along as
+    `matched_line` rather than appearing twice.
+    """
+    fused: list[dict] = []
+    chunks_by_file: dict[str, list[dict]] = {}
+    for rank, r in enumerate(_dedupe_chunks(semantic), 1):
+        entry = {
+            "file": r["file_path"],
+            "lines": f"{r['start_line']}-{r['end_line']}",
+            "source": "semantic",
+            "score": 1 / (RRF_K + rank),
+            "language": r.get("language"),
+            "app": r.get("app"),
+            "similarity": r["similarity"],
+            "code": r["content"],
+            "_range": (r["start_line"], r["end_line"]),
+        }
+        fused.append(entry)
+        chunks_by_file.setdefault(r["file_path"], []).append(entry)
+
+    unique_exact: dict[tuple[str, int], dict] = {}
+    for m in exact:
+        unique_exact.setdefault((m["file"], m["line"]), m)
+    for rank, m in enumerate(unique_exact.values(), 1):
+        score = 1 / (RRF_K + rank)
+        chunk = next(
+            (c for c in chunks_by_file.get(m["file"], []) if c["_range"][0] <= m["line"] <= c["_range"][1]),
+            None,
+        )
+        if chunk is not None:
+            if chunk["source"] == "semantic":
+                chunk["score"] += score
+                chunk["source"] = "both"
+                chunk["matched_line"] = m["line"]
+            continue
+        fused.append({"file": m["file"], "lines": str(m["line"]), "source": "exact", "score": score, "text": m["text"]})
+
+    fused.sort(key=lambda e: e["score"], reverse=True)
+    for entry in fused:
+        entry.pop("_range", None)
+        entry["score"] = round(entry["score"], 4)
+    return fused
+
+
 async def code_search_handler(
     action: str = "search",
     query: str = "",
@@ -52,6 +144,7 @@ async def code_search_handler(
     context_lines: int = 0,
     max_results: int = 50,
     depth: int = 2,
+    symbols: list[str] | None = None,
     **kwargs,
 ) -> dict:
     """Dispatch a code_search action. See CODE_SEARCH_TOOL for the action contract."""
@@ -59,27 +152,20 @@ async def code_search_handler(
         if action == "search":
             if not query:
                 return {"error": "query is required for action='search'"}
-            semantic = await _semantic(query, top_k)
-            exact = await _grep_fallback(query, path, glob)
+            semantic, exact, dropped = await _retrieve(query, top_k, path, glob)
+            matches = _fuse(semantic, exact)
             result: dict = {
-                "semantic_matches": [
-                    {
-                        "file": r["file_path"],
-                        "lines": f"{r['start_line']}-{r['end_line']}",
-                        "language": r.get("language"),
-                        "app": r.get("app"),
-                        "similarity": r["similarity"],
-                        "code": r["content"],
-                    }
-                    for r in semantic
-                ],
-                "exact_matches": (exact or {}).get("matches", []),
+                "matches": matches,
+                "semantic_count": len(semantic),
+                "exact_count": len(exact),
             }
-            if not result["semantic_matches"] and not result["exact_matches"]:
+            if dropped:
+                result["timed_out"] = dropped
+            if not matches:
                 result["message"] = "No matches. Try action='grep' with a looser pattern, or action='tree' to explore."
             else:
                 result["message"] = (
-                    f"{len(result['semantic_matches'])} semantic, {len(result['exact_matches'])} exact. "
+                    f"{len(matches)} fused matches ({len(semantic)} semantic, {len(exact)} exact), best first. "
                     "Use action='read' to open any file, action='grep' to search further."
                 )
             return result
@@ -109,10 +195,14 @@ async def code_search_handler(
             return await local_repo.tree(path or "", depth=depth)
 
         if action in ("callers", "callees", "impact"):
-            if not query:
+            if not query and not symbols:
                 return {"error": f"query (the symbol name) is required for action='{action}'"}
             if not config.code_search.graph_enabled:
                 return {"error": "The code graph is not enabled; use action='grep' instead."}
+            if symbols:
+                return await code_graph.batch(
+                    action, [query, *symbols] if query else symbols, limit=max_results, depth=depth
+                )
             if action == "callers":
                 return await code_graph.callers(query, limit=max_results)
             if action == "callees":
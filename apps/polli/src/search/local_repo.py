@@ -13,9 +13,12 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import re
 from pathlib import Path
 
 from ..core.config import config
+from . import file_reader
+from .repo_index import RepoIndex, required_literals
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +65,71 @@ def _ensure_clone() -> None:
         raise RepoError(f"No repository clone at {REPO_DIR}. Run sync_repo() first.")
 
 
+# Resident index over the clone (see repo_index.py). Until the first build finishes, queries
+# fall back to git/ripgrep rather than wait on it.
+_index: RepoIndex | None = None
+_index_lock = asyncio.Lock()
+_index_task: asyncio.Task | None = None
+
+
+async def _refresh_index() -> RepoIndex:
+    """Bring the index to the clone's HEAD: patch from the diff when possible, else rebuild."""
+    global _index
+    async with _index_lock:
+        current = _index
+        if current is not None:
+            code, stdout, _ = await _run("git", "rev-parse", "HEAD")
+            head = stdout.strip()
+            try:
+                if code == 0 and not current.needs_rebuild():
+                    touched = await asyncio.to_thread(current.update, head)
+                    if not current.needs_rebuild():
+                        logger.info("Repo index updated to %s (%d files changed)", head[:8], touched)
+                        return current
+            except Exception as e:
+                logger.warning("Incremental index update failed, rebuilding: %s", e)
+        _index = await asyncio.to_thread(RepoIndex.build, REPO_DIR)
+        return _index
+
+
+async def _sync_index() -> None:
+    file_reader.invalidate()
+    # The clone itself is fine at this point; a failed index only costs the fast path.
+    try:
+        await _refresh_index()
+    except Exception as e:
+        logger.error("Repo index refresh failed: %s", e)
+
+
+def _ready_index() -> RepoIndex | None:
+    """The resident index if built; otherwise kick off a background build and return None."""
+    global _index_task
+    if _index is not None:
+        return _index
+    if _index_task is None or _index_task.done():
+        _index_task = asyncio.create_task(_refresh_index())
+        _index_task.add_done_callback(
+            lambda t: (
+                logger.error("Repo index build failed: %s", t.exception())
+                if not t.cancelled() and t.exception()
+                else None
+            )
+        )
+    return None
+
+
+def _compile(pattern: str, *, case_sensitive: bool, literal: bool) -> tuple[re.Pattern[str], list[str]] | None:
+    """Python regex plus required literals for an indexed grep; None means use ripgrep."""
+    literals = [pattern] if literal else required_literals(pattern)
+    if not literals or max(len(s) for s in literals) < 3:
+        return None  # no trigram to narrow on — ripgrep's full scan is faster
+    flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+    try:
+        return re.compile(re.escape(pattern) if literal else pattern, flags), literals
+    except re.error:
+        return None  # Rust-regex-only syntax
+
+
 async def grep(
     pattern: str,
     *,
@@ -72,10 +140,35 @@ async def grep(
     context_lines: int = 0,
     max_results: int = 50,
 ) -> dict:
-    """Search file contents with ripgrep. Returns matches with file/line/text."""
+    """Search file contents. Returns matches with file/line/text.
+
+    Served from the resident trigram index when the pattern has a literal to narrow on;
+    otherwise (or before the index is built) ripgrep runs over the clone.
+    """
     _ensure_clone()
     max_results = max(1, min(max_results, MAX_MATCHES))
 
+    index = _ready_index()
+    compiled = _compile(pattern, case_sensitive=case_sensitive, literal=literal)
+    if index is not None and compiled is not None and "{" not in (glob or ""):
+        regex, literals = compiled
+        under = str(_resolve_in_repo(path).relative_to(REPO_DIR.resolve())) if path else ""
+        matches = await asyncio.to_thread(
+            index.search,
+            regex,
+            literals,
+            under="" if under == "." else under,
+            glob=glob,
+            max_results=max_results,
+            max_line_chars=MAX_LINE_CHARS,
+        )
+        return {
+            "pattern": pattern,
+            "match_count": len(matches),
+            "matches": matches,
+            "truncated": len(matches) >= max_results,
+        }
+
     argv = ["rg", "--json", "--max-count", str(max_results), "--max-columns", str(MAX_LINE_CHARS)]
     if not case_sensitive:
         argv.append("--ignore-case")
@@ -133,22 +226,17 @@ async def read_file(path: str, *, start_line: int = 1, end_line: int | None = No
         raise RepoError(f"Not a file: {path}")
 
     try:
-        text = target.read_text(encoding="utf-8", errors="replace")
+        window = await asyncio.to_thread(file_reader.read_window, target, start_line, end_line, MAX_FILE_LINES)
     except OSError as e:
         raise RepoError(f"Could not read {path}: {e}") from e
 
-    lines = text.split("\n")
-    total = len(lines)
-    start = max(1, start_line)
-    end = min(end_line or total, total, start + MAX_FILE_LINES - 1)
-
     return {
         "file": path,
-        "total_lines": total,
-        "start_line": start,
-        "end_line": end,
-        "truncated": end < total,
-        "content": "\n".join(lines[start - 1 : end]),
+        "total_lines": window.total_lines,
+        "start_line": window.start_line,
+        "end_line": window.end_line,
+        "truncated": window.end_line < window.total_lines,
+        "content": window.content,
     }
 
 
@@ -156,19 +244,23 @@ async def list_files(path: str = "", *, glob: str | None = None, max_results: in
     """List tracked files, optionally under `path` and/or matching `glob`."""
     _ensure_clone()
     max_results = max(1, min(max_results, MAX_LIST_ENTRIES))
-
-    argv = ["git", "ls-files"]
-    if glob:
-        argv += ["--", f"{path.rstrip('/')}/{glob}" if path else glob]
-    elif path:
+    if path and not glob:
         _resolve_in_repo(path)  # validate before passing through
-        argv += ["--", path]
 
-    code, stdout, stderr = await _run(*argv)
-    if code != 0:
-        raise RepoError(f"git ls-files failed: {stderr.strip()[:200]}")
-
-    files = [f for f in stdout.splitlines() if f]
+    index = _ready_index()
+    if index is not None:
+        files = index.list_files(path, glob)
+    else:
+        argv = ["git", "ls-files"]
+        if glob:
+            argv += ["--", f"{path.rstrip('/')}/{glob}" if path else glob]
+        elif path:
+            argv += ["--", path]
+
+        code, stdout, stderr = await _run(*argv)
+        if code != 0:
+            raise RepoError(f"git ls-files failed: {stderr.strip()[:200]}")
+        files = [f for f in stdout.splitlines() if f]
     return {
         "path": path or "(repo root)",
         "file_count": len(files),
@@ -183,13 +275,20 @@ async def tree(path: str = "", *, depth: int = 2) -> dict:
     depth = max(1, min(depth, 4))
     root = _resolve_in_repo(path) if path else REPO_DIR.resolve()
 
-    code, stdout, stderr = await _run("git", "ls-files")
-    if code != 0:
-        raise RepoError(f"git ls-files failed: {stderr.strip()[:200]}")
+    index = _ready_index()
+    if index is not None:
+        files = index.files()
+    else:
+        code, stdout, stderr = await _run("git", "ls-files")
+        if code != 0:
+            raise RepoError(f"git ls-files failed: {stderr.strip()[:200]}")
+        files = stdout.splitlines()
 
     prefix = str(root.relative_to(REPO_DIR.resolve())) if path else ""
+    if prefix == ".":
+        prefix = ""
     entries: set[str] = set()
-    for file in stdout.splitlines():
+    for file in files:
         if prefix and not file.startswith(prefix + "/"):
             continue
         rel = file[len(prefix) + 1 :] if prefix else file
@@ -227,6 +326,7 @@ async def sync_repo() -> dict:
         )
         if code != 0:
             raise RepoError(f"git clone failed: {stderr.strip()[:200]}")
+        await _sync_index()
         return await repo_status()
 
     code, _, stderr = await _run("git", "fetch", "--depth=1", "origin", branch)
@@ -235,4 +335,5 @@ async def sync_repo() -> dict:
     code, _, stderr = await _run("git", "reset", "--hard", f"origin/{branch}")
     if code != 0:
         raise RepoError(f"git reset failed: {stderr.strip()[:200]}")
+    await _sync_index()
     return await repo_status()
@@ -0,0 +1,294 @@
+"""Resident file list and trigram content index over the local clone.
+
+`local_repo` used to answer every `list_files`/`tree` with a fresh `git ls-files` and every
+`grep` with a fresh ripgrep process. A tool loop fires dozens of those per question, and
+the fork/exec plus JSON parsing dominated. This index keeps the tracked file list in memory
+and maps every lowercase byte trigram to the ids of the files that contain it, so a grep
+only opens the handful of files that can possibly match.
+
+File contents are *not* kept resident — candidates are re-read from disk at query time, so
+memory stays at the postings (a few MB for this repo). After `sync_repo` the index is
+patched from `git diff old..new`: changed files get a fresh id and their old id is
+tombstoned; once tombstones pile up past a quarter of all ids, it rebuilds from scratch.
+
+Everything here is synchronous and meant to run under `asyncio.to_thread`; a lock
+serialises updates against the (short) candidate lookups.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import logging
+import re
+import subprocess
+import threading
+from array import array
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Files above this are listed but not trigram-indexed; grep always treats them as candidates.
+MAX_INDEXED_BYTES = 1 << 20
+# rg's binary heuristic: a NUL byte in the head of the file.
+BINARY_SNIFF_BYTES = 8192
+REBUILD_TOMBSTONE_RATIO = 0.25
+GIT_TIMEOUT_SECONDS = 30
+
+_GLOB_CHARS = frozenset("*?[")
+# Escapes that consume more than one following character; too fiddly to extract literals past.
+_MULTI_CHAR_ESCAPES = frozenset("xuUNpPgk0123456789")
+
+
+def _git(repo: Path, *args: str) -> bytes:
+    result = subprocess.run(
+        ["git", *args], cwd=str(repo), capture_output=True, timeout=GIT_TIMEOUT_SECONDS, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()[:200]}")
+    return result.stdout
+
+
+def _trigrams(data: bytes) -> set[bytes]:
+    return {data[i : i + 3] for i in range(len(data) - 2)}
+
+
+def is_hidden(path: str) -> bool:
+    """ripgrep skips dotfiles and dot-directories by default; grep keeps that behaviour."""
+    return any(part.startswith(".") for part in path.split("/"))
+
+
+def required_literals(pattern: str) -> list[str] | None:
+    """Substrings every match of `pattern` must contain, or None if that can't be known.
+
+    Conservative on purpose: only literal runs at the top level of the regex count — group
+    contents, classes and anything followed by an optional quantifier break the run, and a
+    top-level alternation gives up entirely.
+    """
+    runs: list[str] = []
+    cur: list[str] = []
+    depth = 0
+    i, n = 0, len(pattern)
+
+    def flush() -> None:
+        if cur:
+            runs.append("".join(cur))
+            cur.clear()
+
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            nxt = pattern[i + 1 : i + 2]
+            if not nxt or nxt in _MULTI_CHAR_ESCAPES:
+                return None
+            i += 2
+            if depth == 0 and not nxt.isalnum():
+                cur.append(nxt)
+            else:
+                flush()
+            continue
+        if c == "[":
+            flush()
+            i += 1
+            if i < n and pattern[i] == "^":
+                i += 1
+            if i < n and pattern[i] == "]":
+                i += 1
+            while i < n and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            continue
+        if c == "(":
+            flush()
+            depth += 1
+        elif c == ")":
+            depth = max(0, depth - 1)
+        elif c == "|":
+            if depth == 0:
+                return None
+        elif c in "?*{":
+            # The previous atom may appear zero times.
+            if cur:
+                cur.pop()
+            flush()
+            if c == "{":
+                end = pattern.find("}", i)
+                i = n if end < 0 else end
+        elif c == "+":
+            flush()
+        elif c in ".^$":
+            flush()
+        elif depth == 0:
+            cur.append(c)
+        i += 1
+    flush()
+    return runs
+
+
+class RepoIndex:
+    """In-memory tracked-file list plus trigram postings for one clone."""
+
+    def __init__(self, repo: Path):
+        self.repo = repo
+        self.commit = ""
+        self._lock = threading.Lock()
+        self._paths: list[str | None] = []  # file id -> path; None once tombstoned
+        self._ids: dict[str, int] = {}
+        self._postings: dict[bytes, array] = {}
+        self._unindexed: set[int] = set()  # too large to index, but searchable
+        self._binary: set[int] = set()
+        self._tombstones = 0
+        self._sorted: list[str] | None = None
+
+    # ------------------------------------------------------------------ building
+
+    @classmethod
+    def build(cls, repo: Path) -> RepoIndex:
+        index = cls(repo)
+        index.commit = _git(repo, "rev-parse", "HEAD").decode().strip()
+        files = [f for f in _git(repo, "ls-files", "-z").decode("utf-8", "replace").split("\0") if f]
+        for path in files:
+            index._add(path)
+        logger.info("Built repo index at %s: %d files, %d trigrams", index.commit[:8], len(files), len(index._postings))
+        return index
+
+    def _add(self, path: str) -> None:
+        file_id = len(self._paths)
+        self._paths.append(path)
+        self._ids[path] = file_id
+        self._sorted = None
+        try:
+            with open(self.repo / path, "rb") as f:
+                data = f.read(MAX_INDEXED_BYTES + 1)
+        except OSError:
+            # Submodule gitlinks, broken symlinks: listed, never grepped.
+            self._binary.add(file_id)
+            return
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            self._binary.add(file_id)
+            return
+        if len(data) > MAX_INDEXED_BYTES:
+            self._unindexed.add(file_id)
+            return
+        postings = self._postings
+        for gram in _trigrams(data.lower()):
+            bucket = postings.get(gram)
+            if bucket is None:
+                postings[gram] = bucket = array("I")
+            bucket.append(file_id)
+
+    def _remove(self, path: str) -> None:
+        file_id = self._ids.pop(path, None)
+        if file_id is None:
+            return
+        self._paths[file_id] = None
+        self._unindexed.discard(file_id)
+        self._binary.discard(file_id)
+        self._tombstones += 1
+        self._sorted = None
+
+    def needs_rebuild(self) -> bool:
+        return self._tombstones > len(self._paths) * REBUILD_TOMBSTONE_RATIO
+
+    def update(self, new_commit: str) -> int:
+        """Patch the index from `self.commit` to `new_commit`; returns files touched.
+
+        The working tree must already be at `new_commit`. Raises if the old commit is gone
+        (e.g. pruned from the shallow clone) — the caller rebuilds instead.
+        """
+        if new_commit == self.commit:
+            return 0
+        out = _git(self.repo, "diff", "--name-only", "--no-renames", "-z", self.commit, new_commit)
+        changed = [p for p in out.decode("utf-8", "replace").split("\0") if p]
+        with self._lock:
+            for path in changed:
+                self._remove(path)
+                if (self.repo / path).exists() or (self.repo / path).is_symlink():
+                    self._add(path)
+            self.commit = new_commit
+        return len(changed)
+
+    # ------------------------------------------------------------------ queries
+
+    def files(self) -> list[str]:
+        """All tracked paths, sorted like `git ls-files`."""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._ids)
+            return self._sorted
+
+    def list_files(self, path: str = "", glob: str | None = None) -> list[str]:
+        """Same selection as `git ls-files -- <pathspec>` with git's default pathspec rules."""
+        files = self.files()
+        spec = (f"{path.rstrip('/')}/{glob}" if path else glob) if glob else path.rstrip("/")
+        if not spec or spec == ".":
+            return list(files)
+        if _GLOB_CHARS.intersection(spec):
+            # Git pathspec wildcards match across "/"; so does fnmatch.
+            return [f for f in files if fnmatch.fnmatchcase(f, spec) or f.startswith(spec + "/")]
+        return [f for f in files if f == spec or f.startswith(spec + "/")]
+
+    def candidates(self, literals: list[str], *, ignore_case: bool) -> list[str]:
+        """Tracked text files that contain every trigram of every literal, sorted by path."""
+        grams: set[bytes] = set()
+        for literal in literals:
+            data = literal.encode("utf-8").lower()
+            for gram in _trigrams(data):
+                # bytes.lower() only folds ASCII; with -i a non-ASCII trigram could miss.
+                if ignore_case and not gram.isascii():
+                    continue
+                grams.add(gram)
+        with self._lock:
+            if grams:
+                buckets = sorted((self._postings.get(g, array("I")) for g in grams), key=len)
+                ids = set(buckets[0])
+                for bucket in buckets[1:]:
+                    if not ids:
+                        break
+                    ids.intersection_update(bucket)
+                ids |= self._unindexed
+            else:
+                ids = {i for i, p in enumerate(self._paths) if p is not None and i not in self._binary}
+            paths = [self._paths[i] for i in ids]
+        return sorted(p for p in paths if p is not None)
+
+    def search(
+        self,
+        regex: re.Pattern[str],
+        literals: list[str],
+        *,
+        under: str = "",
+        glob: str | None = None,
+        max_results: int,
+        max_line_chars: int,
+    ) -> list[dict]:
+        """Line matches of `regex`, at most `max_results` per file and overall (like rg --max-count)."""
+        ignore_case = bool(regex.flags & re.IGNORECASE)
+        negate = bool(glob and glob.startswith("!"))
+        pattern = glob[1:] if glob and negate else glob
+        matches: list[dict] = []
+        for path in self.candidates(literals, ignore_case=ignore_case):
+            if under and path != under and not path.startswith(under + "/"):
+                continue
+            if is_hidden(path):
+                continue
+            if pattern:
+                # rg: a glob without "/" matches the basename at any depth.
+                subject = path if "/" in pattern else path.rsplit("/", 1)[-1]
+                if fnmatch.fnmatchcase(subject, pattern.lstrip("/")) == negate:
+                    continue
+            try:
+                text = (self.repo / path).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            if not regex.search(text):
+                continue
+            per_file = 0
+            for number, line in enumerate(text.split("\n"), 1):
+                if regex.search(line):
+                    matches.append({"file": path, "line": number, "text": line.rstrip("\r")[:max_line_chars]})
+                    per_file += 1
+                    if len(matches) >= max_results:
+                        return matches
+                    if per_file >= max_results:
+                        break
+        return matches
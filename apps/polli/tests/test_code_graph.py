@@ -0,0 +1,145 @@
+import asyncio
+import json
+import sqlite3
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.search import code_graph
+from src.search.local_repo import RepoError
+
+# file -contains-> handler, main -calls-> handler -calls-> helper, test -imports-> main
+NODES = [
+    ("f1", "app.py", "file", "app.py", 1, "app.py"),
+    ("n1", "main", "function", "app.py", 10, "app.main"),
+    ("n2", "handler", "function", "app.py", 20, "app.handler"),
+    ("n3", "helper", "function", "util.py", 5, "util.helper"),
+    ("n4", "test_main", "function", "tests/test_app.py", 3, "tests.test_main"),
+]
+EDGES = [
+    ("f1", "n2", "contains"),
+    ("n1", "n2", "calls"),
+    ("n2", "n3", "calls"),
+    ("n4", "n1", "imports"),
+]
+
+
+def _build_store(path: Path) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE nodes (id, name, kind, file_path, start_line, qualified_name)")
+    conn.execute("CREATE TABLE edges (source, target, kind)")
+    conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)", NODES)
+    conn.executemany("INSERT INTO edges VALUES (?, ?, ?)", EDGES)
+    conn.commit()
+    conn.close()
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self._tmp.name) / "codegraph.db"
+        _build_store(self.db)
+        self.graph = code_graph._Graph.load(self.db)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_callers_and_callees_follow_call_edges_only(self):
+        self.assertEqual([n["symbol"] for n in self.graph.callers("handler", 10)], ["main"])
+        self.assertEqual([n["symbol"] for n in self.graph.callees("handler", 10)], ["helper"])
+        self.assertEqual(
+            self.graph.callees("main", 10), [{"symbol": "handler", "kind": "function", "file": "app.py", "line": 20}]
+        )
+
+    def test_qualified_names_resolve_to_the_same_symbol(self):
+        self.assertEqual(self.graph.callers("util.helper", 10), self.graph.callers("helper", 10))
+
+    def test_impact_walks_dependents_but_not_containment(self):
+        self.assertEqual([n["symbol"] for n in self.graph.impact("helper", 1)], ["handler"])
+        # Sorted by file, then line; the containing file node is not a dependent.
+        self.assertEqual([n["symbol"] for n in self.graph.impact("helper", 3)], ["main", "handler", "test_main"])
+
+    def test_unknown_symbol_and_unknown_layout_raise(self):
+        with self.assertRaises(RepoError):
+            self.graph.callers("missing", 10)
+        other = Path(self._tmp.name) / "other.db"
+        conn = sqlite3.connect(other)
+        conn.execute("CREATE TABLE nodes (id, label)")
+        conn.execute("CREATE TABLE edges (source, target, kind)")
+        conn.close()
+        with self.assertRaises(RepoError):
+            code_graph._Graph.load(other)
+
+
+class ServiceTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.repo = Path(self._tmp.name)
+        (self.repo / ".codegraph").mkdir()
+        self.db = self.repo / ".codegraph" / "codegraph.db"
+        # Stand-in for the codegraph CLI: prints canned JSON, records its arguments.
+        self.calls = self.repo / "calls.log"
+        binary = self.repo / "codegraph"
+        reply = {"callers": [{"name": "cli_caller", "kind": "function", "filePath": "cli.py", "startLine": 7}]}
+        binary.write_text(f"#!/bin/sh\necho \"$@\" >> {self.calls}\necho '{json.dumps(reply)}'\n")
+        binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+        fake_config = SimpleNamespace(code_search=SimpleNamespace(codegraph_binary=str(binary)))
+        self._patches = [
+            patch.object(code_graph, "REPO_DIR", self.repo),
+            patch.object(code_graph, "config", fake_config),
+            patch.object(code_graph, "_service", None),
+        ]
+        for p in self._patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self._patches:
+            p.stop()
+        self._tmp.cleanup()
+
+    async def test_falls_back_to_the_cli_without_a_snapshot(self):
+        result = await code_graph.callers("handler", limit=5)
+
+        self.assertEqual(result["results"], [{"symbol": "cli_caller", "kind": "function", "file": "cli.py", "line": 7}])
+        self.assertEqual(self.calls.read_text().split(), ["callers", "handler", "--json", "--limit", "5"])
+
+    async def test_snapshot_serves_queries_once_loaded(self):
+        service = code_graph.CodeGraphService(self.db)
+        code_graph._service = service
+        self.assertIsNone(service.schedule_reload())  # nothing built yet
+
+        _build_store(self.db)
+        await service.schedule_reload()
+
+        result = await code_graph.callers("handler")
+        self.assertEqual([r["symbol"] for r in result["results"]], ["main"])
+        self.assertFalse(self.calls.exists())
+
+    async def test_sync_graph_reloads_in_the_background(self):
+        _build_store(self.db)
+        service = code_graph.CodeGraphService(self.db)
+        code_graph._service = service
+
+        result = await code_graph.sync_graph()
+
+        self.assertEqual(result, {"action": "sync", "ok": True})
+        self.assertFalse(service.loaded)  # the reload has been scheduled, not awaited
+        await asyncio.gather(*service._tasks)
+        self.assertTrue(service.loaded)
+
+    async def test_close_cancels_a_pending_reload(self):
+        _build_store(self.db)
+        service = code_graph.CodeGraphService(self.db)
+        task = service.schedule_reload()
+
+        await service.close()
+
+        self.assertTrue(task.cancelled())
+        self.assertFalse(service._tasks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from src.search import handlers
+
+
+def _chunk(file_path: str, start: int, end: int, similarity: float = 0.8) -> dict:
+    return {
+        "file_path": file_path,
+        "start_line": start,
+        "end_line": end,
+        "content": f"{file_path}:{start}-{end}",
+        "language": "python",
+        "app": "polli",
+        "similarity": similarity,
+    }
+
+
+def _hit(file: str, line: int) -> dict:
+    return {"file": file, "line": line, "text": f"{file}:{line}"}
+
+
+def _score(*ranks: int) -> float:
+    return round(sum(1 / (handlers.RRF_K + r) for r in ranks), 4)
+
+
+class FuseTests(unittest.TestCase):
+    def test_ranks_by_reciprocal_rank_across_both_lists(self):
+        semantic = [_chunk("a.py", 1, 20), _chunk("b.py", 1, 20)]
+        exact = [_hit("c.py", 5), _hit("b.py", 10)]
+
+        fused = handlers._fuse(semantic, exact)
+
+        # b.py is #2 semantic and #2 exact, so it beats a.py (#1 semantic only), which ties
+        # with c.py (#1 exact only) and keeps its place from the stable sort.
+        self.assertEqual(
+            [(e["file"], e["source"], e["score"]) for e in fused],
+            [
+                ("b.py", "both", _score(2, 2)),
+                ("a.py", "semantic", _score(1)),
+                ("c.py", "exact", _score(1)),
+            ],
+        )
+        self.assertEqual(fused[0]["matched_line"], 10)
+        self.assertEqual(fused[0]["lines"], "1-20")
+
+    def test_overlapping_chunks_of_one_file_collapse_before_ranking(self):
+        semantic = [_chunk("a.py", 10, 40), _chunk("a.py", 30, 60), _chunk("b.py", 1, 20), _chunk("a.py", 41, 80)]
+
+        fused = handlers._fuse(semantic, [])
+
+        # The 30-60 window overlaps the better 10-40 one and takes no rank: b.py is #2.
+        self.assertEqual(
+            [(e["file"], e["lines"], e["score"]) for e in fused],
+            [
+                ("a.py", "10-40", _score(1)),
+                ("b.py", "1-20", _score(2)),
+                ("a.py", "41-80", _score(3)),
+            ],
+        )
+
+    def test_repeated_exact_lines_count_once(self):
+        fused = handlers._fuse([], [_hit("a.py", 3), _hit("a.py", 3), _hit("b.py", 1)])
+
+        self.assertEqual([(e["file"], e["score"]) for e in fused], [("a.py", _score(1)), ("b.py", _score(2))])
+        self.assertNotIn("_range", fused[0])
+
+
+class SearchActionTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        fake_config = SimpleNamespace(code_search=SimpleNamespace(is_configured=True, local_repo_enabled=True))
+        self.search_code = AsyncMock(return_value=[_chunk("a.py", 1, 20)])
+        self.grep = AsyncMock(return_value={"matches": [_hit("a.py", 4), _hit("z.py", 9)]})
+        self._patches = [
+            patch.object(handlers, "config", fake_config),
+            patch.object(handlers, "search_code", self.search_code),
+            patch.object(handlers.local_repo, "grep", self.grep),
+        ]
+        for p in self._patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    async def test_returns_one_fused_list(self):
+        result = await handlers.code_search_handler("search", "handler", top_k=5)
+
+        self.assertEqual(set(result), {"matches", "semantic_count", "exact_count", "message"})
+        self.assertEqual((result["semantic_count"], result["exact_count"]), (1, 2))
+        self.assertEqual([(m["file"], m["source"]) for m in result["matches"]], [("a.py", "both"), ("z.py", "exact")])
+        self.search_code.assert_awaited_once_with("handler", top_k=5)
+        self.grep.assert_awaited_once_with("handler", path=None, glob=None, literal=True, max_results=20)
+
+    async def test_slow_retriever_is_dropped_at_the_deadline(self):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        self.search_code.side_effect = hang
+        with patch.object(handlers, "SEARCH_DEADLINE_SECONDS", 0.05):
+            result = await handlers.code_search_handler("search", "handler")
+
+        self.assertEqual(result["timed_out"], ["semantic"])
+        self.assertEqual([m["source"] for m in result["matches"]], ["exact", "exact"])
+
+    async def test_failed_semantic_search_still_answers_with_exact_matches(self):
+        self.search_code.side_effect = RuntimeError("Vectorize down")
+
+        result = await handlers.code_search_handler("search", "handler")
+
+        self.assertNotIn("timed_out", result)
+        self.assertEqual(result["semantic_count"], 0)
+        self.assertEqual(len(result["matches"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
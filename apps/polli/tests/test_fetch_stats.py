@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from src.integrations import fetch_stats, web_scraper
+from src.integrations.fetch_stats import FetcherStats
+
+LAYERS = {"rnet": 1.5, "scrapling": 3.0, "jina": 5.0}
+
+
+class OrderTests(unittest.TestCase):
+    def setUp(self):
+        self.stats = FetcherStats()
+
+    def test_unseen_host_keeps_the_default_chain(self):
+        self.assertEqual(self.stats.order("example.com", LAYERS), ["rnet", "scrapling", "jina"])
+
+    def test_faster_reliable_layer_moves_ahead(self):
+        for _ in range(5):
+            self.stats.record("example.com", "rnet", True, 6.0)
+            self.stats.record("example.com", "scrapling", True, 0.4)
+
+        self.assertEqual(self.stats.order("example.com", LAYERS), ["scrapling", "rnet", "jina"])
+
+    def test_persistently_failing_layer_is_skipped_on_that_host_only(self):
+        for _ in range(3):
+            self.stats.record("walled.example", "rnet", False, 0.2)
+
+        self.assertEqual(self.stats.order("walled.example", LAYERS), ["scrapling", "jina"])
+        self.assertEqual(self.stats.order("open.example", LAYERS), ["rnet", "scrapling", "jina"])
+
+    def test_failures_below_the_evidence_threshold_demote_but_do_not_skip(self):
+        for _ in range(2):
+            self.stats.record("example.com", "rnet", False, 0.2)
+
+        # Expected cost 1.5s / (0.5 / 3) = 9s: behind scrapling (6s), ahead of jina (10s).
+        self.assertEqual(self.stats.order("example.com", LAYERS), ["scrapling", "rnet", "jina"])
+
+    def test_skipped_layer_is_retried_after_its_evidence_decays(self):
+        with patch.object(fetch_stats.time, "monotonic", return_value=1000.0):
+            for _ in range(3):
+                self.stats.record("walled.example", "rnet", False, 0.2)
+            self.assertNotIn("rnet", self.stats.order("walled.example", LAYERS))
+
+        later = 1000.0 + fetch_stats.HALF_LIFE_SECONDS
+        with patch.object(fetch_stats.time, "monotonic", return_value=later):
+            self.assertIn("rnet", self.stats.order("walled.example", LAYERS))
+
+    def test_latency_quantile_uses_successes_only(self):
+        for seconds in (1.0, 2.0, 3.0, 4.0):
+            self.stats.record("example.com", "rnet", True, seconds)
+        self.stats.record("example.com", "rnet", False, 30.0)
+
+        self.assertEqual(self.stats.latency_quantile("example.com", "rnet", 0.9), 4.0)
+        self.assertIsNone(self.stats.latency_quantile("example.com", "jina", 0.9))
+
+    def test_only_recent_hosts_are_kept(self):
+        stats = FetcherStats(max_hosts=2)
+        for host in ("a.example", "b.example", "c.example"):
+            for _ in range(3):
+                stats.record(host, "rnet", False, 0.2)
+
+        self.assertEqual(stats.order("a.example", LAYERS), ["rnet", "scrapling", "jina"])
+        self.assertEqual(stats.order("c.example", LAYERS), ["scrapling", "jina"])
+
+
+class ScrapeUrlOrderTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.stats = FetcherStats()
+        self.calls: list[str] = []
+        self.working = {"scrapling"}
+
+        async def fetch_layer(layer, url, timeout, validators=None):
+            self.calls.append(layer)
+            return f"# {layer}" if layer in self.working else None
+
+        self.crawl4ai = AsyncMock(return_value={"success": True, "url": "u", "markdown": "# browser"})
+        self._patches = [
+            patch.object(web_scraper, "fetcher_stats", self.stats),
+            patch.object(web_scraper, "_fetch_layer", fetch_layer),
+            patch.object(web_scraper, "_try_x_api", AsyncMock(return_value=None)),
+            patch.object(web_scraper, "get_cache", lambda: None),
+            patch.object(web_scraper, "_scrape_with_crawl4ai", self.crawl4ai),
+        ]
+        for p in self._patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    async def test_host_history_reorders_layers(self):
+        for _ in range(2):
+            result = await web_scraper.scrape_url("https://docs.example/page")
+            self.assertEqual(result["_fetcher"], "scrapling")
+        await web_scraper.scrape_url("https://other.example/page")
+
+        # docs.example learned scrapling works; other.example still starts with rnet.
+        self.assertEqual(self.calls, ["rnet", "scrapling", "scrapling", "rnet", "scrapling"])
+
+    async def test_layers_failing_on_a_host_are_not_tried(self):
+        for _ in range(3):
+            self.stats.record("docs.example", "rnet", False, 0.2)
+            self.stats.record("docs.example", "scrapling", False, 0.2)
+        self.working = {"rnet", "scrapling", "jina"}
+
+        result = await web_scraper.scrape_url("https://docs.example/page")
+
+        self.assertEqual((result["_fetcher"], self.calls), ("jina", ["jina"]))
+
+    async def test_browser_outcome_is_recorded_when_fast_layers_fail(self):
+        self.working = set()
+
+        result = await web_scraper.scrape_url("https://app.example/")
+
+        self.assertEqual(result["markdown"], "# browser")
+        self.assertEqual(self.calls, ["rnet", "scrapling", "jina"])
+        self.assertEqual(self.stats.layer("app.example", "crawl4ai").successes, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
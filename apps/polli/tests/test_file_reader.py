@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.search import file_reader
+
+SAMPLES = {
+    "lf": b"alpha\nbeta\n\ngamma\n",
+    "crlf": b"alpha\r\nbeta\r\n\r\ngamma\r\n",
+    "cr": b"alpha\rbeta\r\rgamma\r",
+    "mixed": b"alpha\r\nbeta\rgamma\ndelta",
+    "no_trailing_newline": b"alpha\nbeta",
+    "empty": b"",
+    "utf8": "café\r\nüber\rnaïve\n".encode(),
+}
+
+
+def _old_read(target: Path, start_line: int, end_line: int | None, max_lines: int) -> tuple[int, int, int, str]:
+    """The split-based reader file_reader replaced."""
+    lines = target.read_text(encoding="utf-8", errors="replace").split("\n")
+    total = len(lines)
+    start = max(1, start_line)
+    end = min(end_line or total, total, start + max_lines - 1)
+    return total, start, end, "\n".join(lines[start - 1 : end])
+
+
+class ReadWindowTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        file_reader.invalidate()
+
+    def tearDown(self):
+        file_reader.invalidate()
+        self._tmp.cleanup()
+
+    def _assert_matches_old_reader(self):
+        for name, data in SAMPLES.items():
+            target = self.dir / name
+            target.write_bytes(data)
+            for start in range(1, 7):
+                for end in (None, start, start + 1, 10):
+                    for max_lines in (1, 2, 100):
+                        with self.subTest(name=name, start=start, end=end, max_lines=max_lines):
+                            window = file_reader.read_window(target, start, end, max_lines)
+                            self.assertEqual(
+                                (window.total_lines, window.start_line, window.end_line, window.content),
+                                _old_read(target, start, end, max_lines),
+                            )
+
+    def test_resident_files_match_the_split_reader(self):
+        self._assert_matches_old_reader()
+
+    def test_mmapped_files_match_the_split_reader(self):
+        with patch.object(file_reader, "HOT_FILE_MAX_BYTES", 0):
+            self._assert_matches_old_reader()
+
+    def test_edited_file_is_reread(self):
+        target = self.dir / "f.txt"
+        target.write_bytes(b"one\ntwo\n")
+        self.assertEqual(file_reader.read_window(target, 1, None, 10).content, "one\ntwo\n")
+        target.write_bytes(b"three\rfour\rfive")
+        self.assertEqual(file_reader.read_window(target, 2, None, 10).content, "four\nfive")
+
+
+if __name__ == "__main__":
+    unittest.main()
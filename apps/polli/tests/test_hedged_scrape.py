@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from src.integrations import web_scraper
+from src.integrations.fetch_stats import FetcherStats
+
+HEDGE_DELAY = 0.02
+
+
+class FakeFetchers:
+    """Fast-path layers with scripted latencies and results; tracks concurrency and cancellation."""
+
+    def __init__(self, delays: dict[str, float], working: set[str]):
+        self.delays = delays
+        self.working = working
+        self.started: list[str] = []
+        self.cancelled: list[str] = []
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, layer: str, url: str, timeout: int, validators: dict | None = None) -> str | None:
+        self.started.append(layer)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delays[layer])
+        except asyncio.CancelledError:
+            self.cancelled.append(layer)
+            raise
+        finally:
+            self.running -= 1
+        return f"# {layer} {url}" if layer in self.working else None
+
+
+class HedgeTestCase(unittest.IsolatedAsyncioTestCase):
+    delays = {"rnet": 1.0, "scrapling": 0.01, "jina": 1.0}
+    working = {"rnet", "scrapling", "jina"}
+
+    async def asyncSetUp(self):
+        self.stats = FetcherStats()
+        self.fetchers = FakeFetchers(dict(self.delays), set(self.working))
+        self._patches = [
+            patch.object(web_scraper, "fetcher_stats", self.stats),
+            patch.object(web_scraper, "_fetch_layer", self.fetchers),
+            patch.object(web_scraper, "_hedge_delay", lambda host, layer: HEDGE_DELAY),
+            patch.object(web_scraper, "HEDGE_RETRY_SECONDS", 0.01),
+            patch.object(web_scraper, "_try_x_api", AsyncMock(return_value=None)),
+            patch.object(web_scraper, "get_cache", lambda: None),
+            patch.object(web_scraper, "_scrape_with_crawl4ai", AsyncMock(return_value={"success": False})),
+        ]
+        for p in self._patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    async def race(self, limiter: asyncio.Semaphore | None, layers=("rnet", "scrapling", "jina")):
+        return await web_scraper._hedged_fast_path("example.com", "https://example.com/", 30, list(layers), limiter)
+
+
+class HedgedFastPathTests(HedgeTestCase):
+    async def test_slow_primary_is_hedged_and_cancelled_when_the_hedge_wins(self):
+        won = await self.race(None)
+
+        self.assertEqual(won[0], "scrapling")
+        self.assertEqual(self.fetchers.started, ["rnet", "scrapling"])
+        self.assertEqual((self.fetchers.cancelled, self.fetchers.running), (["rnet"], 0))
+        # Only the finished fetch feeds the host's stats; the cancelled one says nothing.
+        self.assertEqual(self.stats.layer("example.com", "scrapling").successes, 1)
+        self.assertEqual(self.stats.layer("example.com", "rnet").attempts(), 0)
+
+    async def test_hedge_takes_a_free_slot_and_gives_it_back(self):
+        limiter = asyncio.Semaphore(2)
+        await limiter.acquire()  # the caller's own slot
+
+        won = await self.race(limiter)
+
+        self.assertEqual(won[0], "scrapling")
+        self.assertEqual(self.fetchers.peak, 2)
+        # The caller still holds its slot; the hedge's slot is free again.
+        self.assertFalse(limiter.locked())
+        await limiter.acquire()
+        self.assertTrue(limiter.locked())
+
+    async def test_no_hedge_without_a_free_slot(self):
+        self.fetchers.delays["rnet"] = 0.05
+        limiter = asyncio.Semaphore(1)
+        await limiter.acquire()
+
+        won = await self.race(limiter)
+
+        self.assertEqual((won[0], self.fetchers.started, self.fetchers.peak), ("rnet", ["rnet"], 1))
+        self.assertTrue(limiter.locked())
+
+    async def test_failed_primary_hands_over_on_the_callers_slot(self):
+        self.fetchers.delays = {"rnet": 0.001, "scrapling": 0.001, "jina": 0.001}
+        self.fetchers.working = {"jina"}
+        limiter = asyncio.Semaphore(1)
+        await limiter.acquire()
+
+        won = await self.race(limiter)
+
+        self.assertEqual(
+            (won[0], self.fetchers.started, self.fetchers.peak), ("jina", ["rnet", "scrapling", "jina"], 1)
+        )
+
+    async def test_cancelling_the_scrape_stops_every_fetch_and_frees_hedge_slots(self):
+        self.fetchers.delays = {"rnet": 1.0, "scrapling": 1.0, "jina": 1.0}
+        limiter = asyncio.Semaphore(3)
+        await limiter.acquire()
+        race = asyncio.ensure_future(self.race(limiter))
+        while len(self.fetchers.started) < 3:
+            await asyncio.sleep(0.005)
+
+        race.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await race
+
+        self.assertEqual((sorted(self.fetchers.cancelled), self.fetchers.running), (["jina", "rnet", "scrapling"], 0))
+        for _ in range(2):
+            self.assertFalse(limiter.locked())
+            await limiter.acquire()
+        self.assertTrue(limiter.locked())
+
+
+class ScrapeMultipleTests(HedgeTestCase):
+    delays = {"rnet": 0.2, "scrapling": 0.01, "jina": 0.2}
+
+    async def test_hedging_is_opt_in(self):
+        await web_scraper.scrape_multiple(["https://a.example/"])
+
+        self.assertEqual(self.fetchers.started, ["rnet"])
+
+    async def test_hedges_stay_within_max_concurrent(self):
+        urls = [f"https://h{i}.example/" for i in range(6)]
+
+        result = await web_scraper.scrape_multiple(urls, max_concurrent=4, hedge=True)
+
+        self.assertEqual(result["succeeded"], 6)
+        self.assertLessEqual(self.fetchers.peak, 4)
+        self.assertIn("scrapling", self.fetchers.started)
+
+
+if __name__ == "__main__":
+    unittest.main()
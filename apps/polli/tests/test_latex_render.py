@@ -0,0 +1,74 @@
+import io
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from src.discord import media
+from src.utils.cache import LRUCache
+
+ALIGN = r"\begin{align} x &= 1 \\ y &= 2 \nonumber \end{align}"
+MATRIX = r"\begin{pmatrix} 1 & 2 \\ 3 & 4 \end{pmatrix}"
+
+
+class MathtextSourceTests(unittest.TestCase):
+    def test_plain_formula_is_one_line(self):
+        self.assertEqual(media._mathtext_source(r"\frac{a}{b}"), r"$\frac{a}{b}$")
+
+    def test_aligned_rows_become_separate_lines(self):
+        self.assertEqual(media._mathtext_source(ALIGN), "$x  = 1$\n$y  = 2$")
+        self.assertEqual(media._mathtext_source(r"\begin{gather*} a \& b \label{eq} \end{gather*}"), r"$a \& b$")
+
+    def test_other_environments_are_left_alone(self):
+        self.assertEqual(media._mathtext_source(MATRIX), f"${MATRIX}$")
+
+
+@unittest.skipUnless(media.LATEX_AVAILABLE, "matplotlib not installed")
+class ConvertLatexTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.remote = AsyncMock(return_value=b"\x89PNG remote")
+        self._patches = [
+            patch.object(media, "_latex_cache", LRUCache(maxsize=16)),
+            patch.object(media, "_render_latex_remote", self.remote),
+        ]
+        for p in self._patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    async def test_align_environment_renders_locally(self):
+        image, ok = await media.convert_latex_to_png(f"$${ALIGN}$$")
+
+        self.assertTrue(ok)
+        self.assertIsInstance(image, io.BytesIO)
+        self.assertTrue(image.getvalue().startswith(b"\x89PNG"))
+        self.remote.assert_not_awaited()
+
+    async def test_constructs_mathtext_rejects_use_the_svg_service(self):
+        image, _ = await media.convert_latex_to_png(f"$${MATRIX}$$")
+
+        self.assertEqual(image.getvalue(), b"\x89PNG remote")
+        self.remote.assert_awaited_once_with(MATRIX)
+
+    async def test_code_block_when_both_renderers_fail(self):
+        self.remote.return_value = b""
+
+        text, ok = await media.convert_latex_to_png(f"$${MATRIX}$$")
+
+        self.assertEqual((text, ok), (f"```\n${MATRIX}$\n```", True))
+
+    async def test_renders_are_cached_but_failures_are_retried(self):
+        with patch.object(media, "_render_latex_png", wraps=media._render_latex_png) as local:
+            await media.convert_latex_to_png(r"$x^2 +  y$")
+            await media.convert_latex_to_png(r"$x^2 + y$")
+        self.assertEqual(local.call_count, 1)
+
+        self.remote.return_value = b""
+        await media.convert_latex_to_png(f"$${MATRIX}$$")
+        self.remote.return_value = b"\x89PNG remote"
+        image, _ = await media.convert_latex_to_png(f"$${MATRIX}$$")
+        self.assertEqual(image.getvalue(), b"\x89PNG remote")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,327 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from yarl import URL
+
+from src.ai.client import pollinations_client
+from src.integrations.github import pr_review, pull_requests
+from src.integrations.github.pull_requests import GitHubPRManager
+from src.utils.cache import TTLCache
+
+# Long enough to be reviewed alone rather than packed with other small files.
+SOLO = "x" * GitHubPRManager.MIN_HUNK_CHARS_FOR_SOLO_REVIEW
+
+
+def _patch(filename: str, added: str) -> str:
+    return f"diff --git a/{filename} b/{filename}\n@@ -1,1 +1,2 @@\n context\n+{added}"
+
+
+class FakePRManager(GitHubPRManager):
+    """Serves one PR from memory; `push()` replaces its files and head SHA."""
+
+    def __init__(self, files: dict[str, str], head_sha: str):
+        super().__init__()
+        self.push(files, head_sha)
+        self.diff_downloads = 0
+
+    def push(self, files: dict[str, str], head_sha: str) -> None:
+        self.files, self.head_sha = files, head_sha
+
+    async def get_pr(self, pr_number: int) -> dict:
+        return {
+            "number": pr_number,
+            "title": "Fix things",
+            "url": f"https://github.com/o/r/pull/{pr_number}",
+            "author": "dev",
+            "additions": len(self.files),
+            "deletions": 0,
+            "changed_files": len(self.files),
+            "head": {"ref": "fix", "sha": self.head_sha},
+        }
+
+    async def iter_pr_diff(self, pr_number: int):
+        self.diff_downloads += 1
+        for filename, added in self.files.items():
+            yield filename, _patch(filename, added)
+
+
+class FakeModel:
+    """Records which files each per-file review saw; synthesis returns a numbered report."""
+
+    def __init__(self):
+        self.reviewed: list[list[str]] = []
+        self.reports = 0
+
+    async def __call__(self, *, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        if "Per-file findings" in user_prompt:
+            self.reports += 1
+            return f"report {self.reports}"
+        names = [line.split("'")[1] for line in user_prompt.splitlines() if line.startswith("## File: ")]
+        self.reviewed.append(names)
+        return f"{', '.join(names)}:2 looks wrong"
+
+
+class ReviewTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.model = FakeModel()
+        self._patches = [
+            patch.object(pr_review, "_review_cache", TTLCache(maxsize=16, ttl=60)),
+            patch.object(pollinations_client, "generate_text", self.model),
+        ]
+        for p in self._patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    def sent_files(self) -> list[str]:
+        return sorted(name for batch in self.model.reviewed for name in batch)
+
+
+class IncrementalReviewTests(ReviewTestCase):
+    async def test_same_head_reuses_the_report_without_the_diff(self):
+        manager = FakePRManager({"a.py": SOLO + "a", "b.py": SOLO + "b"}, "abc1234")
+        first = await manager.review_pr(7)
+
+        again = await manager.review_pr(7)
+
+        self.assertEqual(again["review"], first["review"])
+        self.assertEqual((again["files_reviewed"], again["files_from_cache"]), (2, 2))
+        self.assertEqual((manager.diff_downloads, len(self.model.reviewed), self.model.reports), (1, 2, 1))
+
+    async def test_push_sends_only_files_whose_hunks_changed(self):
+        manager = FakePRManager({"a.py": SOLO + "a", "b.py": SOLO + "b"}, "abc1234")
+        await manager.review_pr(7)
+        self.model.reviewed.clear()
+
+        manager.push({"a.py": SOLO + "a", "b.py": SOLO + "b, fixed"}, "def5678")
+        result = await manager.review_pr(7)
+
+        self.assertEqual(self.sent_files(), ["b.py"])
+        self.assertEqual((result["files_reviewed"], result["files_from_cache"]), (2, 1))
+        self.assertEqual(result["review"], "report 2")
+
+    async def test_push_with_identical_hunks_keeps_the_report_and_moves_the_head(self):
+        manager = FakePRManager({"a.py": SOLO + "a"}, "abc1234")
+        await manager.review_pr(7)
+
+        manager.push({"a.py": SOLO + "a"}, "def5678")  # e.g. a clean rebase
+        rebased = await manager.review_pr(7)
+        again = await manager.review_pr(7)
+
+        self.assertEqual((rebased["review"], again["review"]), ("report 1", "report 1"))
+        self.assertEqual((len(self.model.reviewed), self.model.reports), (1, 1))
+        self.assertEqual(manager.diff_downloads, 2)  # the third call matched the stored head
+
+    async def test_errored_review_is_not_reused_at_the_same_head(self):
+        manager = FakePRManager({"a.py": SOLO + "a", "b.py": SOLO + "b"}, "abc1234")
+        calls = 0
+        model = self.model
+
+        async def flaky(**kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("model down")
+            return await model(**kwargs)
+
+        with patch.object(pollinations_client, "generate_text", flaky):
+            first = await manager.review_pr(7)
+            self.assertIn("could not be reviewed", first["review"])
+            model.reviewed.clear()
+            await manager.review_pr(7)
+
+        # Only the batch that failed goes back to the model; the other one is reused.
+        self.assertEqual(len(model.reviewed), 1)
+        self.assertEqual(manager.diff_downloads, 2)
+
+
+class HeldBatchTests(ReviewTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        # a.py and b.py share one batch; c.py is reviewed alone.
+        self.manager = FakePRManager({"a.py": "a", "b.py": "b", "c.py": SOLO + "c"}, "abc1234")
+        await self.manager.review_pr(7)
+        self.assertEqual(sorted(map(sorted, self.model.reviewed)), [["a.py", "b.py"], ["c.py"]])
+        self.model.reviewed.clear()
+
+    async def test_unchanged_batch_is_reused_once_all_its_files_arrive(self):
+        self.manager.push({"a.py": "a", "b.py": "b", "c.py": SOLO + "c, fixed"}, "def5678")
+
+        result = await self.manager.review_pr(7)
+
+        self.assertEqual(self.model.reviewed, [["c.py"]])
+        self.assertEqual(result["files_from_cache"], 2)
+
+    async def test_change_to_one_file_releases_its_held_partner(self):
+        self.manager.push({"a.py": "a", "b.py": "b, fixed", "c.py": SOLO + "c"}, "def5678")
+
+        result = await self.manager.review_pr(7)
+
+        self.assertEqual(self.model.reviewed, [["a.py", "b.py"]])
+        self.assertEqual(result["files_from_cache"], 1)
+
+    async def test_partner_leaving_the_pr_releases_the_held_file(self):
+        self.manager.push({"a.py": "a", "c.py": SOLO + "c"}, "def5678")
+
+        result = await self.manager.review_pr(7)
+
+        self.assertEqual(self.model.reviewed, [["a.py"]])
+        self.assertEqual((result["files_reviewed"], result["files_from_cache"]), (2, 1))
+
+
+class BatchPackerTests(unittest.TestCase):
+    @staticmethod
+    def _file(name: str, size: int, high_priority: bool = False) -> dict:
+        return {"filename": name, "diff": "x" * size, "high_priority": high_priority}
+
+    @staticmethod
+    def _names(batches: list[list[dict]]) -> list[list[str]]:
+        return [[f["filename"] for f in batch] for batch in batches]
+
+    def test_large_and_high_priority_files_go_out_alone_at_once(self):
+        packer = pr_review._BatchPacker(solo_chars=100, budget_chars=250)
+
+        self.assertEqual(self._names(packer.add(self._file("small", 10))), [])
+        self.assertEqual(self._names(packer.add(self._file("large", 100))), [["large"]])
+        self.assertEqual(self._names(packer.add(self._file("auth", 10, high_priority=True))), [["auth"]])
+        self.assertEqual(self._names(packer.flush()), [["small"]])
+        self.assertEqual(packer.flush(), [])
+
+    def test_small_files_fill_the_budget_then_start_a_new_batch(self):
+        packer = pr_review._BatchPacker(solo_chars=100, budget_chars=250)
+
+        emitted = [packer.add(self._file(f"f{i}", 90)) for i in range(5)]
+
+        # Two 90-char files fit in 250; the third starts a new batch.
+        self.assertEqual([self._names(e) for e in emitted], [[], [], [["f0", "f1"]], [], [["f2", "f3"]]])
+        self.assertEqual(self._names(packer.flush()), [["f4"]])
+
+    def test_a_small_file_between_solo_ones_is_not_isolated(self):
+        packer = pr_review._BatchPacker(solo_chars=100, budget_chars=250)
+        batches = []
+        for f in (self._file("a", 10), self._file("big1", 200), self._file("b", 10), self._file("big2", 200)):
+            batches.extend(packer.add(f))
+        batches.extend(packer.flush())
+
+        self.assertEqual(self._names(batches), [["big1"], ["big2"], ["a", "b"]])
+
+
+def _response(chunks: list[bytes]):
+    async def iter_chunked(size: int):
+        for chunk in chunks:
+            yield chunk
+
+    return SimpleNamespace(content=SimpleNamespace(iter_chunked=iter_chunked))
+
+
+class IterLinesTests(unittest.IsolatedAsyncioTestCase):
+    SAMPLES = [
+        b"diff --git a/x b/x\n@@ -1 +1 @@\n-old\n+new\n",
+        b"no trailing newline\nlast",
+        b"crlf\r\nlines\r\n\r\nend\r\n",
+        b"\n\nblank lines first\n",
+        "caf\u00e9 \u00fcber\n".encode(),
+        b"x" * 300 + b"\n" + b"y" * 5,  # lines much longer than a chunk
+        b"",
+    ]
+
+    async def test_lines_match_a_plain_split_for_any_chunking(self):
+        for data in self.SAMPLES:
+            expected = [line.rstrip("\r") for line in data.decode().split("\n")]
+            if expected[-1] == "":
+                expected.pop()
+            for size in (1, 2, 3, 7, 64, len(data) or 1):
+                chunks = [data[i : i + size] for i in range(0, len(data), size)]
+                with self.subTest(data=data[:20], size=size):
+                    lines = [line async for line in GitHubPRManager._iter_lines(_response(chunks))]
+                    self.assertEqual(lines, expected)
+
+
+class FakeFilesAPI:
+    """The REST files endpoint: 100 files a page, the last page named in the Link header."""
+
+    closed = False
+
+    def __init__(self, total_files: int, failing_page: int | None = None):
+        self.total_files = total_files
+        self.failing_page = failing_page
+        self.pages: list[int] = []
+
+    def get(self, url: str, params: dict, headers: dict):
+        page = params["page"]
+        self.pages.append(page)
+        per_page = params["per_page"]
+        last = max(1, -(-self.total_files // per_page))
+        files = [
+            {"filename": f"f{n}.py", "status": "modified", "additions": 1, "deletions": 0, "changes": 1, "patch": "+x"}
+            for n in range((page - 1) * per_page, min(page * per_page, self.total_files))
+        ]
+        api = self
+
+        class Response:
+            status = 500 if page == api.failing_page else 200
+            links = {"last": {"url": URL(f"{url}?per_page={per_page}&page={last}")}} if last > 1 else {}
+
+            async def json(self):
+                return files
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Response()
+
+
+class GetPRFilesTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = GitHubPRManager()
+
+        async def headers():
+            return {}
+
+        self.manager._get_headers = headers
+        self._patch = patch.object(pull_requests, "has_github_auth", lambda: True)
+        self._patch.start()
+
+    async def asyncTearDown(self):
+        self._patch.stop()
+
+    async def test_follows_every_page(self):
+        self.manager._session = api = FakeFilesAPI(total_files=250)
+
+        result = await self.manager.get_pr_files(7)
+
+        self.assertEqual(result["count"], 250)
+        self.assertEqual([f["filename"] for f in result["files"]], [f"f{n}.py" for n in range(250)])
+        self.assertEqual(sorted(api.pages), [1, 2, 3])
+
+    async def test_single_page_makes_one_request(self):
+        self.manager._session = api = FakeFilesAPI(total_files=40)
+
+        result = await self.manager.get_pr_files(7)
+
+        self.assertEqual((result["count"], api.pages), (40, [1]))
+
+    async def test_stops_at_the_page_cap(self):
+        self.manager._session = api = FakeFilesAPI(total_files=5000)
+
+        result = await self.manager.get_pr_files(7)
+
+        self.assertEqual(sorted(api.pages), list(range(1, pull_requests.MAX_FILE_PAGES + 1)))
+        self.assertEqual(result["count"], pull_requests.MAX_FILE_PAGES * pull_requests.FILES_PER_PAGE)
+
+    async def test_a_failed_page_fails_the_listing(self):
+        self.manager._session = FakeFilesAPI(total_files=250, failing_page=3)
+
+        result = await self.manager.get_pr_files(7)
+
+        self.assertEqual(result, {"error": "GitHub API error: 500"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import re
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.search.repo_index import RepoIndex, required_literals
+
+
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class RequiredLiteralsTests(unittest.TestCase):
+    def test_optional_atoms_and_groups_break_literal_runs(self):
+        self.assertEqual(required_literals(r"def (\w+)_handler"), ["def ", "_handler"])
+        self.assertEqual(required_literals(r"colou?r_map"), ["colo", "r_map"])
+        self.assertEqual(required_literals(r"a\.b[xyz]cde"), ["a.b", "cde"])
+
+    def test_top_level_alternation_has_no_required_literal(self):
+        self.assertIsNone(required_literals("foo|bar"))
+        self.assertEqual(required_literals("pre(foo|bar)post"), ["pre", "post"])
+
+
+class RepoIndexTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.repo = Path(self._tmp.name)
+        _git(self.repo, "init", "-q")
+        _git(self.repo, "config", "user.email", "t@example.com")
+        _git(self.repo, "config", "user.name", "t")
+        (self.repo / "src").mkdir()
+        (self.repo / "src" / "app.py").write_text("class RepoError(RuntimeError):\n    pass\n")
+        (self.repo / "src" / "util.py").write_text("def helper():\n    return 1\n")
+        (self.repo / "logo.png").write_bytes(b"\x89PNG\0\0RepoError")
+        self._commit("init")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _commit(self, message: str) -> str:
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-qm", message)
+        return _git(self.repo, "rev-parse", "HEAD")
+
+    def _search(self, index: RepoIndex, pattern: str) -> list[tuple[str, int]]:
+        regex = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+        found = index.search(regex, required_literals(pattern) or [], max_results=50, max_line_chars=300)
+        return [(m["file"], m["line"]) for m in found]
+
+    def test_search_skips_binary_files(self):
+        index = RepoIndex.build(self.repo)
+
+        self.assertEqual(self._search(index, "RepoError"), [("src/app.py", 1)])
+        self.assertEqual(index.list_files("", "*.py"), ["src/app.py", "src/util.py"])
+
+    def test_update_follows_the_diff_between_commits(self):
+        index = RepoIndex.build(self.repo)
+        (self.repo / "src" / "util.py").write_text("def helper():\n    raise RepoError()\n")
+        (self.repo / "src" / "app.py").unlink()
+        (self.repo / "src" / "new.py").write_text("x = 1\n")
+        head = self._commit("change")
+
+        self.assertEqual(index.update(head), 3)
+        self.assertEqual(index.commit, head)
+        self.assertEqual(self._search(index, "RepoError"), [("src/util.py", 2)])
+        self.assertEqual(index.files(), ["logo.png", "src/new.py", "src/util.py"])
+        self.assertEqual(index.list_files("src"), ["src/new.py", "src/util.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()
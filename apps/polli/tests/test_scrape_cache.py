@@ -0,0 +1,171 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import patch
+
+from aiohttp import web
+
+from src.core import config as config_module
+from src.integrations.scrape_cache import CachedPage, MemoryBackend, ScrapeCache, SQLiteBackend
+
+ETAG = '"v1"'
+
+
+def _page(url: str, markdown: str = "# Docs\n\nbody", **kwargs) -> CachedPage:
+    fields = {"etag": "", "last_modified": "", "stored_at": time.time()} | kwargs
+    return CachedPage(url=url, title="Docs", markdown=markdown, fetcher="rnet", **fields)
+
+
+class BackendTests(unittest.TestCase):
+    def _check_lru_bounds(self, backend) -> None:
+        for name in ("a", "b", "c"):
+            backend.put(_page(name, "x" * 40))
+        backend.get("a")  # b is now least recently used
+        backend.put(_page("d", "x" * 40))
+
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual([backend.get(n) is not None for n in ("a", "c", "d")], [True, True, True])
+
+        backend.put(_page("big", "x" * 100))
+        self.assertIsNotNone(backend.get("big"))
+        self.assertIsNone(backend.get("a"))
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        self._check_lru_bounds(MemoryBackend(max_entries=3, max_bytes=200))
+
+    def test_sqlite_backend_evicts_and_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.db"
+            self._check_lru_bounds(SQLiteBackend(path, max_entries=3, max_bytes=200))
+
+            reopened = SQLiteBackend(path, max_entries=3, max_bytes=200)
+            self.assertEqual(reopened.get("big").markdown, "x" * 100)
+
+
+class RevalidationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests: list[dict] = []
+        self.etag = ETAG
+
+        async def handler(request: web.Request) -> web.Response:
+            self.requests.append(dict(request.headers))
+            if request.headers.get("If-None-Match") == self.etag:
+                return web.Response(status=304)
+            return web.Response(text="<h1>Docs</h1>", content_type="text/html", headers={"ETag": self.etag})
+
+        app = web.Application()
+        app.router.add_get("/docs", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/docs"
+        self.cache = ScrapeCache(MemoryBackend(10, 10_000), fresh_seconds=60, max_age_seconds=3600)
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    def _age(self, seconds: float) -> None:
+        page = self.cache.backend.get(self.url)
+        self.cache.backend.put(replace(page, stored_at=time.time() - seconds))
+
+    async def test_fresh_entry_is_served_without_a_request(self):
+        await self.cache.store(
+            {"success": True, "url": self.url, "markdown": "# Docs", "_fetcher": "rnet"}, {"etag": ETAG}
+        )
+
+        result = await self.cache.lookup(self.url)
+
+        self.assertEqual((result["markdown"], result["_cache"]), ("# Docs", "hit"))
+        self.assertEqual(self.requests, [])
+
+    async def test_stale_entry_is_revalidated_with_its_etag(self):
+        await self.cache.store(
+            {"success": True, "url": self.url, "markdown": "# Docs", "_fetcher": "rnet"}, {"etag": ETAG}
+        )
+        self._age(120)
+
+        result = await self.cache.lookup(self.url)
+
+        self.assertEqual(result["_cache"], "revalidated")
+        self.assertEqual(self.requests[0]["If-None-Match"], ETAG)
+        # The 304 restarted the freshness window.
+        self.assertEqual((await self.cache.lookup(self.url))["_cache"], "hit")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_changed_or_expired_pages_miss(self):
+        await self.cache.store(
+            {"success": True, "url": self.url, "markdown": "# Docs", "_fetcher": "rnet"}, {"etag": ETAG}
+        )
+        self._age(120)
+        self.etag = '"v2"'
+        self.assertIsNone(await self.cache.lookup(self.url))
+
+        self._age(7200)
+        self.assertIsNone(await self.cache.lookup(self.url))
+        self.assertIsNone(self.cache.backend.get(self.url))
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_stale_entry_without_validators_misses(self):
+        await self.cache.store({"success": True, "url": self.url, "markdown": "# Docs", "_fetcher": "jina"}, {})
+        self._age(120)
+
+        self.assertIsNone(await self.cache.lookup(self.url))
+        self.assertEqual(self.requests, [])
+
+
+class ThreadRecordingBackend(MemoryBackend):
+    """Notes which thread each backend call ran on."""
+
+    def __init__(self):
+        super().__init__(10, 10_000)
+        self.threads: list[int] = []
+
+    def get(self, url: str) -> CachedPage | None:
+        self.threads.append(threading.get_ident())
+        return super().get(url)
+
+    def put(self, page: CachedPage) -> None:
+        self.threads.append(threading.get_ident())
+        super().put(page)
+
+    def delete(self, url: str) -> None:
+        self.threads.append(threading.get_ident())
+        super().delete(url)
+
+
+class EventLoopTests(unittest.IsolatedAsyncioTestCase):
+    async def test_backend_calls_stay_off_the_event_loop_thread(self):
+        backend = ThreadRecordingBackend()
+        cache = ScrapeCache(backend, fresh_seconds=60, max_age_seconds=3600)
+
+        await cache.store({"success": True, "url": "https://a.example/", "markdown": "# A"}, {})
+        await cache.lookup("https://a.example/")
+        backend.put(_page("https://old.example/", stored_at=time.time() - 7200))
+        backend.threads.pop()
+        await cache.lookup("https://old.example/")  # expired: get, then delete
+
+        self.assertEqual(len(backend.threads), 4)
+        self.assertNotIn(threading.get_ident(), backend.threads)
+
+
+class ConfigTests(unittest.TestCase):
+    def test_missing_section_falls_back_to_defaults(self):
+        raw = json.loads(config_module.CONFIG_PATH.read_text())
+        del raw["scrape_cache"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "config.json"
+            path.write_text(json.dumps(raw))
+            with patch.object(config_module, "CONFIG_PATH", path):
+                loaded = config_module.load_config()
+
+        self.assertEqual(loaded.scrape_cache, config_module.ScrapeCacheConfig(**config_module.SCRAPE_CACHE_DEFAULTS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""One dimension planner for every GPU server.
+
+Each server used to carry its own rounding rules: zimage's `calculate_generation_dimensions`,
+dreamshaper's `clamp_dims` and flux's `find_nearest_valid_dimensions`, the last of which ran
+a Python spiral search over multiples of 8 on every request. A `DimensionPlanner` is
+configured with a model's constraints and does all the work at startup:
+
+- the pixel-count constraint (flux needs `w * h % 65536 == 0`) becomes a table mapping
+  every aligned size inside the budget to its nearest valid size, so a request is
+  arithmetic plus one dict lookup;
+- `table` holds the plan for every supported aspect ratio and pixel budget, and `buckets`
+  is the finite set of generation sizes those plans use, for warmup and batching.
+"""
+
+import math
+from dataclasses import dataclass
+
+# (width, height) ratios served routinely; both orientations of each are planned.
+COMMON_ASPECTS = ((1, 1), (4, 3), (3, 2), (16, 9), (21, 9))
+COMMON_BUDGETS = (512 * 512, 768 * 768, 1024 * 1024, 1536 * 1536)
+
+# Flux's original spiral gave up after this many steps and kept the aligned size.
+MAX_SEARCH_STEPS = 100
+
+
+@dataclass(frozen=True)
+class Plan:
+    gen_w: int
+    gen_h: int
+    final_w: int
+    final_h: int
+    upscale: bool
+
+    @property
+    def bucket(self) -> tuple[int, int]:
+        return self.gen_w, self.gen_h
+
+
+class DimensionPlanner:
+    def __init__(
+        self,
+        *,
+        align: int,
+        max_gen_pixels: int,
+        max_final_pixels: int | None = None,
+        upscale_factor: int = 1,
+        min_side: int | None = None,
+        max_side: int | None = None,
+        pixel_multiple: int = 1,
+        floor: bool = False,
+    ):
+        """`floor` rounds sizes down to `align` (staying inside the budget) instead of to nearest."""
+        self.align = align
+        self.max_gen_pixels = max_gen_pixels
+        self.max_final_pixels = max_final_pixels or max_gen_pixels
+        self.upscale_factor = upscale_factor
+        self.min_side = min_side or align
+        self.max_side = max_side
+        self.pixel_multiple = pixel_multiple
+        self.floor = floor
+        self._nearest: dict[tuple[int, int], tuple[int, int]] = {}
+        if pixel_multiple > 1:
+            self._build_nearest_table()
+        self.table: dict[tuple[str, int], Plan] = {}
+        for aw, ah in COMMON_ASPECTS:
+            for w_ratio, h_ratio in {(aw, ah), (ah, aw)}:
+                for budget in COMMON_BUDGETS:
+                    if budget > self.max_final_pixels:
+                        continue
+                    scale = math.sqrt(budget / (w_ratio * h_ratio))
+                    label = f"{w_ratio}:{h_ratio}"
+                    self.table[(label, budget)] = self.plan(round(w_ratio * scale), round(h_ratio * scale))
+        self.buckets: list[tuple[int, int]] = sorted({plan.bucket for plan in self.table.values()})
+
+    # ------------------------------------------------------------------ planning
+
+    def _snap(self, value: float) -> int:
+        steps = math.floor(value / self.align) if self.floor else round(value / self.align)
+        return max(self.min_side, steps * self.align)
+
+    def plan(self, width: int, height: int) -> Plan:
+        w, h = width, height
+        if self.max_side:
+            w, h = min(w, self.max_side), min(h, self.max_side)
+        if w * h > self.max_final_pixels:
+            scale = math.sqrt(self.max_final_pixels / (w * h))
+            w, h = round(w * scale), round(h * scale)
+        upscale = self.upscale_factor > 1 and w * h > self.max_gen_pixels
+        if upscale:
+            w, h = w // self.upscale_factor, h // self.upscale_factor
+        gen_w, gen_h = self._snap(w), self._snap(h)
+        if self.pixel_multiple > 1:
+            key = (gen_w, gen_h)
+            valid = self._nearest.get(key)
+            if valid is None:
+                # Outside the precomputed region (only reachable through rounding at the edge).
+                valid = self._nearest[key] = self._nearest_valid(gen_w, gen_h)
+            gen_w, gen_h = valid
+        factor = self.upscale_factor if upscale else 1
+        return Plan(gen_w, gen_h, gen_w * factor, gen_h * factor, upscale)
+
+    # ------------------------------------------------------------------ pixel-count constraint
+
+    def _nearest_valid(self, width: int, height: int) -> tuple[int, int]:
+        """Closest aligned size whose pixel count is a multiple of `pixel_multiple`.
+
+        Same answer as flux's spiral search: smallest Chebyshev distance in `align` steps,
+        ties going to the smaller width, then the smaller height.
+        """
+        a0, b0 = width // self.align, height // self.align
+        best = MAX_SEARCH_STEPS
+        best_a = None
+        for da in range(MAX_SEARCH_STEPS):
+            if da > best:
+                break
+            for a in (a0 - da, a0 + da) if da else (a0,):
+                if a <= 0:
+                    continue
+                step = self._b_step(a)
+                below = b0 - b0 % step
+                d = below + step - b0
+                if below > 0 and b0 - below < d:
+                    d = b0 - below
+                d = max(da, d)
+                if d < best or (d == best and best_a is not None and a < best_a):
+                    best, best_a = d, a
+        if best_a is None:
+            return width, height
+        step = self._b_step(best_a)
+        b = max(step, math.ceil((b0 - best) / step) * step)
+        return best_a * self.align, b * self.align
+
+    def _b_step(self, a: int) -> int:
+        """Height step (in `align` units) that keeps `a * b` a multiple of the constraint."""
+        need = self.pixel_multiple // math.gcd(self.pixel_multiple, self.align * self.align)
+        return need // math.gcd(need, a)
+
+    def _build_nearest_table(self) -> None:
+        # Every aligned size a capped request can snap to; a little headroom for rounding.
+        limit = self.max_final_pixels * 1.02
+        max_steps = (self.max_side or int(limit // self.min_side)) // self.align + 1
+        for a in range(max(1, self.min_side // self.align), max_steps + 1):
+            width = a * self.align
+            max_b = min(max_steps, int(limit // (width * self.align)))
+            for b in range(max(1, self.min_side // self.align), max_b + 1):
+                self._nearest[(width, b * self.align)] = self._nearest_valid(width, b * self.align)
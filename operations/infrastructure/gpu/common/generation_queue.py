@@ -0,0 +1,137 @@
+"""Admission queue for GPU generation slots.
+
+Requests wait for the GPU in priority order (interactive before batch, FIFO within a
+class) instead of being turned away the moment it is busy. A request is rejected up
+front only when the queue is at its hard limit or when the estimated wait — the
+remaining work of the requests running now plus that of everyone queued ahead of it,
+from rolling per-resolution service times — would overrun its deadline. A request
+that is still waiting when its deadline passes gives up with the same 503.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+
+from service_times import ServiceTimes
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITIES = {"interactive": INTERACTIVE, "batch": BATCH}
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "estimate")
+
+    def __init__(self, priority: int, seq: int, estimate: float):
+        self.priority = priority
+        self.seq = seq
+        self.estimate = estimate
+
+    def key(self):
+        return self.priority, self.seq
+
+
+class GenerationQueue:
+    def __init__(
+        self,
+        limit: int,
+        concurrency: int = 1,
+        deadline_seconds: float = 30.0,
+        default_service_seconds: float = 5.0,
+    ):
+        if limit < 1:
+            raise ValueError("QUEUE_LIMIT must be at least 1")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.limit = limit
+        self.concurrency = concurrency
+        self.deadline_seconds = deadline_seconds
+        self.default_service_seconds = default_service_seconds
+        self._cond = threading.Condition()
+        self._waiting: list[_Waiter] = []
+        self._running: dict[int, tuple[float, float]] = {}  # seq -> (started, estimate)
+        self._seq = 0
+        self.service_times = ServiceTimes()
+
+    # ------------------------------------------------------------------ estimates
+
+    def estimate(self, bucket: tuple[int, int] | None) -> float:
+        """Expected service time for `bucket` (a (width, height) pair)."""
+        return self.service_times.estimate(bucket, self.default_service_seconds)
+
+    def record(self, bucket: tuple[int, int] | None, seconds: float) -> None:
+        self.service_times.record(bucket, seconds)
+
+    def _expected_wait(self, priority: int, now: float) -> float:
+        ahead = [w for w in self._waiting if w.priority <= priority]
+        if len(self._running) < self.concurrency and not ahead:
+            return 0.0
+        remaining = sum(max(0.0, estimate - (now - started)) for started, estimate in self._running.values())
+        return (remaining + sum(w.estimate for w in ahead)) / self.concurrency
+
+    def _is_next(self, waiter: _Waiter) -> bool:
+        return len(self._running) < self.concurrency and min(self._waiting, key=_Waiter.key) is waiter
+
+    # ------------------------------------------------------------------ admission
+
+    @contextmanager
+    def slot(
+        self,
+        priority: int = INTERACTIVE,
+        deadline_seconds: float | None = None,
+        bucket: tuple[int, int] | None = None,
+    ):
+        """Hold one of the `concurrency` GPU slots for the duration of the block."""
+        deadline_seconds = self.deadline_seconds if deadline_seconds is None else deadline_seconds
+        with self._cond:
+            now = time.monotonic()
+            if len(self._waiting) + len(self._running) >= self.limit:
+                raise HTTPException(status_code=503, detail="Queue full")
+            wait = self._expected_wait(priority, now)
+            if wait > deadline_seconds:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Estimated queue wait {wait:.1f}s exceeds deadline {deadline_seconds:.1f}s",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+            self._seq += 1
+            waiter = _Waiter(priority, self._seq, self.estimate(bucket))
+            self._waiting.append(waiter)
+            give_up = now + deadline_seconds
+            while not self._is_next(waiter):
+                remaining = give_up - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(waiter)
+                    self._cond.notify_all()
+                    raise HTTPException(status_code=503, detail="Queue deadline exceeded")
+                self._cond.wait(remaining)
+            self._waiting.remove(waiter)
+            started = time.monotonic()
+            self._running[waiter.seq] = (started, waiter.estimate)
+            # Another slot may still be free for the next waiter in line.
+            self._cond.notify_all()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            with self._cond:
+                del self._running[waiter.seq]
+                if ok:
+                    self.record(bucket, time.monotonic() - started)
+                self._cond.notify_all()
+
+    @property
+    def depth(self) -> int:
+        """Requests waiting for a slot."""
+        with self._cond:
+            return len(self._waiting)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests holding a slot."""
+        with self._cond:
+            return len(self._running)
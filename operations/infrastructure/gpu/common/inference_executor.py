@@ -0,0 +1,70 @@
+"""Blocking model calls for `async def` endpoints, off the event loop and behind a queue.
+
+Calling a pipeline directly from an async handler freezes the event loop for the whole
+generation: `/health` stops answering and nothing bounds how many requests pile up.
+`InferenceExecutor.run()` admits a call (503 "Queue full" once `queue.limit` calls are
+admitted, before anything is submitted), then runs it on a dedicated thread pool inside a
+`GenerationQueue` slot, which orders waiters, applies deadlines and records service
+times for the heartbeat. Handlers with costly input preparation take the admission up
+front with `try_admit()`, so a full queue is refused before any of that work is done.
+"""
+
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from fastapi import HTTPException
+
+from generation_queue import INTERACTIVE, GenerationQueue
+
+T = TypeVar("T")
+
+
+class InferenceExecutor:
+    def __init__(self, queue: GenerationQueue, thread_name_prefix: str = "inference"):
+        self.queue = queue
+        # A thread per admissible call: each either holds a GPU slot or waits for one in
+        # priority order, so admitted work never sits unordered in the executor's own queue.
+        self._executor = ThreadPoolExecutor(max_workers=queue.limit, thread_name_prefix=thread_name_prefix)
+        self._admission = threading.BoundedSemaphore(queue.limit)
+
+    def try_admit(self) -> bool:
+        """Take an admission without waiting, for a later `run(..., admitted=True)`.
+
+        A caller that fails before reaching `run()` gives it back with `release_admission()`.
+        """
+        return self._admission.acquire(blocking=False)
+
+    def release_admission(self) -> None:
+        self._admission.release()
+
+    async def run(
+        self,
+        fn: Callable[..., T],
+        *args,
+        priority: int = INTERACTIVE,
+        deadline_seconds: float | None = None,
+        bucket: tuple[int, int] | None = None,
+        admitted: bool = False,
+    ) -> T:
+        if not admitted and not self.try_admit():
+            raise HTTPException(status_code=503, detail="Queue full")
+
+        def call() -> T:
+            with self.queue.slot(priority=priority, deadline_seconds=deadline_seconds, bucket=bucket):
+                return fn(*args)
+
+        try:
+            future = self._executor.submit(call)
+        except BaseException:
+            self._admission.release()
+            raise
+        # Released when the call finishes, or is cancelled before it started: a client that
+        # disconnects does not free the GPU early, but does not leak its admission either.
+        future.add_done_callback(lambda _: self._admission.release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,91 @@
+"""Bounded LRU of text-encoder outputs.
+
+Popular prompts and prompt templates come back again and again, and each time the
+pipeline re-ran its text encoder before denoising. `PromptEmbeddingCache.get()` returns the
+pipeline keyword arguments (`prompt_embeds` and friends) for a prompt. On a miss it calls
+the server's `encode` function; on a hit it skips the encoder.
+
+Entries are keyed by a hash of the model ID and the normalized prompt (Unicode NFC,
+whitespace collapsed; case is kept because the tokenizers are case-sensitive). They stay
+on the device they were encoded on, and the cache evicts least-recently-used entries to
+keep their tensor bytes under `max_bytes`.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Callable
+
+PROMPT_CACHE_MB = int(os.getenv("PROMPT_CACHE_MB", "512"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", prompt)).strip()
+
+
+def tensor_bytes(value) -> int:
+    """Bytes held by the tensors in `value` (nested dicts, lists and tuples included)."""
+    if isinstance(value, dict):
+        return sum(tensor_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(tensor_bytes(v) for v in value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    numel = getattr(value, "numel", None)
+    return numel() * value.element_size() if callable(numel) else 0
+
+
+class PromptEmbeddingCache:
+    def __init__(self, encode: Callable[[str], dict], model_id: str, max_bytes: int = PROMPT_CACHE_MB * 1024 * 1024):
+        self.encode = encode
+        self.model_id = model_id
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{normalize_prompt(prompt)}".encode()).hexdigest()
+
+    def get(self, prompt: str) -> dict:
+        """Pipeline kwargs for `prompt`; call where the encoder may use the GPU."""
+        key = self.key(prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+        embeds = self.encode(normalize_prompt(prompt))
+        size = tensor_bytes(embeds)
+        if size > self.max_bytes:
+            return embeds
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (embeds, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+        return embeds
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,193 @@
+"""On-disk cache of finished results for seeded requests.
+
+With an explicit seed, the same (model, prompt, seed, size, steps) produces the same
+image, so retries, clients that ask twice and shared links were re-running the whole
+pipeline for bytes the worker had already produced. `ResultCache.get_or_create()` serves
+them from disk without touching the GPU. Concurrent identical requests are coalesced:
+one generates, the rest wait for its result (or its exception).
+
+Entries are content-addressed files under `directory`, evicted least-recently-used to
+keep them under `max_bytes`. The index is rebuilt from file mtimes at startup. Processes
+that share a directory (dreamshaper's uvicorn workers) share hits, but each one
+coalesces and accounts only for its own requests.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_MB = int(os.getenv("RESULT_CACHE_MB", "2048"))
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: bytes | None = None
+        self.error: BaseException | None = None
+
+
+class ResultCache:
+    def __init__(self, directory: str, max_bytes: int = RESULT_CACHE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()  # key -> size, oldest first
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+        self._async_flights: dict[str, asyncio.Future] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def key(**params) -> str:
+        """Content address for everything that determines the output."""
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _scan(self) -> None:
+        found = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    os.unlink(path)
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name, stat.st_size))
+        for _mtime, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    def _evict(self) -> None:
+        """Caller holds the lock (or is the constructor)."""
+        while self._bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    # ------------------------------------------------------------------ storage
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            known = key in self._entries
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            if known:  # evicted by another process sharing the directory
+                with self._lock:
+                    self._bytes -= self._entries.pop(key, 0)
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = len(data)
+                self._bytes += len(data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not store result %s: %s", key, e)
+            return
+        with self._lock:
+            self._bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    # ------------------------------------------------------------------ single flight
+
+    def get_or_create(self, key: str, produce: Callable[[], bytes]) -> bytes:
+        """Cached bytes for `key`, or `produce()`'s, shared with concurrent callers."""
+        data = self.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = produce()
+            self.put(key, flight.result)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def aget_or_create(self, key: str, produce: Callable[[], Awaitable[bytes]]) -> bytes:
+        """`get_or_create` for servers that generate on the event loop."""
+        data = self.get(key)
+        if data is not None:
+            return data
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            with self._lock:
+                self._coalesced += 1
+            return await asyncio.shield(flight)
+        flight = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await produce()
+            self.put(key, result)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            flight.exception()  # retrieved here, so a flight nobody joined logs nothing
+            raise
+        finally:
+            del self._async_flights[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+            }
@@ -0,0 +1,60 @@
+"""Rolling service times per resolution bucket.
+
+Feeds both the admission queue's wait estimates and the load report in the heartbeat.
+"""
+
+import threading
+from collections import deque
+from statistics import median
+
+# Service times remembered per resolution bucket.
+SERVICE_WINDOW = 64
+
+Bucket = tuple[int, int]  # (width, height)
+
+
+def _quantile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ServiceTimes:
+    def __init__(self, window: int = SERVICE_WINDOW):
+        self._window = window
+        self._times: dict[Bucket, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, bucket: Bucket | None, seconds: float) -> None:
+        if bucket is None:
+            return
+        with self._lock:
+            times = self._times.get(bucket)
+            if times is None:
+                times = self._times[bucket] = deque(maxlen=self._window)
+            times.append(seconds)
+
+    def estimate(self, bucket: Bucket | None, default: float) -> float:
+        """Median service time for `bucket`; unseen buckets scale the nearest one by pixels."""
+        if bucket is None:
+            return default
+        with self._lock:
+            times = self._times.get(bucket)
+            if times:
+                return median(times)
+            if not self._times:
+                return default
+            pixels = bucket[0] * bucket[1]
+            nearest = min(self._times, key=lambda b: abs(b[0] * b[1] - pixels))
+            return median(self._times[nearest]) * pixels / (nearest[0] * nearest[1])
+
+    def snapshot(self) -> dict[str, dict]:
+        """{"WxH": {"p50", "p95", "n"}} for every bucket with samples."""
+        with self._lock:
+            buckets = {bucket: sorted(times) for bucket, times in self._times.items() if times}
+        return {
+            f"{w}x{h}": {
+                "p50": round(_quantile(ordered, 0.5), 3),
+                "p95": round(_quantile(ordered, 0.95), 3),
+                "n": len(ordered),
+            }
+            for (w, h), ordered in sorted(buckets.items())
+        }
@@ -0,0 +1,285 @@
+"""One GPU process serving several HTTP front-end processes.
+
+Running N full uvicorn workers, each with its own pipeline, multiplies VRAM and load
+time just to get Python-side work (JPEG encoding, base64, HTTP) off the GIL of the
+process driving the GPU. Here one backend process owns the model and the admission
+queue. Front-end processes send it small JSON requests over a Unix socket and get the
+pixels back through shared memory:
+
+    front-end                           backend
+    {"op": "generate", "params"}  --->  render(params) -> HxWx3 uint8
+                                  <---  {"slot", "name", "shape"}  (pixels copied into slot)
+    encode straight from the slot
+    {"op": "release", "slot"}     --->  slot back in the pool
+
+Slots are a fixed pool of shared-memory blocks, so memory is bounded, and slots held by a
+front-end that disconnects are reclaimed. Errors raised by `render` travel back as
+HTTP status, detail and headers, so an admission 503 reaches the client unchanged.
+
+The backend also owns the server's `Drain`: SIGUSR1 to the backend, or a "drain" op from
+any front-end, refuses new generations, waits for renders in flight and for every slot to
+come back, then exits. "load" replies carry the draining flag so front-ends stop their
+heartbeats.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+from collections.abc import Callable
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from fastapi import HTTPException
+
+from worker_load import Drain
+
+logger = logging.getLogger(__name__)
+
+SHM_SLOTS = int(os.getenv("SHM_SLOTS", "8"))
+
+
+def _untrack(block: shared_memory.SharedMemory) -> None:
+    resource_tracker.unregister(block._name, "shared_memory")
+
+
+class SlotPool:
+    def __init__(self, prefix: str, count: int, slot_bytes: int):
+        self.slot_bytes = slot_bytes
+        self.blocks = [self._create(f"{prefix}-{i}", slot_bytes) for i in range(count)]
+        self._free = list(range(count))
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def _create(name: str, size: int) -> shared_memory.SharedMemory:
+        try:
+            block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a backend that crashed; nobody can be using it any more.
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        # The pool unlinks its blocks itself. Front-ends attach to them too, and the resource
+        # tracker, which may be shared with them, would otherwise see mismatched bookkeeping.
+        _untrack(block)
+        return block
+
+    def acquire(self) -> int:
+        with self._cond:
+            while not self._free:
+                self._cond.wait()
+            return self._free.pop()
+
+    def release(self, slot: int) -> None:
+        with self._cond:
+            if slot not in self._free:
+                self._free.append(slot)
+                self._cond.notify()
+
+    @property
+    def free(self) -> int:
+        with self._cond:
+            return len(self._free)
+
+    @property
+    def held(self) -> int:
+        return len(self.blocks) - self.free
+
+    def view(self, slot: int, shape: tuple[int, ...]) -> np.ndarray:
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.blocks[slot].buf)
+
+    def close(self) -> None:
+        for block in self.blocks:
+            block.close()
+            resource_tracker.register(block._name, "shared_memory")  # unlink() unregisters it
+            block.unlink()
+
+
+class InferenceBackend:
+    def __init__(
+        self,
+        render: Callable[[dict], np.ndarray],
+        socket_path: str,
+        slot_bytes: int,
+        slots: int = SHM_SLOTS,
+        load: Callable[[], dict] | None = None,
+        drain: Drain | None = None,
+    ):
+        self.render = render
+        self.socket_path = socket_path
+        self.load = load or dict
+        self.pool = SlotPool(f"gpu-{os.getpid()}", slots, slot_bytes)
+        # A slot still held by a front-end is a response still being encoded.
+        self.drain = drain or Drain(pending=lambda: self.pool.held)
+
+    async def serve(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        logger.info("Inference backend listening on %s", self.socket_path)
+        # SIGTERM (the parent shutting down) still unlinks the shared memory.
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        self.drain.install_signal_handler()
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            logger.info("Inference backend stopping")
+        finally:
+            self.pool.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        held: set[int] = set()
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message["op"]
+                if op == "release":
+                    held.discard(message["slot"])
+                    self.pool.release(message["slot"])
+                    continue
+                if op == "generate":
+                    reply = await asyncio.to_thread(self._generate, message["params"])
+                    if "slot" in reply:
+                        held.add(reply["slot"])
+                elif op == "load":
+                    reply = {**self.load(), "draining": self.drain.draining}
+                elif op == "drain":
+                    self.drain.start("drain requested by a front-end")
+                    reply = {"draining": True, "in_flight": self.drain.busy()}
+                else:
+                    reply = {"error": {"status": 400, "detail": f"Unknown op {op!r}"}}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            logger.warning("Front-end connection dropped: %s", e)
+        except asyncio.CancelledError:
+            pass  # backend stopping (e.g. after a drain) with front-ends still connected
+        finally:
+            for slot in held:
+                self.pool.release(slot)
+            writer.close()
+
+    def _generate(self, params: dict) -> dict:
+        try:
+            with self.drain.request():
+                pixels = np.ascontiguousarray(self.render(params), dtype=np.uint8)
+                if pixels.nbytes > self.pool.slot_bytes:
+                    return {
+                        "error": {"status": 500, "detail": f"Image {pixels.shape} does not fit a shared-memory slot"}
+                    }
+                slot = self.pool.acquire()
+                self.pool.view(slot, pixels.shape)[...] = pixels
+        except HTTPException as e:
+            return {"error": {"status": e.status_code, "detail": e.detail, "headers": e.headers}}
+        except Exception as e:
+            logger.exception("Generation failed")
+            return {"error": {"status": 500, "detail": f"Generation failed: {e}"}}
+        return {"slot": slot, "name": self.pool.blocks[slot].name, "shape": list(pixels.shape)}
+
+
+class _Connection:
+    def __init__(self, socket_path: str):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, message: dict) -> None:
+        self.sock.sendall(json.dumps(message).encode() + b"\n")
+
+    def call(self, message: dict) -> dict:
+        self.send(message)
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("inference backend closed the connection")
+        return json.loads(line)
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+
+class InferenceClient:
+    """Front-end side; thread-safe, one socket per concurrent request."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._idle: list[_Connection] = []
+        self._blocks: dict[str, shared_memory.SharedMemory] = {}
+        self._lock = threading.Lock()
+
+    def _checkout(self) -> _Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _Connection(self.socket_path)
+
+    def _attach(self, name: str) -> shared_memory.SharedMemory:
+        with self._lock:
+            block = self._blocks.get(name)
+            if block is None:
+                block = self._blocks[name] = shared_memory.SharedMemory(name=name)
+                # Python < 3.13 would otherwise unlink the backend's block when this process exits.
+                _untrack(block)
+            return block
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._checkout()
+        except OSError as e:
+            raise HTTPException(status_code=503, detail="Inference backend unavailable") from e
+        try:
+            yield conn
+        except (OSError, ValueError) as e:
+            conn.close()
+            raise HTTPException(status_code=503, detail="Inference backend unavailable") from e
+        except BaseException:
+            # The request failed, not the socket: error replies and encoding errors leave it usable.
+            self._checkin(conn)
+            raise
+        self._checkin(conn)
+
+    def _checkin(self, conn: _Connection) -> None:
+        with self._lock:
+            self._idle.append(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            blocks, self._blocks = self._blocks, {}
+        for conn in idle:
+            conn.close()
+        for block in blocks.values():
+            block.close()
+
+    def load(self) -> dict:
+        with self._connection() as conn:
+            return conn.call({"op": "load"})
+
+    def drain(self) -> dict:
+        """Start draining the backend, and with it every front-end; see `Drain`."""
+        with self._connection() as conn:
+            return conn.call({"op": "drain"})
+
+    @contextmanager
+    def generate(self, **params):
+        """Yield the generated HxWx3 uint8 image as a view of shared memory, valid inside the block."""
+        with self._connection() as conn:
+            reply = conn.call({"op": "generate", "params": params})
+            if "error" in reply:
+                error = reply["error"]
+                raise HTTPException(status_code=error["status"], detail=error["detail"], headers=error.get("headers"))
+            try:
+                yield np.ndarray(reply["shape"], dtype=np.uint8, buffer=self._attach(reply["name"]).buf)
+            finally:
+                conn.send({"op": "release", "slot": reply["slot"]})
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from dimensions import DimensionPlanner
+
+
+def spiral_search(width: int, height: int, max_pixels: int) -> tuple[int, int]:
+    """flux's original per-request search, kept as the reference the table must reproduce."""
+    if width * height > max_pixels:
+        scale = (max_pixels / (width * height)) ** 0.5
+        width, height = round(width * scale), round(height * scale)
+    nearest_w, nearest_h = round(width / 8) * 8, round(height / 8) * 8
+    for offset in range(100):
+        for w in range(nearest_w - offset * 8, nearest_w + offset * 8 + 1, 8):
+            for h in range(nearest_h - offset * 8, nearest_h + offset * 8 + 1, 8):
+                if w > 0 and h > 0 and (w * h) % 65536 == 0:
+                    return w, h
+    return nearest_w, nearest_h
+
+
+class FluxPlannerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.planner = DimensionPlanner(align=8, max_side=8192, max_gen_pixels=810000, pixel_multiple=65536)
+
+    def test_matches_spiral_search(self):
+        rng = random.Random(0)
+        sizes = [(1024, 1024), (1920, 1080), (64, 8192), (8192, 8192), (777, 333)]
+        sizes += [(rng.randint(64, 2048), rng.randint(64, 2048)) for _ in range(500)]
+        for width, height in sizes:
+            with self.subTest(size=(width, height)):
+                self.assertEqual(self.planner.plan(width, height).bucket, spiral_search(width, height, 810000))
+
+    def test_every_bucket_satisfies_the_constraint(self):
+        for w, h in self.planner.buckets:
+            self.assertEqual((w % 8, h % 8, w * h % 65536), (0, 0, 0))
+
+
+class ZImagePlannerTest(unittest.TestCase):
+    planner = DimensionPlanner(
+        align=16, min_side=256, max_gen_pixels=768 * 768, max_final_pixels=768 * 768 * 4, upscale_factor=2
+    )
+
+    def test_generates_natively_within_budget(self):
+        plan = self.planner.plan(768, 512)
+        self.assertEqual((plan.gen_w, plan.gen_h, plan.final_w, plan.final_h, plan.upscale), (768, 512, 768, 512, False))
+
+    def test_upscales_above_budget_and_caps_final_size(self):
+        self.assertEqual(self.planner.plan(1024, 1024).bucket, (512, 512))
+        plan = self.planner.plan(4096, 4096)
+        self.assertEqual((plan.gen_w, plan.gen_h, plan.final_w, plan.final_h, plan.upscale), (768, 768, 1536, 1536, True))
+
+    def test_enforces_minimum_side(self):
+        self.assertEqual(self.planner.plan(64, 64).bucket, (256, 256))
+
+
+class DreamshaperPlannerTest(unittest.TestCase):
+    planner = DimensionPlanner(align=32, max_side=768, max_gen_pixels=512 * 512, floor=True)
+
+    def test_rounds_down_inside_limits(self):
+        for width, height in [(1024, 1024), (600, 500), (2000, 300), (100, 100), (777, 333)]:
+            with self.subTest(size=(width, height)):
+                w, h = self.planner.plan(width, height).bucket
+                self.assertEqual((w % 32, h % 32), (0, 0))
+                self.assertLessEqual(max(w, h), 768)
+                self.assertLessEqual(w * h, 512 * 512)
+
+    def test_table_covers_both_orientations(self):
+        self.assertEqual(self.planner.table[("1:1", 512 * 512)].bucket, (512, 512))
+        landscape = self.planner.table[("16:9", 512 * 512)].bucket
+        self.assertEqual(self.planner.table[("9:16", 512 * 512)].bucket, landscape[::-1])
+        self.assertIn(landscape, self.planner.buckets)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import threading
+import time
+import unittest
+
+from fastapi import HTTPException
+
+from generation_queue import BATCH, INTERACTIVE, GenerationQueue
+
+
+class StubPipeline:
+    """CPU stand-in for a diffusion pipeline: sleeps for a fixed time per call."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.order: list[str] = []
+
+    def __call__(self, name: str):
+        time.sleep(self.seconds)
+        self.order.append(name)
+
+
+def _run(queue: GenerationQueue, pipe: StubPipeline, name: str, errors: list, **slot_args):
+    try:
+        with queue.slot(**slot_args):
+            pipe(name)
+    except HTTPException as e:
+        errors.append((name, e.detail))
+
+
+class GenerationQueueTest(unittest.TestCase):
+    def test_rejects_requests_beyond_the_limit(self):
+        queue = GenerationQueue(3, concurrency=3)
+
+        with queue.slot():
+            with queue.slot():
+                with queue.slot():
+                    with self.assertRaises(HTTPException) as raised:
+                        with queue.slot():
+                            self.fail("queue admitted a fourth request")
+
+                    self.assertEqual(raised.exception.status_code, 503)
+                    self.assertEqual(raised.exception.detail, "Queue full")
+
+    def test_releases_slot_after_generation_failure(self):
+        queue = GenerationQueue(1)
+
+        with self.assertRaises(RuntimeError):
+            with queue.slot():
+                raise RuntimeError("generation failed")
+
+        with queue.slot():
+            pass
+
+    def test_rejects_invalid_limit(self):
+        with self.assertRaisesRegex(ValueError, "at least 1"):
+            GenerationQueue(0)
+
+    def test_burst_waits_for_the_gpu_instead_of_failing(self):
+        queue = GenerationQueue(8, deadline_seconds=5, default_service_seconds=0.02)
+        pipe = StubPipeline(0.02)
+        errors: list = []
+        threads = [threading.Thread(target=_run, args=(queue, pipe, str(i), errors)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(pipe.order), 5)
+        self.assertEqual((queue.depth, queue.in_flight), (0, 0))
+
+    def test_interactive_requests_overtake_waiting_batch_requests(self):
+        queue = GenerationQueue(8, deadline_seconds=5, default_service_seconds=0.02)
+        pipe = StubPipeline(0.02)
+        errors: list = []
+        release = threading.Event()
+
+        def hold():
+            with queue.slot():
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        while queue.in_flight == 0:
+            time.sleep(0.001)
+        batch = threading.Thread(target=_run, args=(queue, pipe, "batch", errors), kwargs={"priority": BATCH})
+        batch.start()
+        while queue.depth < 1:
+            time.sleep(0.001)
+        interactive = threading.Thread(
+            target=_run, args=(queue, pipe, "interactive", errors), kwargs={"priority": INTERACTIVE}
+        )
+        interactive.start()
+        while queue.depth < 2:
+            time.sleep(0.001)
+        release.set()
+        for thread in (holder, batch, interactive):
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(pipe.order, ["interactive", "batch"])
+
+    def test_rejects_early_when_estimated_wait_exceeds_the_deadline(self):
+        queue = GenerationQueue(8)
+        queue.record((1024, 1024), 2.0)
+
+        with queue.slot(bucket=(1024, 1024)):
+            start = time.monotonic()
+            with self.assertRaises(HTTPException) as raised:
+                with queue.slot(deadline_seconds=0.5, bucket=(512, 512)):
+                    self.fail("admitted a request that cannot meet its deadline")
+            self.assertLess(time.monotonic() - start, 0.1)
+            self.assertIn("exceeds deadline", raised.exception.detail)
+            self.assertEqual(raised.exception.headers, {"Retry-After": "2"})
+
+            # Unmeasured resolutions are estimated from the nearest measured one.
+            self.assertAlmostEqual(queue.estimate((512, 512)), 0.5)
+
+    def test_waiter_gives_up_when_its_deadline_passes(self):
+        queue = GenerationQueue(8, default_service_seconds=0.0)
+
+        with queue.slot():
+            with self.assertRaises(HTTPException) as raised:
+                with queue.slot(deadline_seconds=0.05):
+                    self.fail("waiter ran while the slot was held")
+
+        self.assertEqual(raised.exception.detail, "Queue deadline exceeded")
+        self.assertEqual(queue.depth, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from fastapi import HTTPException
+
+from generation_queue import GenerationQueue
+from inference_executor import InferenceExecutor
+
+
+class StubPipeline:
+    """CPU stand-in for a diffusion pipeline that blocks its caller, as a GPU call does."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.calls = 0
+
+    def __call__(self, prompt: str) -> str:
+        time.sleep(self.seconds)
+        self.calls += 1
+        return prompt.upper()
+
+
+class InferenceExecutorTest(unittest.IsolatedAsyncioTestCase):
+    async def test_event_loop_stays_responsive_during_generation(self):
+        executor = InferenceExecutor(GenerationQueue(4, deadline_seconds=5, default_service_seconds=0.05))
+        pipe = StubPipeline(0.05)
+        generations = asyncio.gather(*(executor.run(pipe, f"cat {i}") for i in range(4)))
+
+        worst = 0.0
+        while not generations.done():
+            start = time.monotonic()
+            await asyncio.sleep(0.005)
+            worst = max(worst, time.monotonic() - start)
+
+        self.assertEqual(await generations, ["CAT 0", "CAT 1", "CAT 2", "CAT 3"])
+        self.assertLess(worst, 0.04)
+        executor.shutdown()
+
+    async def test_rejects_calls_beyond_the_queue_limit(self):
+        executor = InferenceExecutor(GenerationQueue(2, deadline_seconds=5))
+        release = threading.Event()
+        held = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with self.assertRaises(HTTPException) as raised:
+            await executor.run(release.wait)
+        self.assertEqual((raised.exception.status_code, raised.exception.detail), (503, "Queue full"))
+
+        release.set()
+        await asyncio.gather(*held)
+        self.assertTrue(await executor.run(release.wait))
+        executor.shutdown()
+
+    async def test_cancelled_waiter_gives_back_its_admission(self):
+        executor = InferenceExecutor(GenerationQueue(1, deadline_seconds=5))
+        release = threading.Event()
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.01)
+        running.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await running
+
+        # The call itself still finishes (the GPU cannot be interrupted) and then frees the slot.
+        release.set()
+        for _ in range(100):
+            try:
+                self.assertTrue(await executor.run(release.wait))
+                break
+            except HTTPException:
+                await asyncio.sleep(0.01)
+        else:
+            self.fail("admission was never released")
+        executor.shutdown()
+
+    async def test_admission_taken_before_preparing_inputs(self):
+        executor = InferenceExecutor(GenerationQueue(1, deadline_seconds=5))
+        self.assertTrue(executor.try_admit())
+
+        # The queue is full as soon as the admission is taken, before the call is submitted.
+        self.assertFalse(executor.try_admit())
+        with self.assertRaises(HTTPException):
+            await executor.run(str.upper, "dog")
+
+        self.assertEqual(await executor.run(str.upper, "cat", admitted=True), "CAT")
+        self.assertTrue(executor.try_admit())
+        executor.release_admission()  # e.g. an input failed to decode
+        self.assertEqual(await executor.run(str.upper, "cat"), "CAT")
+        executor.shutdown()
+
+    async def test_concurrent_load_is_served_one_generation_at_a_time(self):
+        queue = GenerationQueue(8, deadline_seconds=5, default_service_seconds=0.02)
+        executor = InferenceExecutor(queue)
+        pipe = StubPipeline(0.02)
+
+        start = time.monotonic()
+        results = await asyncio.gather(*(executor.run(pipe, "cat", bucket=(512, 512)) for _ in range(8)))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(results, ["CAT"] * 8)
+        # One slot: throughput is bounded by the stub's service time, 50 images/s here.
+        self.assertGreaterEqual(elapsed, 8 * 0.02)
+        self.assertEqual(queue.service_times.snapshot()["512x512"]["n"], 8)
+        self.assertEqual((queue.depth, queue.in_flight), (0, 0))
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from prompt_cache import PromptEmbeddingCache, normalize_prompt
+
+
+class StubEncoder:
+    """CPU text encoder: one float32 row of 256 values (1 KiB) per prompt."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, prompt):
+        self.calls.append(prompt)
+        return {"prompt_embeds": np.full((1, 256), len(self.calls), dtype=np.float32)}
+
+
+class PromptEmbeddingCacheTest(unittest.TestCase):
+    def test_repeat_prompts_skip_the_encoder(self):
+        encoder = StubEncoder()
+        cache = PromptEmbeddingCache(encoder, "model-a")
+
+        first = cache.get("a cat  in a hat")
+        again = cache.get(" a cat in a hat\n")
+
+        self.assertIs(again, first)
+        self.assertEqual(encoder.calls, ["a cat in a hat"])
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_key_includes_model_and_keeps_case(self):
+        a, b = PromptEmbeddingCache(StubEncoder(), "model-a"), PromptEmbeddingCache(StubEncoder(), "model-b")
+        self.assertNotEqual(a.key("cat"), b.key("cat"))
+        self.assertNotEqual(a.key("cat"), a.key("Cat"))
+        self.assertEqual(normalize_prompt("café\t ok"), "café ok")
+
+    def test_evicts_least_recently_used_within_byte_budget(self):
+        encoder = StubEncoder()
+        cache = PromptEmbeddingCache(encoder, "model-a", max_bytes=2 * 1024)
+
+        cache.get("one")
+        cache.get("two")
+        cache.get("one")  # "two" is now the oldest
+        cache.get("three")
+
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.stats()["bytes"], 2 * 1024)
+        cache.get("one")
+        cache.get("two")
+        self.assertEqual(encoder.calls, ["one", "two", "three", "two"])
+
+    def test_oversized_embeddings_are_returned_but_not_kept(self):
+        cache = PromptEmbeddingCache(StubEncoder(), "model-a", max_bytes=512)
+        self.assertIn("prompt_embeds", cache.get("long"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
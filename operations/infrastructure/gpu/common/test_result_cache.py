@@ -0,0 +1,98 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from fastapi import HTTPException
+
+from result_cache import ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = os.path.join(self.tmp.name, "results")
+
+    def test_repeat_is_served_from_disk_and_survives_restart(self):
+        cache = ResultCache(self.dir)
+        key = ResultCache.key(model="m", prompt="cat", seed=1, width=512, height=512, steps=4)
+        calls = []
+
+        def produce():
+            calls.append(1)
+            return b"jpeg-bytes"
+
+        self.assertEqual(cache.get_or_create(key, produce), b"jpeg-bytes")
+        self.assertEqual(cache.get_or_create(key, produce), b"jpeg-bytes")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(ResultCache(self.dir).get(key), b"jpeg-bytes")
+        self.assertNotEqual(key, ResultCache.key(model="m", prompt="cat", seed=2, width=512, height=512, steps=4))
+
+    def test_evicts_least_recently_used_within_byte_budget(self):
+        cache = ResultCache(self.dir, max_bytes=20)
+        cache.put("a" * 64, b"x" * 8)
+        cache.put("b" * 64, b"x" * 8)
+        cache.get("a" * 64)
+        cache.put("c" * 64, b"x" * 8)
+
+        self.assertIsNone(cache.get("b" * 64))
+        self.assertIsNotNone(cache.get("a" * 64))
+        self.assertEqual(cache.stats()["bytes"], 16)
+        self.assertEqual(ResultCache(self.dir, max_bytes=20).stats()["entries"], 2)
+
+    def test_concurrent_identical_requests_share_one_generation(self):
+        cache = ResultCache(self.dir)
+        calls = []
+        results = []
+
+        def produce():
+            calls.append(1)
+            time.sleep(0.05)
+            return b"image"
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k" * 64, produce)))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b"image"] * 5)
+        self.assertEqual(cache.stats()["coalesced"], 4)
+
+    def test_failures_reach_waiters_and_are_not_cached(self):
+        cache = ResultCache(self.dir)
+
+        def produce():
+            raise HTTPException(status_code=400, detail="NSFW content detected")
+
+        with self.assertRaises(HTTPException):
+            cache.get_or_create("n" * 64, produce)
+        self.assertEqual(cache.get_or_create("n" * 64, lambda: b"ok"), b"ok")
+
+
+class AsyncResultCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_identical_requests_share_one_generation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(tmp)
+            calls = []
+
+            async def produce():
+                calls.append(1)
+                await asyncio.sleep(0.02)
+                return b"image"
+
+            results = await asyncio.gather(*(cache.aget_or_create("k" * 64, produce) for _ in range(4)))
+
+            self.assertEqual(results, [b"image"] * 4)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(await cache.aget_or_create("k" * 64, produce), b"image")
+            self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from fastapi import HTTPException
+
+from shm_inference import InferenceBackend, InferenceClient, _Connection
+
+
+def stub_render(params: dict) -> np.ndarray:
+    """CPU stand-in for the pipeline: a flat image whose value is the seed."""
+    if params.get("prompt") == "busy":
+        raise HTTPException(status_code=503, detail="Queue full", headers={"Retry-After": "1"})
+    time.sleep(params.get("seconds", 0))
+    return np.full((params["height"], params["width"], 3), params["seed"] % 256, dtype=np.uint8)
+
+
+def run_backend(socket_path: str, slots: int) -> None:
+    backend = InferenceBackend(stub_render, socket_path, slot_bytes=64 * 64 * 3, slots=slots, load=lambda: {"n": 1})
+    asyncio.run(backend.serve())
+
+
+class ShmInferenceTest(unittest.TestCase):
+    def start_backend(self, slots: int = 4) -> str:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        socket_path = os.path.join(tmp.name, "gpu.sock")
+        process = multiprocessing.get_context("fork").Process(target=run_backend, args=(socket_path, slots))
+        process.start()
+        self.backend_process = process
+        self.addCleanup(process.join)
+        self.addCleanup(process.terminate)
+        # The socket file appears at bind(), before listen(): wait until a connection succeeds.
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                _Connection(socket_path).close()
+                return socket_path
+            except OSError:
+                self.assertLess(time.monotonic(), deadline, "backend did not start")
+                time.sleep(0.01)
+
+    def test_front_end_threads_get_their_own_pixels_through_shared_memory(self):
+        client = InferenceClient(self.start_backend())
+        self.addCleanup(client.close)
+
+        def request(seed):
+            with client.generate(prompt="cat", seed=seed, width=48, height=32) as pixels:
+                return pixels.shape, int(pixels.min()), int(pixels.max())
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(request, range(40)))
+
+        self.assertEqual(results, [((32, 48, 3), seed, seed) for seed in range(40)])
+        self.assertEqual(client.load(), {"n": 1, "draining": False})
+
+    def test_backend_errors_arrive_as_http_errors(self):
+        client = InferenceClient(self.start_backend())
+        self.addCleanup(client.close)
+        with self.assertRaises(HTTPException) as raised, client.generate(prompt="busy", seed=1, width=8, height=8):
+            self.fail("no image expected")
+        self.assertEqual((raised.exception.status_code, raised.exception.detail), (503, "Queue full"))
+        self.assertEqual(raised.exception.headers, {"Retry-After": "1"})
+
+        with self.assertRaises(HTTPException) as raised, client.generate(prompt="cat", seed=1, width=128, height=128):
+            pass
+        self.assertEqual(raised.exception.status_code, 500)
+
+    def test_slots_held_by_a_dropped_front_end_are_reclaimed(self):
+        socket_path = self.start_backend(slots=1)
+        dropped = _Connection(socket_path)
+        self.assertIn("slot", dropped.call({"op": "generate", "params": {"seed": 1, "width": 8, "height": 8}}))
+
+        client = InferenceClient(socket_path)
+        self.addCleanup(client.close)
+        done = threading.Event()
+
+        def waiting_request():
+            with client.generate(prompt="cat", seed=2, width=8, height=8) as pixels:
+                self.assertEqual(int(pixels[0, 0, 0]), 2)
+            done.set()
+
+        thread = threading.Thread(target=waiting_request)
+        thread.start()
+        self.assertFalse(done.wait(0.2), "second request got a slot that was still held")
+        dropped.close()  # front-end dies without releasing
+        self.assertTrue(done.wait(5))
+        thread.join()
+
+        # Released slots are reused: many sequential requests through a single slot.
+        for seed in range(10):
+            with client.generate(prompt="cat", seed=seed, width=8, height=8) as pixels:
+                self.assertEqual(int(pixels[0, 0, 0]), seed)
+
+    def test_drain_from_a_front_end_refuses_new_work_and_waits_for_held_slots(self):
+        socket_path = self.start_backend(slots=2)
+        holder = _Connection(socket_path)
+        self.addCleanup(holder.close)
+        held = holder.call({"op": "generate", "params": {"seed": 1, "width": 8, "height": 8}})
+
+        client = InferenceClient(socket_path)
+        self.addCleanup(client.close)
+        self.assertEqual(client.drain(), {"draining": True, "in_flight": 1})
+
+        # Every front-end sees the flag and is refused, not just the one that asked.
+        self.assertTrue(InferenceClient(socket_path).load()["draining"])
+        with self.assertRaises(HTTPException) as raised, client.generate(prompt="cat", seed=2, width=8, height=8):
+            pass
+        self.assertEqual((raised.exception.status_code, raised.exception.detail), (503, "Worker draining"))
+
+        time.sleep(0.6)
+        self.assertTrue(self.backend_process.is_alive(), "backend exited while a slot was still held")
+        holder.send({"op": "release", "slot": held["slot"]})
+        self.backend_process.join(5)
+        self.assertEqual(self.backend_process.exitcode, 0)
+
+    def test_unavailable_backend_is_a_503(self):
+        client = InferenceClient("/nonexistent/gpu.sock")
+        with self.assertRaises(HTTPException) as raised, client.generate(prompt="cat", seed=1, width=8, height=8):
+            pass
+        self.assertEqual(raised.exception.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from tiled_upscale import tiled_upscale
+
+
+class StubUpscaler:
+    """CPU stand-in for SPAN: optional 3x3 box blur (a receptive field), then 2x nearest."""
+
+    def __init__(self, blur: bool = False):
+        self.blur = blur
+        self.largest_input = 0
+
+    def __call__(self, patch: np.ndarray) -> np.ndarray:
+        self.largest_input = max(self.largest_input, patch.shape[0] * patch.shape[1])
+        image = patch.astype(np.float32) / 255
+        if self.blur:
+            padded = np.pad(image, ((1, 1), (1, 1), (0, 0)), mode="edge")
+            image = sum(padded[dy : dy + patch.shape[0], dx : dx + patch.shape[1]] for dy in range(3) for dx in range(3)) / 9
+        return image.repeat(2, axis=0).repeat(2, axis=1)
+
+
+class TiledUpscaleTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Smooth gradient plus noise: enough structure for seams to show.
+        y, x = np.mgrid[0:300, 0:420]
+        base = np.stack([x / 420, y / 300, (x + y) / 720], axis=-1) * 200
+        self.image = np.clip(base + rng.normal(0, 10, base.shape), 0, 255).astype(np.uint8)
+
+    def test_identity_stub_matches_a_single_pass_exactly(self):
+        whole = StubUpscaler()(self.image)
+        tiled = tiled_upscale(self.image, StubUpscaler(), scale=2, tile=128, overlap=16)
+        np.testing.assert_array_equal(tiled, np.clip(whole * 255, 0, 255).round().astype(np.uint8))
+
+    def test_overlap_blending_hides_tile_borders(self):
+        whole = np.clip(StubUpscaler(blur=True)(self.image) * 255, 0, 255).round()
+        tiled = tiled_upscale(self.image, StubUpscaler(blur=True), scale=2, tile=128, overlap=16).astype(np.float32)
+        # Only the tile borders can differ, and by far less than the image noise.
+        self.assertLess(np.abs(tiled - whole).max(), 1.5)
+
+    def test_model_never_sees_more_than_one_tile(self):
+        stub = StubUpscaler()
+        tiled_upscale(self.image, stub, scale=2, tile=128, overlap=16)
+        self.assertEqual(stub.largest_input, 128 * 128)
+
+        stub = StubUpscaler()
+        out = tiled_upscale(self.image[:100, :100], stub, scale=2, tile=128, overlap=16)
+        self.assertEqual((out.shape, stub.largest_input), ((200, 200, 3), 100 * 100))
+
+    def test_rejects_overlap_that_leaves_no_progress(self):
+        with self.assertRaises(ValueError):
+            tiled_upscale(self.image, StubUpscaler(), scale=2, tile=64, overlap=32)
+
+
+if __name__ == "__main__":
+    unittest.main()
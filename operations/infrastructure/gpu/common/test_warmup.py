@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+
+from dimensions import DimensionPlanner
+from warmup import BucketWarmup
+
+
+class StubPipeline:
+    """CPU stand-in: the first call at a size is the slow, "autotuning" one."""
+
+    def __init__(self, fail_on=()):
+        self.calls = []
+        self.fail_on = set(fail_on)
+
+    def __call__(self, width, height):
+        if (width, height) in self.fail_on:
+            raise RuntimeError("CUDA out of memory")
+        self.calls.append((width, height))
+
+
+class BucketWarmupTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.state = os.path.join(self.tmp.name, "cache", "warmup.json")
+        self.buckets = DimensionPlanner(align=32, max_side=768, max_gen_pixels=512 * 512, floor=True).buckets
+
+    def test_runs_every_bucket_cold_and_warm_and_persists_timings(self):
+        pipe = StubPipeline()
+        ran = BucketWarmup(self.state, {"model": "stub"}).run(self.buckets, pipe)
+
+        self.assertEqual(pipe.calls, [b for b in self.buckets for _ in range(2)])
+        with open(self.state) as f:
+            state = json.load(f)
+        self.assertEqual(state["fingerprint"], {"model": "stub"})
+        self.assertEqual(state["buckets"], ran)
+        self.assertEqual(set(ran["512x512"]), {"cold_seconds", "warm_seconds"})
+
+    def test_restart_skips_tuned_buckets_only_for_the_same_fingerprint(self):
+        BucketWarmup(self.state, {"model": "stub"}, skip_tuned=True).run(self.buckets[:2], StubPipeline())
+
+        pipe = StubPipeline()
+        BucketWarmup(self.state, {"model": "stub"}, skip_tuned=True).run(self.buckets, pipe)
+        self.assertEqual(pipe.calls, [b for b in self.buckets[2:] for _ in range(2)])
+
+        pipe = StubPipeline()
+        BucketWarmup(self.state, {"model": "other"}, skip_tuned=True).run(self.buckets, pipe)
+        self.assertEqual(len(pipe.calls), 2 * len(self.buckets))
+
+    def test_eager_mode_rewarms_every_start(self):
+        BucketWarmup(self.state, {"model": "stub"}, skip_tuned=False).run(self.buckets, StubPipeline())
+        pipe = StubPipeline()
+        BucketWarmup(self.state, {"model": "stub"}, skip_tuned=False).run(self.buckets, pipe)
+        self.assertEqual(len(pipe.calls), 2 * len(self.buckets))
+
+    def test_failing_bucket_is_logged_not_recorded(self):
+        bad = self.buckets[0]
+        with self.assertLogs("warmup", "ERROR"):
+            ran = BucketWarmup(self.state, {"model": "stub"}).run(self.buckets, StubPipeline(fail_on=[bad]))
+        self.assertNotIn(f"{bad[0]}x{bad[1]}", ran)
+        self.assertEqual(len(ran), len(self.buckets) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import signal
+import threading
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+
+from service_times import ServiceTimes
+from worker_load import Drain, load_report
+
+
+class LoadReportTest(unittest.TestCase):
+    def test_reports_queue_and_per_bucket_percentiles(self):
+        times = ServiceTimes()
+        for seconds in (1.0, 2.0, 3.0, 4.0):
+            times.record((1024, 1024), seconds)
+        times.record((512, 512), 0.5)
+
+        report = load_report(queue_depth=2, in_flight=1, service_times=times)
+
+        self.assertEqual((report["queue_depth"], report["in_flight"], report["draining"]), (2, 1, False))
+        self.assertEqual(
+            report["service_seconds"],
+            {"1024x1024": {"p50": 3.0, "p95": 4.0, "n": 4}, "512x512": {"p50": 0.5, "p95": 0.5, "n": 1}},
+        )
+        self.assertIn("free_vram_mb", report)
+
+
+class DrainTest(unittest.IsolatedAsyncioTestCase):
+    async def test_drain_refuses_new_work_and_exits_after_in_flight_finishes(self):
+        drain = Drain(timeout_seconds=5)
+        finished = threading.Event()
+
+        def generation():
+            with drain.request():
+                finished.wait()
+
+        worker = threading.Thread(target=generation)
+        worker.start()
+        while drain.busy() == 0:
+            await asyncio.sleep(0.001)
+
+        with patch("worker_load.os.kill") as kill, patch("worker_load.DRAIN_POLL_SECONDS", 0.01):
+            drain.start("test")
+            with self.assertRaises(HTTPException) as raised:
+                with drain.request():
+                    self.fail("draining worker admitted a request")
+            self.assertEqual(raised.exception.status_code, 503)
+
+            await asyncio.sleep(0.05)
+            kill.assert_not_called()
+            finished.set()
+            await asyncio.wait_for(drain._task, 1)
+
+        worker.join()
+        kill.assert_called_once()
+        self.assertEqual(kill.call_args.args[1], signal.SIGTERM)
+
+    async def test_drain_gives_up_after_its_timeout(self):
+        drain = Drain(timeout_seconds=0.05)
+        with drain.request():
+            with patch("worker_load.DRAIN_POLL_SECONDS", 0.01):
+                self.assertFalse(await drain.wait_idle())
+        self.assertTrue(await drain.wait_idle())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""Resolution-bucket warmup before a worker advertises itself.
+
+The first generation at a new size pays for kernel selection and allocator growth (and,
+with `COMPILE_MODE`, for compiling the graph), which users saw as a latency spike after
+every deploy. `BucketWarmup.run()` generates each bucket from the dimension planner
+twice, cold then warm, before the server starts its heartbeat, so the registry only
+routes traffic to a worker that is already tuned.
+
+The plan and its timings are written to a JSON state file together with a fingerprint
+of what they were measured on (model, torch, GPU, compile mode). Compiled graphs are
+cached on disk by torch, so when compiling, a restart with the same fingerprint skips
+the buckets already in the file. Eager-mode tuning lives only in the process and is
+redone on every start.
+"""
+
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+Bucket = tuple[int, int]  # (width, height)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in {"1", "true", "yes"}
+# Denoising steps per warmup pass; the kernels a size needs do not depend on the count.
+WARMUP_STEPS = int(os.getenv("WARMUP_STEPS", "2"))
+# "" runs eager. Otherwise a torch.compile mode: "default", "max-autotune", or
+# "reduce-overhead" (which also captures CUDA graphs per bucket).
+COMPILE_MODE = os.getenv("COMPILE_MODE", "")
+
+
+def fingerprint(model_id: str, **extra) -> dict:
+    """What a set of warmup timings is only valid for."""
+    info = {"model": model_id, "compile": COMPILE_MODE, **extra}
+    try:
+        import torch
+
+        info["torch"] = torch.__version__
+        if torch.cuda.is_available():
+            info["device"] = torch.cuda.get_device_name()
+    except Exception:
+        pass
+    return info
+
+
+def compile_module(module, mode: str = COMPILE_MODE):
+    """torch.compile `module` with static shapes (one graph per bucket), or return it as is."""
+    if not mode:
+        return module
+    import torch
+
+    logger.info("Compiling %s (mode=%s)", type(module).__name__, mode)
+    return torch.compile(module, mode=mode, dynamic=False)
+
+
+def _key(bucket: Bucket) -> str:
+    return f"{bucket[0]}x{bucket[1]}"
+
+
+class BucketWarmup:
+    def __init__(self, state_path: str, fingerprint: dict, skip_tuned: bool = bool(COMPILE_MODE)):
+        self.state_path = state_path
+        self.fingerprint = fingerprint
+        self.skip_tuned = skip_tuned
+        self.buckets: dict[str, dict] = self._load()
+
+    def _load(self) -> dict[str, dict]:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable warmup state %s: %s", self.state_path, e)
+            return {}
+        if state.get("fingerprint") != self.fingerprint:
+            logger.info("Warmup state was recorded for %s, starting over", state.get("fingerprint"))
+            return {}
+        return state.get("buckets", {})
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"  # dreamshaper runs several workers
+        with open(tmp, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "buckets": self.buckets}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def run(self, buckets: list[Bucket], generate: Callable[[int, int], object]) -> dict[str, dict]:
+        """Generate every bucket cold and warm; returns {"WxH": timings} for this run."""
+        started = time.monotonic()
+        ran = {}
+        for bucket in buckets:
+            key = _key(bucket)
+            if self.skip_tuned and key in self.buckets:
+                logger.info("Warmup %s: already tuned, skipping", key)
+                continue
+            try:
+                t0 = time.monotonic()
+                generate(*bucket)
+                t1 = time.monotonic()
+                generate(*bucket)
+                t2 = time.monotonic()
+            except Exception as e:
+                # A bucket that cannot run (OOM, say) must not keep the worker from starting.
+                logger.error("Warmup %s failed: %s", key, e)
+                continue
+            ran[key] = {"cold_seconds": round(t1 - t0, 3), "warm_seconds": round(t2 - t1, 3)}
+            logger.info("Warmup %s: cold %.2fs, warm %.2fs", key, t1 - t0, t2 - t1)
+        if ran:
+            self.buckets.update(ran)
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("Could not save warmup state %s: %s", self.state_path, e)
+        logger.info("Warmup finished in %.1fs (%d of %d buckets run)", time.monotonic() - started, len(ran), len(buckets))
+        return ran
@@ -0,0 +1,121 @@
+"""Live capacity for the registry heartbeat, and graceful drain.
+
+Heartbeats used to say only "this URL is alive". `load_report()` adds what a router needs
+for least-loaded placement: queue depth, requests in flight, p50/p95 service time per
+resolution bucket and free VRAM. The registry ignores fields it does not know, so older
+routers keep working.
+
+Drain (SIGUSR1, or POST /drain) stops the heartbeat so the worker ages out of the
+registry, answers new generations with 503 (gen retries those on another worker),
+lets in-flight work finish and then exits. The setup scripts' restart loops bring the
+server back up, which makes "pull, then drain" a redeploy that drops nothing. When several
+front-end processes share one inference backend (see shm_inference.py), the backend owns the
+`Drain` and the front-ends forward drain requests to it.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+
+from service_times import ServiceTimes
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long a drain waits for in-flight work before exiting anyway.
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "300"))
+DRAIN_POLL_SECONDS = 0.5
+
+
+def free_vram_mb() -> int | None:
+    try:
+        import torch
+
+        if not torch.cuda.is_available():
+            return None
+        free, _total = torch.cuda.mem_get_info()
+        return free // (1024 * 1024)
+    except Exception:
+        return None
+
+
+def load_report(
+    queue_depth: int, in_flight: int, service_times: ServiceTimes, draining: bool = False, **extra
+) -> dict:
+    """`extra` carries server-specific figures, such as prompt cache statistics."""
+    return {
+        "queue_depth": queue_depth,
+        "in_flight": in_flight,
+        "service_seconds": service_times.snapshot(),
+        "free_vram_mb": free_vram_mb(),
+        "draining": draining,
+        **extra,
+    }
+
+
+class Drain:
+    """Drain state for one server process; `request()` marks the work a drain waits for.
+
+    `pending` counts work a drain also waits for that does not fit a `request()` block,
+    such as shared-memory slots front-ends have not handed back yet.
+    """
+
+    def __init__(self, timeout_seconds: float = DRAIN_TIMEOUT_SECONDS, pending: Callable[[], int] | None = None):
+        self.timeout_seconds = timeout_seconds
+        self.draining = False
+        self._active = 0
+        self._pending = pending or (lambda: 0)
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    def busy(self) -> int:
+        with self._lock:
+            active = self._active
+        return active + self._pending()
+
+    @contextmanager
+    def request(self):
+        """Wrap a whole generation request, response encoding included."""
+        with self._lock:
+            if self.draining:
+                raise HTTPException(status_code=503, detail="Worker draining")
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def start(self, reason: str) -> None:
+        with self._lock:
+            if self.draining:
+                return
+            self.draining = True
+        logger.warning("Draining (%s): heartbeat stopped, refusing new requests", reason)
+        self._task = asyncio.get_running_loop().create_task(self._finish())
+
+    def install_signal_handler(self, sig: int = signal.SIGUSR1) -> None:
+        asyncio.get_running_loop().add_signal_handler(sig, self.start, signal.Signals(sig).name)
+
+    async def wait_idle(self) -> bool:
+        """True once nothing is in flight, False if the drain timeout ran out first."""
+        give_up = time.monotonic() + self.timeout_seconds
+        while self.busy() > 0:
+            if time.monotonic() >= give_up:
+                return False
+            await asyncio.sleep(DRAIN_POLL_SECONDS)
+        return True
+
+    async def _finish(self) -> None:
+        if await self.wait_idle():
+            logger.warning("Drain complete, exiting")
+        else:
+            logger.error("Drain timed out with %d request(s) in flight, exiting anyway", self.busy())
+        # uvicorn turns SIGTERM into its normal graceful shutdown (lifespan exit included).
+        os.kill(os.getpid(), signal.SIGTERM)
@@ -1,13 +1,25 @@
-import os, sys, io, base64, logging, torch, time, threading, warnings, asyncio, aiohttp
+import os, sys, io, json, base64, logging, torch, time, warnings, asyncio, aiohttp, signal, threading, tempfile
+import numpy as np
+from PIL import Image
 from fastapi import FastAPI, HTTPException, Header, Depends
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-from contextlib import asynccontextmanager, contextmanager
+from contextlib import asynccontextmanager
+from typing import Literal
 
 os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
 os.environ["TQDM_DISABLE"] = "1"
 warnings.filterwarnings("ignore")
 
+# Modules shared by all GPU servers live in ../common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from dimensions import DimensionPlanner
+from generation_queue import GenerationQueue, PRIORITIES
+from result_cache import ResultCache
+from shm_inference import InferenceBackend, InferenceClient
+from warmup import WARMUP_ENABLED, WARMUP_STEPS, BucketWarmup, compile_module, fingerprint
+from worker_load import Drain, load_report
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", datefmt="%H:%M:%S")
 logger = logging.getLogger(__name__)
 for noisy in ["httpx", "httpcore", "urllib3", "diffusers", "transformers", "huggingface_hub", "peft"]:
@@ -32,14 +44,33 @@ NUM_INFERENCE_STEPS = int(os.getenv("NUM_INFERENCE_STEPS", "3"))
 GUIDANCE_SCALE = float(os.getenv("GUIDANCE_SCALE", "0.0"))
 MAX_DIM = int(os.getenv("MAX_DIM", "768"))
 MAX_PIXELS = int(os.getenv("MAX_PIXELS", str(512 * 512)))
+# SD1.5 wants 32px-aligned sizes; round down so a request never exceeds MAX_DIM or MAX_PIXELS.
+dimension_planner = DimensionPlanner(align=32, max_side=MAX_DIM, max_gen_pixels=MAX_PIXELS, floor=True)
 # Per Uvicorn worker process: one request runs on the GPU while one may wait.
 # Further requests receive 503 so gen can retry another registered Vast worker.
+# With WORKERS > 1 the shared backend admits QUEUE_LIMIT per front-end.
 QUEUE_LIMIT = int(os.getenv("QUEUE_LIMIT", "2"))
-if QUEUE_LIMIT < 1:
-    raise ValueError("QUEUE_LIMIT must be at least 1")
+# A request that would wait longer than this (or its own deadline_seconds) for the
+# GPU is refused up front, which is also a 503 gen can retry elsewhere.
+QUEUE_DEADLINE_SECONDS = float(os.getenv("QUEUE_DEADLINE_SECONDS", "5"))
+
+
+def make_generation_queue(limit: int) -> GenerationQueue:
+    return GenerationQueue(
+        limit,
+        deadline_seconds=QUEUE_DEADLINE_SECONDS,
+        default_service_seconds=0.2,  # 512x512 at 3 steps
+    )
 
-generate_lock = threading.Lock()
-generation_slots = threading.BoundedSemaphore(QUEUE_LIMIT)
+
+generation_queue = make_generation_queue(QUEUE_LIMIT)
+# Set for the HTTP front-end processes of a WORKERS > 1 server: the pipeline and the queue
+# live in one backend process instead (see run_backend and ../common/shm_inference.py).
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET")
+inference_client = InferenceClient(INFERENCE_SOCKET) if INFERENCE_SOCKET else None
+drain = Drain()
+# Shared by the uvicorn worker processes; see ../common/result_cache.py.
+result_cache = ResultCache(os.getenv("RESULT_CACHE_DIR", os.path.join(MODEL_CACHE, "results")))
 
 
 class ImageRequest(BaseModel):
@@ -53,17 +84,8 @@ class ImageRequest(BaseModel):
     # sized for. Step count belongs to the model config, not the caller.
     steps: int | None = None
     safety_checker_adj: float | None = None
-
-
-def clamp_dims(w, h):
-    w, h = min(w, MAX_DIM), min(h, MAX_DIM)
-    w = max(32, (w // 32) * 32)
-    h = max(32, (h // 32) * 32)
-    if w * h > MAX_PIXELS:
-        scale = (MAX_PIXELS / (w * h)) ** 0.5
-        w = max(32, int(w * scale) // 32 * 32)
-        h = max(32, int(h * scale) // 32 * 32)
-    return w, h
+    priority: Literal["interactive", "batch"] = "interactive"
+    deadline_seconds: float | None = Field(default=None, gt=0)
 
 
 pipe = None
@@ -81,7 +103,7 @@ def get_public_ip():
 async def send_heartbeat():
     # Registering puts this worker into the live pool immediately. Keep it off
     # while validating a new host so a half-checked box cannot take traffic.
-    if os.getenv("HEARTBEAT_ENABLED", "true").lower() not in ("1", "true", "yes"):
+    if os.getenv("HEARTBEAT_ENABLED", "true").lower() not in ("1", "true", "yes") or drain.draining:
         return
     public_hostname = os.getenv("PUBLIC_HOSTNAME")
     if public_hostname:
@@ -102,7 +124,17 @@ async def send_heartbeat():
     headers = {"Authorization": f"Bearer {token}"} if token else {}
     try:
         async with aiohttp.ClientSession() as session:
-            async with session.post(register_url, json={"url": url, "type": service_type}, headers=headers) as resp:
+            if inference_client:
+                # The backend owns the drain; once it starts, every front-end leaves the pool.
+                load = {**await asyncio.to_thread(inference_client.load), "result_cache": result_cache.stats()}
+                if load["draining"]:
+                    return
+            else:
+                load = load_report(generation_queue.depth, generation_queue.in_flight,
+                                   generation_queue.service_times, drain.draining,
+                                   result_cache=result_cache.stats())
+            payload = {"url": url, "type": service_type, "load": load}
+            async with session.post(register_url, json=payload, headers=headers) as resp:
                 if resp.status == 200:
                     logger.info("Heartbeat sent: %s", url)
                 else:
@@ -123,13 +155,15 @@ async def periodic_heartbeat():
             await asyncio.sleep(5)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+def warmup_generate(width, height):
+    with torch.inference_mode():
+        pipe(prompt="warmup", width=width, height=height,
+             num_inference_steps=WARMUP_STEPS, guidance_scale=GUIDANCE_SCALE)
+
+
+def load_pipeline():
     global pipe
     from diffusers import StableDiffusionPipeline, AutoencoderTiny, LCMScheduler
-    if not BACKEND_TOKEN:
-        logger.critical("PLN_GPU_TOKEN not configured - refusing to start")
-        raise RuntimeError("PLN_GPU_TOKEN must be configured")
     logger.info("Loading %s + %s...", MODEL_ID, LCM_LORA_ID)
     t0 = time.time()
     pipe = StableDiffusionPipeline.from_pretrained(
@@ -148,9 +182,44 @@ async def lifespan(app: FastAPI):
     pipe.vae = AutoencoderTiny.from_pretrained(
         TINY_VAE_ID, torch_dtype=torch.float16, cache_dir=MODEL_CACHE).to("cuda")
     pipe.set_progress_bar_config(disable=True)
+    pipe.unet = compile_module(pipe.unet)
     logger.info("Loaded in %.1fs (scheduler=%s, vae=%s)", time.time() - t0,
                 pipe.scheduler.__class__.__name__, pipe.vae.__class__.__name__)
 
+    # Tune every resolution bucket before the heartbeat advertises this worker.
+    if WARMUP_ENABLED:
+        BucketWarmup(os.path.join(MODEL_CACHE, "warmup.json"), fingerprint(MODEL_ID, steps=WARMUP_STEPS)).run(
+            dimension_planner.buckets, warmup_generate)
+
+
+async def wait_for_backend():
+    # The backend loads and warms the model while the front-ends start; nothing is served,
+    # and no heartbeat is sent, until it answers.
+    while True:
+        try:
+            await asyncio.to_thread(inference_client.load)
+            return
+        except HTTPException:
+            await asyncio.sleep(1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not BACKEND_TOKEN:
+        logger.critical("PLN_GPU_TOKEN not configured - refusing to start")
+        raise RuntimeError("PLN_GPU_TOKEN must be configured")
+    if inference_client:
+        await wait_for_backend()
+        logger.info("Inference backend ready at %s", INFERENCE_SOCKET)
+    else:
+        load_pipeline()
+
+    if inference_client:
+        # `kill -USR1` may hit any front-end; it drains the shared backend, and with it all of them.
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGUSR1, lambda: loop.run_in_executor(None, inference_client.drain))
+    else:
+        drain.install_signal_handler()
     heartbeat_task = None
     try:
         await send_heartbeat()
@@ -169,6 +238,8 @@ async def lifespan(app: FastAPI):
                 await heartbeat_task
             except asyncio.CancelledError:
                 pass
+        if inference_client:
+            inference_client.close()
 
 
 app = FastAPI(title="DreamShaper-8 LCM", lifespan=lifespan)
@@ -181,48 +252,103 @@ def verify_backend_token(x_backend_token: str = Header(None, alias="x-backend-to
     return True
 
 
-@contextmanager
-def generation_slot():
-    if not generation_slots.acquire(blocking=False):
-        raise HTTPException(status_code=503, detail="Queue full")
-    try:
-        yield
-    finally:
-        generation_slots.release()
-
-
 @app.post("/generate")
 def generate(request: ImageRequest, _auth: bool = Depends(verify_backend_token)):
-    if pipe is None:
+    if pipe is None and inference_client is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
-    with generation_slot():
-        seed = request.seed if request.seed is not None else int.from_bytes(os.urandom(8), "big")
-        generator = torch.Generator("cuda").manual_seed(seed)
-        gen_w, gen_h = clamp_dims(request.width, request.height)
-        try:
-            t0 = time.time()
-            with generate_lock:
-                with torch.inference_mode():
-                    output = pipe(prompt=request.prompts[0], generator=generator, width=gen_w, height=gen_h,
-                                  num_inference_steps=NUM_INFERENCE_STEPS, guidance_scale=GUIDANCE_SCALE)
-                image = output.images[0]
-            logger.info("Generated %dx%d in %.3fs", gen_w, gen_h, time.time() - t0)
-            buf = io.BytesIO()
-            image.save(buf, format="JPEG", quality=90)
-            return JSONResponse(content=[{"image": base64.b64encode(buf.getvalue()).decode(), "has_nsfw_concept": False,
-                                          "concept": [], "width": image.width, "height": image.height, "seed": seed,
-                                          "prompt": request.prompts[0]}])
-        except torch.cuda.OutOfMemoryError as e:
-            logger.error("OOM: %s", e)
-            sys.exit(1)
+    with drain.request():
+        return _generate(request)
+
+
+def _generate(request: ImageRequest):
+    seed = request.seed if request.seed is not None else int.from_bytes(os.urandom(8), "big")
+    gen_w, gen_h = dimension_planner.plan(request.width, request.height).bucket
+    try:
+        if request.seed is None:
+            result = _render(request, seed, gen_w, gen_h)
+        else:
+            # A seeded request always produces the same image, so repeats are served from disk.
+            key = result_cache.key(model=MODEL_ID, lora=LCM_LORA_ID, vae=TINY_VAE_ID, prompt=request.prompts[0],
+                                   seed=seed, width=gen_w, height=gen_h, steps=NUM_INFERENCE_STEPS,
+                                   guidance=GUIDANCE_SCALE)
+            result = result_cache.get_or_create(key, lambda: _render(request, seed, gen_w, gen_h))
+        return JSONResponse(content=[{**json.loads(result), "seed": seed, "prompt": request.prompts[0]}])
+    except torch.cuda.OutOfMemoryError as e:
+        logger.error("OOM: %s", e)
+        sys.exit(1)
+
+
+def _render(request: ImageRequest, seed: int, gen_w: int, gen_h: int) -> bytes:
+    """Run the pipeline; returns the seed-independent part of the response item as JSON."""
+    params = dict(prompt=request.prompts[0], seed=seed, width=gen_w, height=gen_h,
+                  priority=request.priority, deadline_seconds=request.deadline_seconds)
+    if inference_client is None:
+        return _encode(run_pipeline(**params))
+    # Front-end: the backend writes the pixels into shared memory and this process encodes them.
+    with inference_client.generate(**params) as pixels:
+        return _encode(Image.fromarray(pixels))
+
+
+def run_pipeline(prompt: str, seed: int, width: int, height: int, priority: str,
+                 deadline_seconds: float | None) -> Image.Image:
+    generator = torch.Generator("cuda").manual_seed(seed)
+    with generation_queue.slot(priority=PRIORITIES[priority], deadline_seconds=deadline_seconds,
+                               bucket=(width, height)):
+        t0 = time.time()
+        with torch.inference_mode():
+            output = pipe(prompt=prompt, generator=generator, width=width, height=height,
+                          num_inference_steps=NUM_INFERENCE_STEPS, guidance_scale=GUIDANCE_SCALE)
+        image = output.images[0]
+    logger.info("Generated %dx%d in %.3fs", width, height, time.time() - t0)
+    return image
+
+
+def _encode(image: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=90)
+    return json.dumps({"image": base64.b64encode(buf.getvalue()).decode(), "has_nsfw_concept": False,
+                       "concept": [], "width": image.width, "height": image.height}).encode()
+
+
+def backend_render(params: dict) -> np.ndarray:
+    try:
+        return np.asarray(run_pipeline(**params))
+    except torch.cuda.OutOfMemoryError as e:
+        # Same policy as the single-process server: die and let the restart loop recover.
+        # The front-ends' watchdog takes the whole server down with this process.
+        logger.error("OOM: %s", e)
+        os._exit(1)
+
+
+def run_backend(socket_path: str, workers: int):
+    """GPU process behind `workers` HTTP front-ends."""
+    global generation_queue
+    # The front-ends used to admit QUEUE_LIMIT each; keep the same total for the shared GPU.
+    generation_queue = make_generation_queue(QUEUE_LIMIT * workers)
+    load_pipeline()
+    backend = InferenceBackend(
+        backend_render, socket_path, slot_bytes=MAX_DIM * MAX_DIM * 3,
+        load=lambda: load_report(generation_queue.depth, generation_queue.in_flight,
+                                 generation_queue.service_times))
+    asyncio.run(backend.serve())
+
+
+@app.post("/drain")
+async def start_drain(_auth: bool = Depends(verify_backend_token)):
+    if inference_client:
+        reply = await asyncio.to_thread(inference_client.drain)
+        return {"status": "draining", "in_flight": reply["in_flight"]}
+    drain.start("POST /drain")
+    return {"status": "draining", "in_flight": drain.busy()}
 
 
 @app.get("/health")
 async def health():
-    if pipe is None:
+    if pipe is None and inference_client is None:
         raise HTTPException(status_code=503, detail="Not loaded")
+    draining = (await asyncio.to_thread(inference_client.load))["draining"] if inference_client else drain.draining
     return {"status": "healthy", "model": MODEL_ID, "lora": LCM_LORA_ID,
-            "steps": NUM_INFERENCE_STEPS, "guidance": GUIDANCE_SCALE}
+            "steps": NUM_INFERENCE_STEPS, "guidance": GUIDANCE_SCALE, "draining": draining}
 
 
 if __name__ == "__main__":
@@ -232,11 +358,40 @@ if __name__ == "__main__":
     # the time: at 512x512 the per-request cost is mostly Python (JPEG encode,
     # base64, HTTP) and the GIL caps how much of that overlaps. Measured on a
     # 3090 in production, a single process plateaued at ~4.3 img/s with the GPU
-    # at 26-45%. Each worker is a separate process with its own pipeline and
-    # lock, so both the GPU work and the Python overhead actually overlap.
-    # The model is only ~3 GB of the card's 24 GB, so several copies fit.
+    # at 26-45%. With WORKERS > 1 the HTTP, JPEG and base64 work moves to
+    # separate front-end processes, and one backend process keeps the only
+    # pipeline busy. Pixels travel through shared memory, so VRAM use and load
+    # time stay those of a single copy.
     workers = int(os.getenv("WORKERS", "1"))
     if workers > 1:
-        uvicorn.run("server:app", host="0.0.0.0", port=port, workers=workers)
+        import multiprocessing
+        socket_path = os.getenv("INFERENCE_SOCKET") or os.path.join(tempfile.gettempdir(), f"dreamshaper-{port}.sock")
+        backend = multiprocessing.get_context("spawn").Process(
+            target=run_backend, args=(socket_path, workers), name="inference-backend")
+        backend.start()
+        # Inherited by the front-end processes uvicorn spawns below.
+        os.environ["INFERENCE_SOCKET"] = socket_path
+        stopping = threading.Event()
+
+        def watchdog():
+            backend.join()
+            if stopping.is_set():
+                return
+            if backend.exitcode == 0:
+                logger.warning("Inference backend drained; stopping the server")
+            else:
+                logger.critical("Inference backend exited (%s); stopping the server", backend.exitcode)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        threading.Thread(target=watchdog, daemon=True).start()
+        # The drain lives in the backend: `kill -USR1` on this supervisor forwards it there,
+        # and the watchdog above stops the front-ends once the backend has exited.
+        signal.signal(signal.SIGUSR1, lambda *_: os.kill(backend.pid, signal.SIGUSR1))
+        try:
+            uvicorn.run("server:app", host="0.0.0.0", port=port, workers=workers)
+        finally:
+            stopping.set()
+            backend.terminate()
+            backend.join()
     else:
         uvicorn.run(app, host="0.0.0.0", port=port)
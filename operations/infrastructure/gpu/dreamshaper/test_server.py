@@ -1,24 +1,24 @@
-import threading
 import unittest
 
 from fastapi import HTTPException
 
 import server
+from generation_queue import GenerationQueue
 
 
 class GenerationSlotTest(unittest.TestCase):
     def setUp(self):
-        self.original_slots = server.generation_slots
-        server.generation_slots = threading.BoundedSemaphore(2)
+        self.original_queue = server.generation_queue
+        server.generation_queue = GenerationQueue(2, concurrency=2)
 
     def tearDown(self):
-        server.generation_slots = self.original_slots
+        server.generation_queue = self.original_queue
 
     def test_rejects_requests_beyond_the_queue_limit(self):
-        with server.generation_slot():
-            with server.generation_slot():
+        with server.generation_queue.slot():
+            with server.generation_queue.slot():
                 with self.assertRaises(HTTPException) as raised:
-                    with server.generation_slot():
+                    with server.generation_queue.slot():
                         self.fail("queue admitted a third request")
 
                 self.assertEqual(raised.exception.status_code, 503)
@@ -26,12 +26,18 @@ class GenerationSlotTest(unittest.TestCase):
 
     def test_releases_slot_after_generation_failure(self):
         with self.assertRaises(RuntimeError):
-            with server.generation_slot():
+            with server.generation_queue.slot():
                 raise RuntimeError("generation failed")
 
-        with server.generation_slot():
+        with server.generation_queue.slot():
             pass
 
+    def test_request_defaults_to_interactive_priority(self):
+        request = server.ImageRequest()
+
+        self.assertEqual(server.PRIORITIES[request.priority], 0)
+        self.assertIsNone(request.deadline_seconds)
+
 
 if __name__ == "__main__":
     unittest.main()
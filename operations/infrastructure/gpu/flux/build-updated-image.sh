@@ -5,8 +5,9 @@
 
 echo "Building updated Flux image with server.py fixes..."
 
-# Build the image
-docker build -f Dockerfile.updated -t pollinations/flux-svdquant:updated .
+# Build the image from gpu/ so the shared common/ modules are in the context
+cd "$(dirname "$0")/.."
+docker build -f flux/Dockerfile.updated -t pollinations/flux-svdquant:updated .
 
 if [ $? -eq 0 ]; then
     echo "✅ Build successful!"
@@ -4,7 +4,7 @@
 # Requires Docker Hub login credentials
 
 echo "Pushing pollinations/flux-svdquant:updated to Docker Hub..."
-echo "Note: The image is 17.5GB total, but only ~12KB will be uploaded (just the updated server.py layer)"
+echo "Note: The image is 17.5GB total, but only the small server.py and common/ layers will be uploaded"
 echo ""
 
 # Check if logged in
@@ -2,7 +2,9 @@
 # Rebuild and push the Flux SVDQuant Docker image
 #
 # This script patches the existing working base image (87362500968a) with
-# the updated server.py. Building nunchaku from source in Docker fails
+# the updated server.py and the shared ../common modules it imports
+# (server.py looks for them in ../common, i.e. /common next to /app/server.py).
+# Building nunchaku from source in Docker fails
 # because there's no GPU to detect SM targets, so we layer on top of
 # the pre-built base image instead.
 #
@@ -33,11 +35,13 @@ fi
 TEMP_DOCKERFILE=$(mktemp)
 cat > "$TEMP_DOCKERFILE" << EOF
 FROM $BASE_IMAGE
-COPY server.py /app/server.py
+COPY flux/server.py /app/server.py
+COPY common /common
 EOF
 
 echo "Building image..."
-docker build -f "$TEMP_DOCKERFILE" -t "$IMAGE_NAME:latest" "$SCRIPT_DIR"
+# Context is gpu/ so that common/ is included.
+docker build -f "$TEMP_DOCKERFILE" -t "$IMAGE_NAME:latest" "$SCRIPT_DIR/.."
 
 rm "$TEMP_DOCKERFILE"
 
@@ -17,9 +17,19 @@ import logging
 import asyncio
 import aiohttp
 import io
+import json
 import base64
 from contextlib import asynccontextmanager
 
+# Modules shared by all GPU servers live in ../common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from dimensions import DimensionPlanner
+from service_times import ServiceTimes
+from prompt_cache import PromptEmbeddingCache
+from result_cache import ResultCache
+from warmup import WARMUP_ENABLED, WARMUP_STEPS, BucketWarmup, fingerprint
+from worker_load import Drain, load_report
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,6 +43,8 @@ QUANT_MODEL_PATH = os.getenv("QUANT_MODEL_PATH", "mit-han-lab/svdq-int4-flux.1-s
 # default suits RTX 4090 (INT4); RTX 5090 instances set MAX_PIXELS=1048576 so
 # 1024x1024 requests are served at full resolution instead of downscaled.
 MAX_PIXELS = int(os.getenv("MAX_PIXELS", "810000"))
+# Multiples of 8 whose pixel count divides by 65536; nearest valid sizes are tabulated at startup.
+dimension_planner = DimensionPlanner(align=8, max_side=8192, max_gen_pixels=MAX_PIXELS, pixel_multiple=65536)
 
 class ImageRequest(BaseModel):
     prompts: List[str] = ["a photo of an astronaut riding a horse on mars"]
@@ -54,6 +66,8 @@ HEARTBEAT_ENABLED = os.getenv("HEARTBEAT_ENABLED", "true").lower() in {
     "yes",
 }
 pending_requests = 0
+service_times = ServiceTimes()
+drain = Drain()
 
 # Function to get public IP address
 def get_public_ip():
@@ -65,6 +79,8 @@ def get_public_ip():
 
 # Heartbeat function
 async def send_heartbeat():
+    if drain.draining:
+        return
     # Check for PUBLIC_IP environment variable first, otherwise auto-detect
     public_ip = os.getenv("PUBLIC_IP")
     if not public_ip:
@@ -83,7 +99,17 @@ async def send_heartbeat():
             token = os.getenv("PLN_GPU_TOKEN", "")
             headers = {"Authorization": f"Bearer {token}"} if token else {}
             async with aiohttp.ClientSession() as session:
-                async with session.post(register_url, json={'url': url, 'type': service_type}, headers=headers) as response:
+                in_flight = 1 if gpu_semaphore.locked() else 0
+                load = load_report(
+                    pending_requests - in_flight,
+                    in_flight,
+                    service_times,
+                    drain.draining,
+                    prompt_cache=prompt_cache.stats(),
+                    result_cache=result_cache.stats(),
+                )
+                payload = {'url': url, 'type': service_type, 'load': load}
+                async with session.post(register_url, json=payload, headers=headers) as response:
                     if response.status == 200:
                         logger.info(f"Heartbeat sent successfully. URL: {url}")
                     else:
@@ -104,6 +130,18 @@ async def periodic_heartbeat():
             logger.error(f"Error in periodic heartbeat: {str(e)}")
             await asyncio.sleep(5)  # Wait a bit before retrying
 
+def encode_prompt(prompt: str) -> dict:
+    with torch.inference_mode():
+        prompt_embeds, pooled_prompt_embeds, _ = pipe.encode_prompt(prompt=prompt, prompt_2=None, device=pipe.device)
+    return {"prompt_embeds": prompt_embeds, "pooled_prompt_embeds": pooled_prompt_embeds}
+
+prompt_cache = PromptEmbeddingCache(encode_prompt, MODEL_ID)
+result_cache = ResultCache(os.getenv("RESULT_CACHE_DIR", os.path.join(MODEL_CACHE, "results")))
+
+def warmup_generate(width: int, height: int):
+    with torch.inference_mode():
+        pipe(prompt="warmup", width=width, height=height, num_inference_steps=WARMUP_STEPS)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -121,6 +159,15 @@ async def lifespan(app: FastAPI):
             torch_dtype=torch.bfloat16
         ).to("cuda")
         print("FLUX pipeline loaded successfully")
+        # Tune every resolution bucket before the heartbeat advertises this worker. The
+        # Nunchaku transformer runs its own fused kernels, so it is not torch.compiled.
+        if WARMUP_ENABLED:
+            BucketWarmup(
+                os.path.join(MODEL_CACHE, "warmup.json"),
+                fingerprint(QUANT_MODEL_PATH, steps=WARMUP_STEPS),
+                skip_tuned=False,
+            ).run(dimension_planner.buckets, warmup_generate)
+        drain.install_signal_handler()
         
         if HEARTBEAT_ENABLED:
             # Send initial heartbeat and start periodic task
@@ -176,38 +223,7 @@ def find_nearest_valid_dimensions(width: float, height: float) -> tuple[int, int
     if width < MIN_DIMENSION or height < MIN_DIMENSION:
         raise ValueError(f"Dimensions too small: {width}x{height}. Minimum allowed is {MIN_DIMENSION}x{MIN_DIMENSION}")
     
-    start_w = round(width)
-    start_h = round(height)
-    
-    # Scale down proportionally if total pixels exceed limit
-    current_pixels = start_w * start_h
-    if current_pixels > MAX_PIXELS:
-        scale = (MAX_PIXELS / current_pixels) ** 0.5
-        start_w = round(start_w * scale)
-        start_h = round(start_h * scale)
-    
-    def is_valid(w: int, h: int) -> bool:
-        return w % 8 == 0 and h % 8 == 0 and (w * h) % 65536 == 0
-    
-    # Find nearest multiple of 8 for each dimension
-    nearest_w = round(start_w / 8) * 8
-    nearest_h = round(start_h / 8) * 8
-    
-    # Search in a spiral pattern from the nearest multiples of 8
-    offset = 0
-    while offset < 100:  # Limit search to reasonable range
-        for w in range(nearest_w - offset * 8, nearest_w + offset * 8 + 1, 8):
-            if w <= 0:
-                continue
-            for h in range(nearest_h - offset * 8, nearest_h + offset * 8 + 1, 8):
-                if h <= 0:
-                    continue
-                if is_valid(w, h):
-                    return w, h
-        offset += 1
-    
-    # If no valid dimensions found, return the nearest multiples of 8
-    return nearest_w, nearest_h
+    return dimension_planner.plan(round(width), round(height)).bucket
 
 app = FastAPI(title="FLUX Image Generation API", lifespan=lifespan)
 
@@ -232,11 +248,12 @@ async def generate(request: ImageRequest, _auth: bool = Depends(verify_backend_t
         raise HTTPException(status_code=503, detail="Model not loaded")
     if pending_requests >= QUEUE_LIMIT:
         raise HTTPException(status_code=503, detail="Queue full")
-    pending_requests += 1
-    try:
-        return await _generate(request)
-    finally:
-        pending_requests -= 1
+    with drain.request():
+        pending_requests += 1
+        try:
+            return await _generate(request)
+        finally:
+            pending_requests -= 1
 
 
 async def _generate(request: ImageRequest):
@@ -244,8 +261,6 @@ async def _generate(request: ImageRequest):
     seed = request.seed if request.seed is not None else int.from_bytes(os.urandom(2), "big")
     print(f"Using seed: {seed}")
 
-    generator = torch.Generator("cuda").manual_seed(seed)
-    
     # Find nearest valid dimensions (with input validation)
     try:
         width, height = find_nearest_valid_dimensions(request.width, request.height)
@@ -257,38 +272,21 @@ async def _generate(request: ImageRequest):
     print(f"Adjusted dimensions: {width}x{height}")
 
     try:
-        async with gpu_semaphore:
-            with torch.inference_mode():
-                output = pipe(
-                    prompt=request.prompts[0],
-                    generator=generator,
-                    width=width,
-                    height=height,
-                    num_inference_steps=request.steps,
-                )
-
-            # Check for NSFW content
-            image = output.images[0]
-            concepts, has_nsfw = check_safety([image], request.safety_checker_adj)
-
-            # Convert image to base64
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='JPEG', quality=95)
-            img_base64 = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
-
-        response_content = [{
-            "image": img_base64,
-            "has_nsfw_concept": has_nsfw[0],
-            "concept": concepts[0],
-            "width": width,
-            "height": height,
-            "seed": seed,
-            "prompt": request.prompts[0]
-        }]
-        
-        if HEARTBEAT_ENABLED:
-            await send_heartbeat()
-        return JSONResponse(content=response_content)
+        if request.seed is None:
+            result = await _render(request, seed, width, height)
+        else:
+            # A seeded request always produces the same image, so repeats are served from disk.
+            key = result_cache.key(
+                model=QUANT_MODEL_PATH,
+                prompt=request.prompts[0],
+                seed=seed,
+                width=width,
+                height=height,
+                steps=request.steps,
+                safety_checker_adj=request.safety_checker_adj,
+            )
+            result = await result_cache.aget_or_create(key, lambda: _render(request, seed, width, height))
+        return JSONResponse(content=[{**json.loads(result), "seed": seed, "prompt": request.prompts[0]}])
     
     except torch.cuda.OutOfMemoryError as e:
         logger.error(f"CUDA OOM Error: {str(e)} - Exiting to trigger systemd restart")
@@ -302,6 +300,43 @@ async def _generate(request: ImageRequest):
         logger.error(f"Unexpected error during generation: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
+async def _render(request: ImageRequest, seed: int, width: int, height: int) -> bytes:
+    """Run the pipeline; returns the seed-independent part of the response item as JSON."""
+    generator = torch.Generator("cuda").manual_seed(seed)
+    async with gpu_semaphore:
+        started = time.monotonic()
+        with torch.inference_mode():
+            output = pipe(
+                **prompt_cache.get(request.prompts[0]),
+                generator=generator,
+                width=width,
+                height=height,
+                num_inference_steps=request.steps,
+            )
+        service_times.record((width, height), time.monotonic() - started)
+
+        # Check for NSFW content
+        image = output.images[0]
+        concepts, has_nsfw = check_safety([image], request.safety_checker_adj)
+
+        # Convert image to base64
+        img_byte_arr = io.BytesIO()
+        image.save(img_byte_arr, format='JPEG', quality=95)
+        img_base64 = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
+
+    return json.dumps({
+        "image": img_base64,
+        "has_nsfw_concept": has_nsfw[0],
+        "concept": concepts[0],
+        "width": width,
+        "height": height,
+    }).encode()
+
+@app.post("/drain")
+async def start_drain(_auth: bool = Depends(verify_backend_token)):
+    drain.start("POST /drain")
+    return {"status": "draining", "in_flight": drain.busy()}
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "8765"))
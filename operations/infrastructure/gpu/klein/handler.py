@@ -8,9 +8,11 @@ Run:
     python handler.py
 """
 
+import asyncio
 import base64
 import logging
 import os
+import sys
 import time
 from io import BytesIO
 
@@ -24,11 +26,22 @@ from fastapi import Depends, FastAPI, Header, HTTPException
 from PIL import Image, UnidentifiedImageError
 from pydantic import BaseModel, Field, model_validator
 
+# Modules shared by all GPU servers live in ../common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from generation_queue import GenerationQueue
+from inference_executor import InferenceExecutor
+from prompt_cache import PromptEmbeddingCache
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("klein")
 
 MODEL_ID = "black-forest-labs/FLUX.2-klein-4B"
 MAX_PIXELS = 1536 * 1536
+# One generation runs while QUEUE_LIMIT - 1 wait; further requests get 503 so gen can
+# retry elsewhere instead of queueing without bound on one GPU.
+QUEUE_LIMIT = int(os.getenv("QUEUE_LIMIT", "3"))
+QUEUE_DEADLINE_SECONDS = float(os.getenv("QUEUE_DEADLINE_SECONDS", "30"))
+MAX_REFERENCE_IMAGES = 10
 BACKEND_TOKEN = os.getenv("PLN_GPU_TOKEN")
 if not BACKEND_TOKEN:
     logger.critical("PLN_GPU_TOKEN not configured - refusing to start")
@@ -50,6 +63,22 @@ pipe = Flux2KleinPipeline.from_pretrained(
 ).to("cuda")
 logger.info("Model loaded and ready!")
 
+
+def encode_prompt(prompt: str) -> dict:
+    with torch.inference_mode():
+        prompt_embeds, _ = pipe.encode_prompt(prompt=prompt, device=pipe.device)
+    return {"prompt_embeds": prompt_embeds}
+
+
+prompt_cache = PromptEmbeddingCache(encode_prompt, MODEL_ID)
+# The pipeline runs on this executor's threads, so a generation never blocks the event loop.
+generation_queue = GenerationQueue(
+    QUEUE_LIMIT,
+    deadline_seconds=QUEUE_DEADLINE_SECONDS,
+    default_service_seconds=3.0,  # 1024x1024 at 4 steps
+)
+inference_executor = InferenceExecutor(generation_queue)
+
 app = FastAPI()
 
 
@@ -88,51 +117,54 @@ class ImageRequest(BaseModel):
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "model": MODEL_ID}
+    return {
+        "status": "ok",
+        "model": MODEL_ID,
+        "queue_depth": generation_queue.depth,
+        "in_flight": generation_queue.in_flight,
+        "prompt_cache": prompt_cache.stats(),
+    }
+
+
+def decode_reference_image(img_b64: str) -> Image.Image:
+    if img_b64.startswith("data:"):
+        img_b64 = img_b64.split(",", 1)[1]
+    # Bad reference image input is a client error (400), not a 500.
+    try:
+        img_bytes = base64.b64decode(img_b64)
+        return Image.open(BytesIO(img_bytes)).convert("RGB")
+    except (UnidentifiedImageError, base64.binascii.Error, ValueError) as e:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid reference image: {e}"
+        ) from e
 
 
-@app.post("/generate")
-async def generate(request: ImageRequest, _=Depends(verify_backend_token)):
-    prompt = request.prompts[0] if request.prompts else ""
+def encode_png(image: Image.Image) -> str:
+    buf = BytesIO()
+    image.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
 
-    generator = None
-    seed = request.seed
-    if seed is None:
-        seed = int(torch.randint(0, 2**32, (1,)).item())
-    generator = torch.Generator(device="cuda").manual_seed(seed)
 
-    # Decode reference images if provided
-    reference_images = None
-    if request.images:
-        reference_images = []
-        for img_b64 in request.images[:10]:
-            if img_b64.startswith("data:"):
-                img_b64 = img_b64.split(",", 1)[1]
-            # Bad reference image input is a client error (400), not a 500.
-            try:
-                img_bytes = base64.b64decode(img_b64)
-                img = Image.open(BytesIO(img_bytes)).convert("RGB")
-            except (UnidentifiedImageError, base64.binascii.Error, ValueError) as e:
-                raise HTTPException(
-                    status_code=400, detail=f"Invalid reference image: {e}"
-                ) from e
-            reference_images.append(img)
-        if len(reference_images) == 1:
-            reference_images = reference_images[0]
-
-    reference_count = min(len(request.images), 10)
+def run_pipeline(
+    request: ImageRequest,
+    prompt: str,
+    seed: int,
+    reference_images,
+    reference_count: int,
+) -> Image.Image:
+    """Runs on an inference executor thread, inside a generation queue slot."""
     logger.info(
         "Generation started size=%dx%d reference_images=%d",
         request.width,
         request.height,
         reference_count,
     )
-
+    generator = torch.Generator(device="cuda").manual_seed(seed)
     t0 = time.time()
     try:
         image = pipe(
             image=reference_images,
-            prompt=prompt,
+            **prompt_cache.get(prompt),
             height=request.height,
             width=request.width,
             guidance_scale=request.guidance_scale,
@@ -154,10 +186,51 @@ async def generate(request: ImageRequest, _=Depends(verify_backend_token)):
         ) from error
     elapsed = time.time() - t0
     logger.info(f"Generation took {elapsed:.2f}s ({request.width}x{request.height})")
+    return image
 
-    buf = BytesIO()
-    image.save(buf, format="PNG")
-    img_base64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+
+@app.post("/generate")
+async def generate(request: ImageRequest, _=Depends(verify_backend_token)):
+    prompt = request.prompts[0] if request.prompts else ""
+
+    seed = request.seed
+    if seed is None:
+        seed = int(torch.randint(0, 2**32, (1,)).item())
+
+    # Refuse a full queue before decoding up to MAX_REFERENCE_IMAGES images for nothing
+    if not inference_executor.try_admit():
+        raise HTTPException(status_code=503, detail="Queue full")
+
+    # Decode reference images concurrently, off the event loop
+    reference_images = None
+    try:
+        if request.images:
+            reference_images = list(
+                await asyncio.gather(
+                    *(
+                        asyncio.to_thread(decode_reference_image, img_b64)
+                        for img_b64 in request.images[:MAX_REFERENCE_IMAGES]
+                    )
+                )
+            )
+            if len(reference_images) == 1:
+                reference_images = reference_images[0]
+    except BaseException:
+        inference_executor.release_admission()
+        raise
+
+    reference_count = min(len(request.images), MAX_REFERENCE_IMAGES)
+    image = await inference_executor.run(
+        run_pipeline,
+        request,
+        prompt,
+        seed,
+        reference_images,
+        reference_count,
+        bucket=(request.width, request.height),
+        admitted=True,
+    )
+    img_base64 = await asyncio.to_thread(encode_png, image)
 
     return [
         {
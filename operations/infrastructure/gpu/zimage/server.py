@@ -2,6 +2,8 @@ import os
 import sys
 import io
 import base64
+import json
+import threading
 import logging
 import asyncio
 import torch
@@ -15,13 +17,21 @@ import time
 from fastapi import FastAPI, HTTPException, Header, Depends
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, field_validator, ValidationInfo
-import threading
+from typing import Literal
 import warnings
 from contextlib import asynccontextmanager
-import math
-from utility import StableDiffusionSafetyChecker, replace_numpy_with_python, replace_sets_with_lists, numpy_to_pil
+from utility import StableDiffusionSafetyChecker, clip_pixel_values, replace_numpy_with_python
 from transformers import AutoFeatureExtractor
-from generation_queue import GenerationQueue
+
+# Modules shared by all GPU servers live in ../common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from dimensions import DimensionPlanner, Plan
+from generation_queue import GenerationQueue, PRIORITIES
+from prompt_cache import PromptEmbeddingCache
+from result_cache import ResultCache
+from tiled_upscale import tiled_upscale
+from warmup import WARMUP_ENABLED, WARMUP_STEPS, BucketWarmup, compile_module, fingerprint
+from worker_load import Drain, load_report
 
 os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
 os.environ["TQDM_DISABLE"] = "1"
@@ -46,6 +56,8 @@ def get_public_ip():
 
 
 async def send_heartbeat():
+    if drain.draining:
+        return
     public_ip = os.getenv("PUBLIC_IP")
     if not public_ip:
         public_ip = await asyncio.get_event_loop().run_in_executor(None, get_public_ip)
@@ -60,7 +72,18 @@ async def send_heartbeat():
             async with aiohttp.ClientSession() as session:
                 async with session.post(
                     register_url,
-                    json={'url': url, 'type': service_type},
+                    json={
+                        'url': url,
+                        'type': service_type,
+                        'load': load_report(
+                            generation_queue.depth,
+                            generation_queue.in_flight,
+                            generation_queue.service_times,
+                            drain.draining,
+                            prompt_cache=prompt_cache.stats(),
+                            result_cache=result_cache.stats(),
+                        ),
+                    },
                     headers=headers,
                 ) as response:
                     if response.status == 200:
@@ -94,11 +117,31 @@ SAFETY_NSFW_MODEL = "CompVis/stable-diffusion-safety-checker"
 UPSCALE_FACTOR = 2
 MAX_GEN_PIXELS = 768 * 768  # Generate natively up to this size
 MAX_FINAL_PIXELS = 768 * 768 * 4  # Max output size with 2x upscaling
+# Generation sizes are 16px-aligned, at least 256px a side, and 2x SPAN-upscaled above MAX_GEN_PIXELS.
+dimension_planner = DimensionPlanner(
+    align=16,
+    min_side=256,
+    max_gen_pixels=MAX_GEN_PIXELS,
+    max_final_pixels=MAX_FINAL_PIXELS,
+    upscale_factor=UPSCALE_FACTOR,
+)
+UPSCALE_BUCKETS = {plan.bucket for plan in dimension_planner.table.values() if plan.upscale}
 ENABLE_SPAN_UPSCALER = True
+# SPAN sees at most SPAN_TILE x SPAN_TILE input pixels at once, which bounds its VRAM.
+SPAN_TILE = int(os.getenv("SPAN_TILE", "512"))
+SPAN_TILE_OVERLAP = int(os.getenv("SPAN_TILE_OVERLAP", "32"))
 QUEUE_LIMIT = int(os.getenv("QUEUE_LIMIT", "3"))
-
-generate_lock = threading.Lock()
-generation_queue = GenerationQueue(QUEUE_LIMIT)
+# How long a request may wait for the GPU unless it sends its own deadline. Requests
+# whose estimated wait already exceeds it get an immediate 503 instead of queueing.
+QUEUE_DEADLINE_SECONDS = float(os.getenv("QUEUE_DEADLINE_SECONDS", "30"))
+
+# One generation on the GPU at a time; the rest wait in priority order.
+generation_queue = GenerationQueue(
+    QUEUE_LIMIT,
+    deadline_seconds=QUEUE_DEADLINE_SECONDS,
+    default_service_seconds=3.5,  # 1024x1024, see README
+)
+drain = Drain()
 
 
 class ImageRequest(BaseModel):
@@ -106,6 +149,8 @@ class ImageRequest(BaseModel):
     width: int = Field(default=1024, ge=256, le=4096)
     height: int = Field(default=1024, ge=256, le=4096)
     seed: int | None = None
+    priority: Literal["interactive", "batch"] = "interactive"
+    deadline_seconds: float | None = Field(default=None, gt=0)
     
     @field_validator('height')
     @classmethod
@@ -127,87 +172,70 @@ def calc_time(start, end, msg):
     print(f"{msg} time: {elapsed:.2f} seconds")
 
 
-def calculate_generation_dimensions(requested_width: int, requested_height: int) -> tuple[int, int, int, int, bool]:
-    """Calculate generation dimensions with SPAN 2x upscaling support.
-    
-    Returns: (gen_w, gen_h, final_w, final_h, should_upscale)
-    """
-    # Cap final size to MAX_FINAL_PIXELS, preserving aspect ratio
-    final_w, final_h = requested_width, requested_height
-    total_pixels = final_w * final_h
-    
-    if total_pixels > MAX_FINAL_PIXELS:
-        scale = math.sqrt(MAX_FINAL_PIXELS / total_pixels)
-        final_w = round(final_w * scale)
-        final_h = round(final_h * scale)
-    
-    # Determine if upscaling needed
-    final_pixels = final_w * final_h
-    should_upscale = final_pixels > MAX_GEN_PIXELS
-    
-    # Calculate generation dimensions
-    if should_upscale:
-        gen_w = final_w // UPSCALE_FACTOR
-        gen_h = final_h // UPSCALE_FACTOR
-    else:
-        gen_w, gen_h = final_w, final_h
-    
-    # Align to 16px multiples (model requirement)
-    gen_w = round(gen_w / 16) * 16
-    gen_h = round(gen_h / 16) * 16
-    
-    # Enforce minimum generation size
-    gen_w = max(gen_w, 256)
-    gen_h = max(gen_h, 256)
-    
-    # Calculate actual final dimensions
-    if should_upscale:
-        final_w = gen_w * UPSCALE_FACTOR
-        final_h = gen_h * UPSCALE_FACTOR
-    else:
-        final_w, final_h = gen_w, gen_h
-    
-    return gen_w, gen_h, final_w, final_h, should_upscale
-
-
 # Global model instances (initialized in lifespan)
 pipe = None
 upscaler = None  # SPAN 2x upscaler
+upscale_stream = None  # CUDA stream for the upscale stage (initialized in lifespan)
+upscale_lock = threading.Lock()
 heartbeat_task = None
 BACKEND_TOKEN = os.getenv("PLN_GPU_TOKEN")
 SAFETY_EXTRACTOR = None
 SAFETY_MODEL = None
 
 
+def _span_tile(tile_np: np.ndarray) -> np.ndarray:
+    # HWC uint8 -> NCHW float [0,1] on the GPU, and back to HWC float on the host
+    tensor = torch.from_numpy(np.ascontiguousarray(tile_np)).cuda(non_blocking=True).permute(2, 0, 1).unsqueeze(0).float() / 255.0
+    if _truthy_env(os.getenv("SPAN_DISABLE_CUDNN")):
+        # The SPAN convolution path segfaults with cuDNN on the tested Vast
+        # RTX 5090 stack. Keep the workaround scoped to SPAN so diffusion
+        # and VAE inference still use accelerated cuDNN kernels.
+        with torch.backends.cudnn.flags(enabled=False):
+            output = upscaler(tensor)
+    else:
+        output = upscaler(tensor)
+    return output.squeeze(0).permute(1, 2, 0).cpu().numpy()
+
+
 def upscale_with_span(image_np: np.ndarray) -> np.ndarray:
-    """Upscale image using SPAN 2x model."""
+    """Upscale image using SPAN 2x model, SPAN_TILE pixels at a time.
+
+    Runs on its own CUDA stream and outside the generation slot, so it overlaps the
+    next request's denoising; upscale_lock keeps one upscale (one tile) on the GPU.
+    """
     if upscaler is None:
         raise RuntimeError("Upscaler not loaded")
-    
-    # Convert to tensor: HWC uint8 -> CHW float [0,1] -> NCHW
-    img_float = image_np.astype(np.float32) / 255.0
-    tensor = torch.from_numpy(img_float).permute(2, 0, 1).unsqueeze(0).cuda()
-    
-    with torch.no_grad():
-        if _truthy_env(os.getenv("SPAN_DISABLE_CUDNN")):
-            # The SPAN convolution path segfaults with cuDNN on the tested Vast
-            # RTX 5090 stack. Keep the workaround scoped to SPAN so diffusion
-            # and VAE inference still use accelerated cuDNN kernels.
-            with torch.backends.cudnn.flags(enabled=False):
-                output = upscaler(tensor)
-        else:
-            output = upscaler(tensor)
-    
-    # Convert back: NCHW -> CHW -> HWC uint8
-    result = output.squeeze(0).permute(1, 2, 0).cpu().numpy()
-    result = np.clip(result * 255, 0, 255).astype(np.uint8)
-    return result
+    with upscale_lock, torch.no_grad(), torch.cuda.stream(upscale_stream):
+        return tiled_upscale(image_np, _span_tile, UPSCALE_FACTOR, tile=SPAN_TILE, overlap=SPAN_TILE_OVERLAP)
+
+
+def encode_prompt(prompt: str) -> dict:
+    with torch.inference_mode():
+        prompt_embeds, _ = pipe.encode_prompt(prompt=prompt, device=pipe.device, do_classifier_free_guidance=False)
+    return {"prompt_embeds": prompt_embeds}
+
+
+prompt_cache = PromptEmbeddingCache(encode_prompt, MODEL_ID)
+result_cache = ResultCache(os.getenv("RESULT_CACHE_DIR", os.path.join(MODEL_CACHE, "results")))
+
+
+def warmup_generate(width: int, height: int):
+    with torch.inference_mode():
+        image = pipe(
+            prompt="warmup",
+            width=width,
+            height=height,
+            num_inference_steps=WARMUP_STEPS,
+            guidance_scale=0.0,
+        ).images[0]
+    if ENABLE_SPAN_UPSCALER and (width, height) in UPSCALE_BUCKETS:
+        upscale_with_span(np.array(image))
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown of the application."""
-    global pipe, upscaler, heartbeat_task, SAFETY_EXTRACTOR, SAFETY_MODEL
+    global pipe, upscaler, upscale_stream, heartbeat_task, SAFETY_EXTRACTOR, SAFETY_MODEL
     
     logger.info("Starting up...")
     if not BACKEND_TOKEN:
@@ -223,6 +251,7 @@ async def lifespan(app: FastAPI):
             cache_dir=MODEL_CACHE,
             low_cpu_mem_usage=False,  # Faster loading
         ).to("cuda")
+        pipe.transformer = compile_module(pipe.transformer)
         
         # Load SPAN 2x upscaler using Spandrel (if enabled)
         if ENABLE_SPAN_UPSCALER:
@@ -230,6 +259,7 @@ async def lifespan(app: FastAPI):
             upscaler = ModelLoader().load_from_file(SPAN_MODEL_PATH)
             assert isinstance(upscaler, ImageModelDescriptor), f"Expected ImageModelDescriptor, got {type(upscaler)}"
             upscaler.cuda().eval()
+            upscale_stream = torch.cuda.Stream()
             logger.info(f"SPAN upscaler loaded: scale={upscaler.scale}x")
         else:
             logger.info("SPAN upscaler disabled")
@@ -256,6 +286,15 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to load models: {e}")
         raise
     
+    # Tune every resolution bucket before the heartbeat advertises this worker.
+    if WARMUP_ENABLED:
+        BucketWarmup(
+            os.path.join(MODEL_CACHE, "warmup.json"),
+            fingerprint(MODEL_ID, steps=WARMUP_STEPS, upscaler=ENABLE_SPAN_UPSCALER),
+        ).run(dimension_planner.buckets, warmup_generate)
+
+    drain.install_signal_handler()
+
     # Fresh Vast workers stay out of production until direct verification and
     # load testing pass. Existing deployments keep heartbeats enabled by
     # default because they do not set HEARTBEAT_ENABLED.
@@ -308,108 +347,122 @@ def verify_backend_token(
     return True
 
 
-def check_nsfw(image_array, safety_checker_adj: float = 0.0):
-    if not is_safety_checker_enabled():
-        return False, {}
-    if isinstance(image_array, np.ndarray):
-        if image_array.max() <= 1.0:
-            image_array = (image_array * 255).astype("uint8")
-        else:
-            image_array = image_array.astype("uint8")
-        x_image = Image.fromarray(image_array)
-        x_image = [x_image]
-    elif isinstance(image_array, list) and not isinstance(image_array[0], Image.Image):
-        x_image = numpy_to_pil(image_array)
-    else:
-        x_image = image_array if isinstance(image_array, list) else [image_array]
-    if SAFETY_EXTRACTOR is None or SAFETY_MODEL is None:
-        return False, {}
-    safety_checker_input = SAFETY_EXTRACTOR(x_image, return_tensors="pt").to("cuda")
-    has_nsfw_concept, concepts = SAFETY_MODEL(
-        images=x_image,
-        clip_input=safety_checker_input.pixel_values
-    )
-    has_nsfw_bool = bool(has_nsfw_concept[0])
-    return (
-        has_nsfw_bool,
-        replace_numpy_with_python(replace_sets_with_lists(concepts[0] if isinstance(concepts, list) else concepts))
+def check_nsfw_batch(images: list[np.ndarray], safety_checker_adj: float = 0.0) -> tuple[list[bool], list[dict]]:
+    """Safety-check same-sized HWC images (uint8, or floats in 0..1) in one CLIP pass."""
+    if not is_safety_checker_enabled() or SAFETY_EXTRACTOR is None or SAFETY_MODEL is None:
+        return [False] * len(images), [{} for _ in images]
+    images = [(image * 255).astype("uint8") if image.max() <= 1.0 else image.astype("uint8") for image in images]
+    has_nsfw_concepts, concepts = SAFETY_MODEL(
+        clip_input=clip_pixel_values(images, SAFETY_EXTRACTOR),
+        safety_checker_adj=safety_checker_adj,
     )
+    return has_nsfw_concepts, [replace_numpy_with_python(concept) for concept in concepts]
 
 
-def reserve_generation_slot():
-    with generation_queue.slot():
-        yield
+def check_nsfw(image_array: np.ndarray, safety_checker_adj: float = 0.0):
+    has_nsfw_concepts, concepts = check_nsfw_batch([image_array], safety_checker_adj)
+    return has_nsfw_concepts[0], concepts[0]
 
 
 @app.post("/generate")
 def generate(
     request: ImageRequest,
     _auth: bool = Depends(verify_backend_token),
-    _slot: None = Depends(reserve_generation_slot),
 ):
     logger.info(f"Request: {request}")
     if pipe is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
+    with drain.request():
+        return _generate(request)
+
+
+def _generate(request: ImageRequest):
     seed = request.seed if request.seed is not None else int.from_bytes(os.urandom(8), "big")
     logger.info(f"Using seed: {seed}")
-    generator = torch.Generator("cuda").manual_seed(seed)
-    gen_w, gen_h, final_w, final_h, should_upscale = calculate_generation_dimensions(request.width, request.height)
-    logger.info(f"Requested: {request.width}x{request.height} -> Generation: {gen_w}x{gen_h} -> Final: {final_w}x{final_h} (upscale: {should_upscale})")
-    
+    plan = dimension_planner.plan(request.width, request.height)
+    logger.info(f"Requested: {request.width}x{request.height} -> Generation: {plan.gen_w}x{plan.gen_h} -> Final: {plan.final_w}x{plan.final_h} (upscale: {plan.upscale})")
+
     try:
-        # Lock entire pipeline: generation + upscaling (to prevent concurrent GPU ops)
-        with generate_lock:
-            with torch.inference_mode():
-                output = pipe(
-                    prompt=request.prompts[0],
-                    generator=generator,
-                    width=gen_w,
-                    height=gen_h,
-                    num_inference_steps=9,  # Always use 9 steps for best quality
-                    guidance_scale=0.0,
-                )
-            image = output.images[0]
-            image_np = np.array(image)
-            
-            # Check for NSFW content
-            has_nsfw, concepts = check_nsfw(image_np, safety_checker_adj=0.0)
-            if has_nsfw:
-                logger.warning(f"NSFW detected - bad_concepts: {concepts.get('bad_concepts', [])}, concept_scores: {concepts.get('concept_scores', {})}")
-                raise HTTPException(status_code=400, detail="NSFW content detected")
-            
-            # Upscale with SPAN if needed and enabled
-            if should_upscale and ENABLE_SPAN_UPSCALER:
-                logger.info(f"Upscaling {gen_w}x{gen_h} -> {gen_w*UPSCALE_FACTOR}x{gen_h*UPSCALE_FACTOR} with SPAN")
-                result = upscale_with_span(image_np)
-            else:
-                result = image_np
-            
-            upscaled_image = Image.fromarray(result)
-        
-        # Encode image (outside lock for faster response)
-        img_byte_arr = io.BytesIO()
-        upscaled_image.save(img_byte_arr, format='JPEG', quality=95)
-        img_base64 = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
-        response_content = [{
-            "image": img_base64,
-            "has_nsfw_concept": False,
-            "concept": [],
-            "width": upscaled_image.width,
-            "height": upscaled_image.height,
-            "seed": seed,
-            "prompt": request.prompts[0]
-        }]
-        return JSONResponse(content=response_content)
+        if request.seed is None:
+            result = _render(request, seed, plan)
+        else:
+            # A seeded request always produces the same image, so repeats are served from disk.
+            key = result_cache.key(
+                model=MODEL_ID,
+                prompt=request.prompts[0],
+                seed=seed,
+                width=plan.final_w,
+                height=plan.final_h,
+                steps=9,
+                upscaler=ENABLE_SPAN_UPSCALER,
+            )
+            result = result_cache.get_or_create(key, lambda: _render(request, seed, plan))
+        return JSONResponse(content=[{**json.loads(result), "seed": seed, "prompt": request.prompts[0]}])
     except torch.cuda.OutOfMemoryError as e:
         logger.error(f"CUDA OOM Error: {e} - Exiting to trigger restart")
         sys.exit(1)
 
 
+def _render(request: ImageRequest, seed: int, plan: Plan) -> bytes:
+    """Run the pipeline; returns the seed-independent part of the response item as JSON."""
+    generator = torch.Generator("cuda").manual_seed(seed)
+    gen_w, gen_h, should_upscale = plan.gen_w, plan.gen_h, plan.upscale
+    # The slot covers denoising and the safety check; upscaling runs after it is released
+    with generation_queue.slot(
+        priority=PRIORITIES[request.priority],
+        deadline_seconds=request.deadline_seconds,
+        bucket=plan.bucket,
+    ):
+        with torch.inference_mode():
+            output = pipe(
+                **prompt_cache.get(request.prompts[0]),
+                generator=generator,
+                width=gen_w,
+                height=gen_h,
+                num_inference_steps=9,  # Always use 9 steps for best quality
+                guidance_scale=0.0,
+            )
+        image = output.images[0]
+        image_np = np.array(image)
+        
+        # Check for NSFW content
+        has_nsfw, concepts = check_nsfw(image_np, safety_checker_adj=0.0)
+        if has_nsfw:
+            logger.warning(f"NSFW detected - bad_concepts: {concepts.get('bad_concepts', [])}, concept_scores: {concepts.get('concept_scores', {})}")
+            raise HTTPException(status_code=400, detail="NSFW content detected")
+
+    # Upscale with SPAN if needed and enabled; a separate stage, so the next request can start denoising
+    if should_upscale and ENABLE_SPAN_UPSCALER:
+        logger.info(f"Upscaling {gen_w}x{gen_h} -> {gen_w*UPSCALE_FACTOR}x{gen_h*UPSCALE_FACTOR} with SPAN")
+        result = upscale_with_span(image_np)
+    else:
+        result = image_np
+    upscaled_image = Image.fromarray(result)
+
+    # Encode image (outside the slot for faster response)
+    img_byte_arr = io.BytesIO()
+    upscaled_image.save(img_byte_arr, format='JPEG', quality=95)
+    img_base64 = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
+    return json.dumps({
+        "image": img_base64,
+        "has_nsfw_concept": False,
+        "concept": [],
+        "width": upscaled_image.width,
+        "height": upscaled_image.height,
+    }).encode()
+
+
+@app.post("/drain")
+async def start_drain(_auth: bool = Depends(verify_backend_token)):
+    drain.start("POST /drain")
+    return {"status": "draining", "in_flight": drain.busy()}
+
+
 @app.get("/health")
 async def health():
     if pipe is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
-    return {"status": "healthy", "model": MODEL_ID}
+    return {"status": "healthy", "model": MODEL_ID, "draining": drain.draining}
 
 
 if __name__ == "__main__":
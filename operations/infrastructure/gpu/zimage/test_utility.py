@@ -0,0 +1,116 @@
+import unittest
+
+import numpy as np
+from PIL import Image
+from transformers import CLIPImageProcessor
+
+from utility import (
+    CONCEPT_ADJUSTMENTS,
+    clip_pixel_values,
+    concept_adjustment_vector,
+    concept_report,
+    score_concepts,
+)
+
+NUM_SPECIAL, NUM_CONCEPTS = 3, 17
+
+
+def per_concept_loop(special_cos, cos, special_thresholds, concept_thresholds, safety_checker_adj):
+    """The per-image, per-concept loop StableDiffusionSafetyChecker.forward used before score_concepts."""
+    result = []
+    for i in range(cos.shape[0]):
+        result_img = {"special_scores": {}, "special_care": [], "concept_scores": {}, "bad_concepts": []}
+        adjustment = safety_checker_adj
+        for concept_idx in range(special_cos.shape[1]):
+            score = round(special_cos[i][concept_idx] - special_thresholds[concept_idx].item() + adjustment, 3)
+            result_img["special_scores"][concept_idx] = score
+            if score > 0:
+                result_img["special_care"].append([concept_idx, score])
+                adjustment = 0.01
+        for concept_idx in range(cos.shape[1]):
+            per_concept_adj = CONCEPT_ADJUSTMENTS.get(concept_idx, 0)
+            score = round(
+                cos[i][concept_idx] - concept_thresholds[concept_idx].item() + adjustment + per_concept_adj, 3
+            )
+            result_img["concept_scores"][concept_idx] = score
+            if score > 0:
+                result_img["bad_concepts"].append(concept_idx)
+        result.append(result_img)
+    return result
+
+
+class ScoreConceptsTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        rows = 4000
+        self.special_thresholds = rng.uniform(0.15, 0.25, NUM_SPECIAL).astype(np.float32)
+        self.concept_thresholds = rng.uniform(0.15, 0.25, NUM_CONCEPTS).astype(np.float32)
+        # Distances spread around the thresholds so every rule (special care, adjustments) fires.
+        self.special_cos = (self.special_thresholds + rng.normal(-0.02, 0.015, (rows, NUM_SPECIAL))).astype(np.float32)
+        self.cos = (self.concept_thresholds + rng.normal(-0.02, 0.012, (rows, NUM_CONCEPTS))).astype(np.float32)
+
+    def check(self, safety_checker_adj):
+        expected = per_concept_loop(
+            self.special_cos, self.cos, self.special_thresholds, self.concept_thresholds, safety_checker_adj
+        )
+        folded = self.concept_thresholds - concept_adjustment_vector(NUM_CONCEPTS)
+        flagged, scores = score_concepts(
+            self.special_cos, self.cos, self.special_thresholds, folded, safety_checker_adj
+        )
+
+        self.assertEqual(flagged.any(axis=1).tolist(), [bool(e["bad_concepts"]) for e in expected])
+        self.assertTrue(any(e["special_care"] for e in expected))
+        for i, old in enumerate(expected):
+            self.assertEqual(np.flatnonzero(flagged[i]).tolist(), old["bad_concepts"], f"row {i}")
+            if not old["bad_concepts"]:
+                continue
+            report = concept_report(self.special_cos[i], scores[i], self.special_thresholds, safety_checker_adj)
+            self.assertEqual(report["bad_concepts"], old["bad_concepts"])
+            self.assertEqual([idx for idx, _ in report["special_care"]], [idx for idx, _ in old["special_care"]])
+            for key in ("special_scores", "concept_scores"):
+                np.testing.assert_allclose(
+                    list(report[key].values()), list(old[key].values()), atol=1.001e-3, err_msg=f"row {i} {key}"
+                )
+
+    def test_matches_the_per_concept_loop(self):
+        for safety_checker_adj in (0, 0.005, 0.01, 0.03, -0.02):
+            with self.subTest(safety_checker_adj=safety_checker_adj):
+                self.check(safety_checker_adj)
+
+    def test_special_care_makes_regular_concepts_stricter(self):
+        special_cos = np.array([[0.30, 0.0, 0.0], [0.0, 0.0, 0.0]], dtype=np.float32)
+        cos = np.full((2, NUM_CONCEPTS), 0.195, dtype=np.float32)
+        thresholds = np.full(NUM_SPECIAL, 0.2, dtype=np.float32)
+        flagged, _ = score_concepts(special_cos, cos, thresholds, np.full(NUM_CONCEPTS, 0.2, dtype=np.float32))
+
+        # Only the image that hit a special-care concept crosses the 0.005 gap.
+        self.assertEqual(flagged.any(axis=1).tolist(), [True, False])
+
+
+class ClipPixelValuesTest(unittest.TestCase):
+    extractor = CLIPImageProcessor()
+
+    def image(self, height, width):
+        rng = np.random.default_rng(height * width)
+        y, x = np.mgrid[0:height, 0:width]
+        smooth = np.stack([x / width, y / height, (x + y) / (width + height)], axis=-1) * 255
+        return np.clip(smooth + rng.normal(0, 8, smooth.shape), 0, 255).astype(np.uint8)
+
+    def test_matches_the_feature_extractor(self):
+        # 1000x333 has a fractional long side: 224 * 1000 / 333 = 672.7 is truncated to 672.
+        for height, width in ((1024, 768), (768, 1024), (333, 1000), (1000, 333), (512, 512), (224, 240)):
+            with self.subTest(size=(height, width)):
+                images = [self.image(height, width), 255 - self.image(height, width)]
+                expected = self.extractor([Image.fromarray(i) for i in images], return_tensors="pt").pixel_values
+
+                actual = clip_pixel_values(images, self.extractor, device="cpu")
+
+                self.assertEqual(actual.shape, expected.shape)
+                diff = (actual - expected).abs()
+                # One 8-bit level is ~0.015 after normalization.
+                self.assertLess(diff.mean().item(), 0.01)
+                self.assertLess(diff.max().item(), 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
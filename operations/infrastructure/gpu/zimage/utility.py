@@ -28,48 +28,89 @@ CONCEPT_ADJUSTMENTS = {
 }
 
 
+def concept_adjustment_vector(num_concepts: int) -> np.ndarray:
+    adjustments = np.zeros(num_concepts, dtype=np.float32)
+    for concept_idx, adj in CONCEPT_ADJUSTMENTS.items():
+        adjustments[concept_idx] = adj
+    return adjustments
+
+
+def score_concepts(special_cos, cos, special_thresholds, concept_thresholds, safety_checker_adj: float = 0):
+    """Flag a batch from its cosine distances (rows = images) in one vectorized pass.
+
+    `concept_thresholds` already has CONCEPT_ADJUSTMENTS folded in. An image that hits
+    a special-care concept is judged 0.01 stricter on the regular concepts, as before.
+    """
+    special = np.round(special_cos - special_thresholds + safety_checker_adj, 3) > 0
+    adjustment = np.where(special.any(axis=1), 0.01, safety_checker_adj)[:, None]
+    scores = np.round(cos - concept_thresholds + adjustment, 3)
+    return scores > 0, scores
+
+
+def concept_report(special_cos, cos_scores, special_thresholds, safety_checker_adj: float = 0) -> dict:
+    """Per-concept breakdown for one flagged image (the shape the logs have always used)."""
+    report = {"special_scores": {}, "special_care": [], "concept_scores": {}, "bad_concepts": []}
+    adjustment = safety_checker_adj
+    for concept_idx, (concept_cos, threshold) in enumerate(zip(special_cos, special_thresholds)):
+        score = round(float(concept_cos - threshold + adjustment), 3)
+        report["special_scores"][concept_idx] = score
+        if score > 0:
+            report["special_care"].append([concept_idx, score])
+            adjustment = 0.01
+    for concept_idx, score in enumerate(cos_scores):
+        report["concept_scores"][concept_idx] = round(float(score), 3)
+        if score > 0:
+            report["bad_concepts"].append(concept_idx)
+    return report
+
+
 class StableDiffusionSafetyChecker(BaseSafetyChecker, ABC):
     def __init__(self, config: CLIPConfig):
         super().__init__(config)
 
     @torch.no_grad()
-    def forward(self, clip_input, images, safety_checker_adj: float = 0):
+    def forward(self, clip_input, images=None, safety_checker_adj: float = 0):
+        """Check a batch of preprocessed CLIP inputs; `images` is accepted for the diffusers signature."""
         pooled_output = self.vision_model(clip_input)[1]
         image_embeds = self.visual_projection(pooled_output)
 
-        special_cos_dist = cosine_distance(image_embeds, self.special_care_embeds).cpu().float().numpy()
-        cos_dist = cosine_distance(image_embeds, self.concept_embeds).cpu().float().numpy()
-
-        result = []
-        batch_size = image_embeds.shape[0]
-        for i in range(batch_size):
-            result_img = {"special_scores": {}, "special_care": [], "concept_scores": {}, "bad_concepts": []}
-            adjustment = safety_checker_adj
-
-            for concept_idx in range(len(special_cos_dist[0])):
-                concept_cos = special_cos_dist[i][concept_idx]
-                concept_threshold = self.special_care_embeds_weights[concept_idx].item()
-                result_img["special_scores"][concept_idx] = round(concept_cos - concept_threshold + adjustment, 3)
-                if result_img["special_scores"][concept_idx] > 0:
-                    result_img["special_care"].append({concept_idx, result_img["special_scores"][concept_idx]})
-                    adjustment = 0.01
-
-            for concept_idx in range(len(cos_dist[0])):
-                concept_cos = cos_dist[i][concept_idx]
-                concept_threshold = self.concept_embeds_weights[concept_idx].item()
-                # Apply per-concept adjustment if defined
-                per_concept_adj = CONCEPT_ADJUSTMENTS.get(concept_idx, 0)
-                result_img["concept_scores"][concept_idx] = round(concept_cos - concept_threshold + adjustment + per_concept_adj, 3)
-                if result_img["concept_scores"][concept_idx] > 0:
-                    result_img["bad_concepts"].append(concept_idx)
-
-            result.append(result_img)
-
-        has_nsfw_concepts = [len(res["bad_concepts"]) > 0 for res in result]
+        special_cos = cosine_distance(image_embeds, self.special_care_embeds).cpu().float().numpy()
+        cos = cosine_distance(image_embeds, self.concept_embeds).cpu().float().numpy()
+        special_thresholds = self.special_care_embeds_weights.cpu().float().numpy()
+        concept_thresholds = self.concept_embeds_weights.cpu().float().numpy() - concept_adjustment_vector(cos.shape[1])
+
+        flagged, scores = score_concepts(special_cos, cos, special_thresholds, concept_thresholds, safety_checker_adj)
+        has_nsfw_concepts = flagged.any(axis=1).tolist()
+        result = [
+            concept_report(special_cos[i], scores[i], special_thresholds, safety_checker_adj)
+            if nsfw else {"special_scores": {}, "special_care": [], "concept_scores": {}, "bad_concepts": []}
+            for i, nsfw in enumerate(has_nsfw_concepts)
+        ]
         return has_nsfw_concepts, result
 
 
-
+def clip_pixel_values(images: list[np.ndarray], extractor, device: str = "cuda") -> torch.Tensor:
+    """CLIP input for a batch of same-sized uint8 HWC images, resized on `device`.
+
+    Does what the feature extractor does (shortest-edge bicubic resize, center crop,
+    normalize) without first building full-resolution PIL images on the CPU. Output
+    sizes and crop offsets are the extractor's; antialiased torch bicubic uses PIL's
+    kernel, and rounding to 8 bits like the PIL image keeps values within a level or two.
+    """
+    batch = torch.from_numpy(np.stack(images)).to(device).permute(0, 3, 1, 2).float()
+    size = extractor.size["shortest_edge"] if isinstance(extractor.size, dict) else extractor.size
+    crop = extractor.crop_size
+    crop_h, crop_w = (crop["height"], crop["width"]) if isinstance(crop, dict) else (crop, crop)
+    height, width = batch.shape[-2:]
+    # Long side truncated, as transformers' get_resize_output_image_size does.
+    long_side = int(size * max(height, width) / min(height, width))
+    resized = (long_side, size) if width <= height else (size, long_side)
+    batch = torch.nn.functional.interpolate(batch, size=resized, mode="bicubic", antialias=True, align_corners=False)
+    top, left = (resized[0] - crop_h) // 2, (resized[1] - crop_w) // 2
+    batch = batch[..., top : top + crop_h, left : left + crop_w].round().clamp(0, 255) / 255
+    mean = torch.tensor(extractor.image_mean, device=device).view(1, -1, 1, 1)
+    std = torch.tensor(extractor.image_std, device=device).view(1, -1, 1, 1)
+    return (batch - mean) / std
 
 
 def replace_sets_with_lists(obj):